@@ -0,0 +1,125 @@
+"""
+Benchmark storage size and read latency of novel iterations, stored as plain text and as snapshots plus deltas.
+
+Builds a synthetic novel in a temporary SQLite database in which each iteration appends a chapter to the previous
+one and revises an earlier sentence, then stores it both ways. Reports stored bytes per iteration, and the latency
+of reading random iterations cold (rebuilt from the nearest snapshot), warm (from the reconstruction cache) and as
+plain text, as JSON in microseconds.
+
+Usage:
+    python benchmarks/bench_iterations.py [--iterations 200] [--chapter-chars 2000] [--snapshot-interval 16] [--reads 500]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from harness import percentile
+
+from backend_codebase.iteration_store import TEXT, IterationStore
+from backend_codebase.iterations import _STORAGE_COLUMNS
+from backend_codebase.models import Base, Novel, NovelIteration
+
+
+def make_versions(iterations, chapter_chars, rng):
+    sentences = []
+    versions = []
+    for n in range(1, iterations + 1):
+        chapter = f'Chapter {n}.\n'
+        while len(chapter) < chapter_chars:
+            chapter += f'The hero crosses the {rng.choice(["river", "ridge", "city", "desert"])} on day {rng.randint(1, 9999)}. '
+        sentences.append(chapter.rstrip() + '\n')
+        if n > 1:
+            index = rng.randrange(len(sentences) - 1)
+            sentences[index] = sentences[index].replace('The hero', 'Our hero', 1)
+        versions.append(''.join(sentences))
+    return versions
+
+
+def store_versions(session, versions, store=None):
+    novel = Novel(title='Benchmark')
+    session.add(novel)
+    session.flush()
+    previous = None
+    for number, content in enumerate(versions, 1):
+        columns = store.encode(number, content, previous) if store else {'encoding': TEXT, 'content': content}
+        session.add(NovelIteration(novel_id=novel.id, iteration_number=number, **columns))
+        previous = content
+    session.commit()
+    return novel.id
+
+
+def stored_bytes(session, novel_id):
+    return session.execute(
+        select(func.sum(func.coalesce(func.length(NovelIteration.payload), 0) + func.coalesce(func.length(NovelIteration.content), 0)))
+        .where(NovelIteration.novel_id == novel_id)
+    ).scalar_one()
+
+
+def time_reads(read, numbers):
+    latencies = []
+    for number in numbers:
+        start = time.perf_counter()
+        read(number)
+        latencies.append(time.perf_counter() - start)
+    us = lambda seconds: round(1e6 * seconds, 1)
+    return {'p50_us': us(statistics.median(latencies)), 'p95_us': us(percentile(latencies, 0.95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--chapter-chars', type=int, default=2000)
+    parser.add_argument('--snapshot-interval', type=int, default=16)
+    parser.add_argument('--reads', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    versions = make_versions(args.iterations, args.chapter_chars, rng)
+    database = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+    engine = create_engine(f'sqlite:///{database.name}')
+    try:
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        store = IterationStore(snapshot_interval=args.snapshot_interval)
+        plain_id = store_versions(session, versions)
+        packed_id = store_versions(session, versions, store)
+
+        def read_row(novel_id, number):
+            return session.execute(
+                select(*_STORAGE_COLUMNS).where(NovelIteration.novel_id == novel_id, NovelIteration.iteration_number == number)
+            ).one()
+
+        def cold(number):
+            store.clear()
+            return store.content(session, packed_id, read_row(packed_id, number))
+
+        numbers = [rng.randint(1, args.iterations) for _ in range(args.reads)]
+        assert all(cold(number) == versions[number - 1] for number in numbers[:20])
+        report = {
+            'config': vars(args),
+            'bytes_per_iteration': {
+                'plain': round(stored_bytes(session, plain_id) / args.iterations),
+                'delta': round(stored_bytes(session, packed_id) / args.iterations),
+            },
+            'read_latency': {
+                'plain': time_reads(lambda number: read_row(plain_id, number).content, numbers),
+                'delta_cold': time_reads(cold, numbers),
+                'delta_warm': time_reads(lambda number: store.content(session, packed_id, read_row(packed_id, number)), numbers),
+            },
+        }
+        session.close()
+    finally:
+        engine.dispose()
+        os.unlink(database.name)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark login latency while generation traffic is running.
+
+Starts the app on a local threaded server backed by a temporary SQLite database, with a fake model that sleeps
+instead of calling OpenAI. Login requests run concurrently with iterate-novel requests, once with bcrypt on the
+request threads ('inline') and once on the process pool ('pool'), and their latency percentiles are printed as JSON.
+
+Usage:
+    python benchmarks/bench_login.py [--duration 10] [--login-clients 8] [--generation-clients 16] [--rounds 12]
+"""
+import argparse
+import base64
+import json
+import logging
+import statistics
+import threading
+import time
+
+from harness import BENCH_EMAIL, BENCH_PASSWORD, client_loop, percentile, serve
+
+from backend_codebase.passwords import PasswordHasher
+
+BASIC_AUTH = 'Basic ' + base64.b64encode(b'admin:password123').decode('ascii')
+
+
+def run(mode, args, with_generation):
+    hasher = PasswordHasher(rounds=args.rounds, workers=0 if mode == 'inline' else None)
+    login_latencies, generation_latencies, errors = [], [], []
+
+    with serve(model_latency=args.model_latency, hasher=hasher) as port:
+        deadline = time.monotonic() + args.duration
+        threads = [
+            threading.Thread(target=client_loop, args=(
+                port, 'POST', '/sessions', lambda: {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}, {},
+                deadline, login_latencies, errors))
+            for _ in range(args.login_clients)
+        ]
+        if with_generation:
+            threads += [
+                threading.Thread(target=client_loop, args=(
+                    port, 'POST', '/api/v1/iterate-novel', lambda: {'input': 'Continue'}, {'Authorization': BASIC_AUTH},
+                    deadline, generation_latencies, errors))
+                for _ in range(args.generation_clients)
+            ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'mode': mode,
+        'generation_traffic': with_generation,
+        'logins': len(login_latencies),
+        'login_p50_ms': round(1000 * statistics.median(login_latencies), 2) if login_latencies else None,
+        'login_p99_ms': round(1000 * percentile(login_latencies, 0.99), 2) if login_latencies else None,
+        'generation_requests': len(generation_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--login-clients', type=int, default=8)
+    parser.add_argument('--generation-clients', type=int, default=16)
+    parser.add_argument('--model-latency', type=float, default=0.2)
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    results = [run(mode, args, with_generation) for mode in ('inline', 'pool') for with_generation in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
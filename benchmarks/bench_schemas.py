@@ -0,0 +1,60 @@
+"""
+Benchmark per-request validation cost of user input payloads.
+
+Compares the old request path (a new UserInputSchema per request, `validate` then `load`) with a single `load` on
+the shared module-level instance and with `load_user_input`, which adds the direct check for the common payload
+shape. Payloads range from none to large `additional_preferences` objects; timings are printed as JSON in
+microseconds per payload.
+
+Usage:
+    python benchmarks/bench_schemas.py [--repeat 2000]
+"""
+import argparse
+import json
+import timeit
+
+from backend_codebase.schemas import UserInputSchema, load_user_input, user_input_schema
+
+BASE = {'plot': 'A hero saves the world', 'setting': 'Futuristic city', 'theme': 'Courage', 'conflict': 'Man vs. Machine'}
+
+
+def make_payload(preference_keys):
+    if not preference_keys:
+        return dict(BASE)
+    preferences = {
+        f'preference_{n}': {'weight': n, 'tags': [f'tag{n}', f'tag{n + 1}'], 'note': 'x' * 20}
+        for n in range(preference_keys)
+    }
+    return {**BASE, 'additional_preferences': preferences}
+
+
+def before(data):
+    schema = UserInputSchema()
+    errors = schema.validate(data)
+    if not errors:
+        schema.load(data)
+
+
+def shared_load(data):
+    user_input_schema.load(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    results = []
+    for keys in (0, 10, 1000, 10000):
+        data = make_payload(keys)
+        number = max(args.repeat // max(keys // 100, 1), 20)
+        row = {'preference_keys': keys}
+        for name, fn in (('before_us', before), ('shared_load_us', shared_load), ('load_user_input_us', load_user_input)):
+            row[name] = round(min(timeit.repeat(lambda: fn(data), number=number, repeat=3)) / number * 1e6, 2)
+        row['speedup'] = round(row['before_us'] / row['load_user_input_us'], 1)
+        results.append(row)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
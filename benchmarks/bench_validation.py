@@ -0,0 +1,100 @@
+"""
+Benchmark the validation module against the previous implementation.
+
+The previous functions (string patterns passed to `re` on every call, three separate password scans, and an
+uncached email validator) are reproduced here as the baseline. Single-field timings are in microseconds per call;
+the batch timing validates a bulk import where addresses repeat, as they do across signups, logins and re-imports.
+
+Usage:
+    python benchmarks/bench_validation.py [--records 5000]
+"""
+import argparse
+import json
+import re
+import time
+import timeit
+
+from email_validator import EmailNotValidError, validate_email
+
+from backend_codebase import validation
+
+
+def baseline_username(username):
+    if not (3 <= len(username) <= 30):
+        return False
+    if not re.match(r'^\w+$', username):
+        return False
+    return True
+
+
+def baseline_email(email):
+    try:
+        validate_email(email, check_deliverability=False)
+        return True
+    except EmailNotValidError:
+        return False
+
+
+def baseline_password(password):
+    if len(password) < 8:
+        return False
+    if not re.search(r'[A-Z]', password):
+        return False
+    if not re.search(r'[a-z]', password):
+        return False
+    if not re.search(r'\d', password):
+        return False
+    return True
+
+
+def baseline_signups(records):
+    errors = []
+    for record in records:
+        if not baseline_username(record['username']):
+            errors.append('Invalid username')
+        elif not baseline_email(record['email']):
+            errors.append('Invalid email address')
+        elif not baseline_password(record['password']):
+            errors.append('Invalid password')
+        else:
+            errors.append(None)
+    return errors
+
+
+def per_call(fn, value, number=20000):
+    return round(min(timeit.repeat(lambda: fn(value), number=number, repeat=3)) / number * 1e6, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=5000)
+    args = parser.parse_args()
+
+    results = {
+        'username_us': {'before': per_call(baseline_username, 'valid_user_123'), 'after': per_call(validation.validate_username, 'valid_user_123')},
+        'password_us': {'before': per_call(baseline_password, 'averylongpassword_Z9'), 'after': per_call(validation.validate_password, 'averylongpassword_Z9')},
+        'email_us': {'before': per_call(baseline_email, 'user.name@example.com', 2000), 'after': per_call(validation.validate_email_address, 'user.name@example.com', 2000)},
+    }
+
+    # A bulk import in which each address appears five times (re-imports, login after signup)
+    records = [
+        {'username': f'user_{n}', 'email': f'user{n % (args.records // 5)}@example.com', 'password': f'Password{n}'}
+        for n in range(args.records)
+    ]
+    validation.normalize_email.cache_clear()
+    start = time.perf_counter()
+    expected = baseline_signups(records)
+    before = time.perf_counter() - start
+    start = time.perf_counter()
+    assert validation.validate_signups(records) == expected
+    after = time.perf_counter() - start
+    results['batch'] = {'records': args.records, 'before_ms': round(before * 1e3, 1), 'after_ms': round(after * 1e3, 1)}
+
+    for row in results.values():
+        key = 'before_ms' if 'before_ms' in row else 'before'
+        row['speedup'] = round(row[key] / row[key.replace('before', 'after')], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
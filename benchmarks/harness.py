@@ -0,0 +1,152 @@
+"""
+Shared helpers for the benchmarks: an app server on a real socket with a fake model, and load generation.
+"""
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from unittest.mock import patch
+
+from werkzeug.serving import make_server
+
+from backend_codebase import create_app, db
+from backend_codebase.database import engine_options
+from backend_codebase.models import User
+from backend_codebase.passwords import PasswordHasher
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'Password123'
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies, errors, elapsed):
+    """
+    Summarizes one endpoint's run as request rate and latency percentiles in milliseconds.
+    """
+    ms = lambda seconds: round(1000 * seconds, 2) if seconds is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': ms(statistics.median(latencies)) if latencies else None,
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+    }
+
+
+def fake_model(latency):
+    """
+    Returns a deterministic stand-in for generate_content that sleeps for `latency` seconds.
+    """
+    def generate_content(prompt, use_cache=None, priority=None):
+        time.sleep(latency)
+        return f'Generated continuation of {len(prompt)} prompt characters.'
+    return generate_content
+
+
+@contextmanager
+def serve(database_url=None, model_latency=0.05, hasher=None):
+    """
+    Runs the app on a local threaded server with a fake model and a seeded user.
+
+    Args:
+    database_url (str, optional): The database to use. Defaults to a temporary SQLite file.
+    model_latency (float, optional): Seconds the fake model takes per call. Defaults to 0.05.
+    hasher (PasswordHasher, optional): The password hasher for /users and /sessions. Defaults to an inline cost-12
+        hasher.
+
+    Yields:
+    int: The port the server listens on.
+    """
+    database = None
+    if database_url is None:
+        database = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False)
+        database_url = f'sqlite:///{database.name}'
+    hasher = hasher or PasswordHasher(workers=0)
+
+    class BenchConfig:
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(database_url)
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        if db.session.query(User).filter_by(email=BENCH_EMAIL).first() is None:
+            db.session.add(User(username='bench', email=BENCH_EMAIL, password_hash=hasher.hash(BENCH_PASSWORD)))
+            db.session.commit()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(patch('backend_codebase.views.password_hasher', hasher))
+            stack.enter_context(patch('backend_codebase.api.generate_content', fake_model(model_latency)))
+            yield server.port
+    finally:
+        server.shutdown()
+        hasher.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+        if database is not None:
+            os.unlink(database.name)
+
+
+def client_loop(port, method, path, make_body, headers, deadline, latencies, errors):
+    """
+    Sends requests on one keep-alive connection until `deadline`, recording latencies of non-5xx responses.
+
+    Args:
+    make_body (callable): Returns the JSON body for each request, or None for no body.
+    errors (list): Receives the status of every 5xx response or the name of every connection error.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    while time.monotonic() < deadline:
+        body = make_body()
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                               headers={'Content-Type': 'application/json', **headers})
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        if response.status >= 500:
+            errors.append(response.status)
+        else:
+            latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run_clients(port, method, path, make_body, headers, clients, duration):
+    """
+    Runs `clients` concurrent client loops against one endpoint for `duration` seconds.
+
+    Returns:
+    dict: The summary from `summarize`.
+    """
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(port, method, path, make_body, headers, deadline, latencies, errors))
+        for _ in range(clients)
+    ]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, len(errors), time.monotonic() - start)
@@ -0,0 +1,109 @@
+"""
+Load-test the API endpoints against a fake model and report throughput and latency per endpoint as JSON.
+
+Starts the app on a local threaded server backed by a temporary SQLite database (or --database-url, e.g. a local
+Postgres), with a deterministic fake model that sleeps for --model-latency seconds instead of calling OpenAI. Each
+endpoint is then driven by --clients concurrent keep-alive clients for --duration seconds, one endpoint at a time,
+and its request rate and p50/p95/p99 latencies are reported. Save the output of two commits and compare them to
+spot regressions.
+
+Usage:
+    python benchmarks/load_test.py [--duration 10] [--clients 8] [--model-latency 0.05] [--bcrypt-rounds 12]
+        [--database-url URL] [--endpoints users,sessions,...] [--auth bearer|basic] [--output results.json]
+"""
+import argparse
+import base64
+import itertools
+import json
+import logging
+import subprocess
+import sys
+
+from harness import BENCH_EMAIL, BENCH_PASSWORD, run_clients, serve
+
+from backend_codebase.passwords import PasswordHasher
+from backend_codebase.tokens import token_manager
+
+
+def scenarios(api_headers):
+    """
+    Returns each endpoint's method, path, body factory and headers.
+    """
+    counter = itertools.count()
+
+    def new_user():
+        n = next(counter)
+        return {'username': f'load_user_{n}', 'email': f'load{n}@example.com', 'password': BENCH_PASSWORD}
+
+    return {
+        'users': ('POST', '/users', new_user, {}),
+        'sessions': ('POST', '/sessions', lambda: {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD}, {}),
+        'user-inputs': ('POST', '/api/v1/user-inputs', lambda: {
+            'plot': 'A hero saves the world', 'setting': 'Futuristic city', 'theme': 'Courage', 'conflict': 'Man vs. Machine',
+        }, api_headers),
+        'iterate-novel': ('POST', '/api/v1/iterate-novel', lambda: {'input': 'Continue the story.'}, api_headers),
+        'latest-iteration': ('GET', '/api/v1/latest-iteration', lambda: None, api_headers),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--model-latency', type=float, default=0.05)
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--database-url')
+    parser.add_argument('--endpoints', default='users,sessions,user-inputs,iterate-novel,latest-iteration')
+    parser.add_argument('--auth', choices=('bearer', 'basic'), default='bearer',
+                        help='How /api/v1 requests authenticate; basic pays a PBKDF2 check per request.')
+    parser.add_argument('--output', help='Write the JSON report to this file as well as stdout.')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    if args.auth == 'bearer':
+        api_headers = {'Authorization': f"Bearer {token_manager.issue({'user_id': 'load-test'})}"}
+    else:
+        api_headers = {'Authorization': 'Basic ' + base64.b64encode(b'admin:password123').decode('ascii')}
+
+    endpoints = args.endpoints.split(',')
+    available = scenarios(api_headers)
+    unknown = set(endpoints) - set(available)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    results = {}
+    hasher = PasswordHasher(rounds=args.bcrypt_rounds, workers=0)
+    with serve(args.database_url, args.model_latency, hasher) as port:
+        for name in endpoints:
+            method, path, make_body, headers = available[name]
+            results[name] = run_clients(port, method, path, make_body, headers, args.clients, args.duration)
+
+    report = {
+        'commit': git_commit(),
+        'config': {
+            'database': 'sqlite' if args.database_url is None else args.database_url.split(':', 1)[0],
+            'duration': args.duration,
+            'clients': args.clients,
+            'model_latency': args.model_latency,
+            'bcrypt_rounds': args.bcrypt_rounds,
+            'auth': args.auth,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 1 if any(result['errors'] for result in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,13 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from .models import Base
 
-# Initialize the SQLAlchemy instance globally
+# Initialize the SQLAlchemy instance globally, sharing the models' declarative base
 
-db = SQLAlchemy()
+db = SQLAlchemy(model_class=Base)
 
 
-def create_app(config_object='backend_codebase.config.TestConfig'):
+def create_app(config_object='backend_codebase.config.Config'):
     app = Flask(__name__)
     app.config.from_object(config_object)
 
@@ -15,10 +16,25 @@ def create_app(config_object='backend_codebase.config.TestConfig'):
 
     # Register blueprints
     from .views import views_bp
+    from .api import api_bp
     app.register_blueprint(views_bp)
+    app.register_blueprint(api_bp)
 
-    with app.app_context():
-        db.create_all()
+    # Request, query and span latency exported on /metrics, for administrators only
+    from . import metrics
+    from .api import auth
+    from .database import pool_stats
+    metrics.init_app(app, engine_stats=lambda: pool_stats(db.engine), protect=auth.login_required(role='admin'))
+
+    # Write-behind buffer for the feedback and user-input endpoints
+    from . import ingest
+    ingest.init_app(app, db)
+
+    # Password hashing workers, created before the server starts its threads
+    from .passwords import password_hasher
+    password_hasher.start()
+
+    # Tables are managed by Alembic migrations (`alembic upgrade head`)
 
     return app
 
@@ -1,6 +1,12 @@
 import openai
 import os
 import time
+from .cache import cache_from_env, make_cache_key
+from .http_pool import session_from_env
+from .metrics import record_model_call
+from .ratelimit import INTERACTIVE, estimate_request_tokens, scheduler
+from .resilience import Resilience, upstream
+from .singleflight import SingleFlight
 
 openai.api_key = os.getenv('OPENAI_API_KEY')
 
@@ -13,20 +19,43 @@ class OpenAI:
 
     Attributes:
     api_key (str): The API key for authenticating with OpenAI.
+    cache (ResponseCache): The cache for completed responses, or None if caching is disabled.
+    single_flight (SingleFlight): Coalesces concurrent identical requests, or None to disable coalescing.
+    resilience (Resilience): Retries, backs off and trips the circuit breaker for upstream calls.
+    scheduler (RateScheduler): Paces upstream calls under the rate limits, or None to send them immediately.
+    session (PooledSession): The pooled HTTP session upstream calls are sent on, or None for the library default.
     """
-    def __init__(self, api_key):
+    def __init__(self, api_key, cache=None, single_flight=None, resilience=None, scheduler=None, session=None):
         """
         Initializes the OpenAI client with the provided API key.
 
         Args:
         api_key (str): The API key for authenticating with OpenAI.
+        cache (ResponseCache, optional): The cache for completed responses. Defaults to None.
+        single_flight (SingleFlight, optional): Coalesces concurrent identical requests. Defaults to None.
+        resilience (Resilience, optional): The retry policy for upstream calls. Defaults to retries with
+            backoff and no circuit breaker.
+        scheduler (RateScheduler, optional): Paces upstream calls under the rate limits. Defaults to None.
+        session (PooledSession, optional): A pooled HTTP session to send upstream calls on. The openai library keeps
+            a single session setting, so this replaces it process-wide. Defaults to None.
         """
         self.api_key = api_key
+        self.cache = cache
+        self.single_flight = single_flight
+        self.resilience = resilience or Resilience()
+        self.scheduler = scheduler
+        self.session = session
+        if session is not None:
+            openai.requestssession = session
 
-    def chat_completions_create(self, model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, retries=3, delay=5):
+    def chat_completions_create(self, model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, retries=None, deadline=None, use_cache=None, priority=INTERACTIVE, n=1, coalesce=True):
         """
         Creates a chat completion using the OpenAI API.
 
+        Responses are looked up in and stored to the client's cache, keyed on the model, messages and sampling
+        parameters. By default only deterministic (temperature 0) requests are cached. Concurrent requests with
+        the same key share a single upstream call.
+
         Args:
         model (str): The model to use for generating the completion.
         messages (list): A list of messages to send to the model.
@@ -35,16 +64,43 @@ class OpenAI:
         top_p (float): Nucleus sampling probability.
         frequency_penalty (float): Frequency penalty.
         presence_penalty (float): Presence penalty.
-        retries (int, optional): Number of retries in case of failure. Defaults to 3.
-        delay (int, optional): Delay between retries in seconds. Defaults to 5.
+        retries (int, optional): Maximum number of attempts. Defaults to the resilience policy's.
+        deadline (float, optional): Time budget in seconds across all attempts. Defaults to the resilience policy's.
+        use_cache (bool, optional): True to use the cache, False to bypass it. Defaults to None, which caches
+            only temperature 0 requests.
+        priority (int, optional): The rate scheduler priority, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        n (int, optional): The number of choices to generate in the one call. Defaults to 1. Requests for several
+            choices are not cached.
+        coalesce (bool, optional): False to always make a call of its own, for callers that want independent samples
+            of the same prompt. Defaults to True.
 
         Returns:
-        str: The generated completion text.
+        str or list: The generated completion text, or a list of `n` choices if `n` is greater than 1.
 
         Raises:
-        OpenAIError: If an error occurs after the specified number of retries.
+        OpenAIError: If the request fails permanently, runs out of attempts or exceeds its deadline.
+        CircuitOpenError: If upstream is marked unhealthy by the circuit breaker.
         """
-        for attempt in range(retries):
+        if use_cache is None:
+            use_cache = temperature == 0
+        use_cache = use_cache and self.cache is not None and n == 1
+
+        key = make_cache_key(model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, n)
+        if use_cache:
+            content = self.cache.get(key)
+            if content is not None:
+                return content
+
+        create = lambda: self._create(model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, retries, deadline, priority, n)
+        content = self.single_flight.do(key, create) if self.single_flight is not None and coalesce else create()
+        if use_cache:
+            self.cache.set(key, content)
+        return content
+
+    def _create(self, model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, retries, deadline, priority, n):
+        def attempt(timeout):
+            timeout = self._admit(messages, max_tokens * n, priority, timeout)
+            start = time.perf_counter()
             try:
                 response = openai.ChatCompletion.create(
                     model=model,
@@ -53,28 +109,128 @@ class OpenAI:
                     max_tokens=max_tokens,
                     top_p=top_p,
                     frequency_penalty=frequency_penalty,
-                    presence_penalty=presence_penalty
+                    presence_penalty=presence_penalty,
+                    n=n,
+                    request_timeout=timeout
+                )
+            except Exception:
+                record_model_call(model, time.perf_counter() - start, outcome='error')
+                raise
+            record_model_call(model, time.perf_counter() - start, usage=response.get('usage'))
+            contents = [choice['message']['content'].strip() for choice in response['choices']]
+            return contents if n > 1 else contents[0]
+
+        try:
+            return self.resilience.call(attempt, deadline=deadline, max_attempts=retries)
+        except openai.error.OpenAIError as e:
+            raise OpenAIError(f"An error occurred: {e}")
+
+    def chat_completions_stream(self, model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, retries=None, deadline=None, priority=INTERACTIVE):
+        """
+        Creates a streaming chat completion using the OpenAI API.
+
+        The request is retried only while opening the stream; once the first chunk has
+        been received, errors are raised to the caller.
+
+        Args:
+        model (str): The model to use for generating the completion.
+        messages (list): A list of messages to send to the model.
+        temperature (float): Sampling temperature.
+        max_tokens (int): Maximum number of tokens to generate.
+        top_p (float): Nucleus sampling probability.
+        frequency_penalty (float): Frequency penalty.
+        presence_penalty (float): Presence penalty.
+        retries (int, optional): Maximum number of attempts. Defaults to the resilience policy's.
+        deadline (float, optional): Time budget in seconds across all attempts. Defaults to the resilience policy's.
+        priority (int, optional): The rate scheduler priority, INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+
+        Yields:
+        str: The generated text, chunk by chunk, as it arrives.
+
+        Raises:
+        OpenAIError: If opening the stream fails permanently or runs out of attempts, or if streaming fails.
+        CircuitOpenError: If upstream is marked unhealthy by the circuit breaker.
+        """
+        def attempt(timeout):
+            timeout = self._admit(messages, max_tokens, priority, timeout)
+            start = time.perf_counter()
+            try:
+                stream = openai.ChatCompletion.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    frequency_penalty=frequency_penalty,
+                    presence_penalty=presence_penalty,
+                    stream=True,
+                    request_timeout=timeout
                 )
-                return response['choices'][0]['message']['content'].strip()
-            except openai.error.OpenAIError as e:
-                if attempt < retries - 1:
-                    time.sleep(delay)
-                else:
-                    raise OpenAIError(f"An error occurred: {e}")
+            except Exception:
+                record_model_call(model, time.perf_counter() - start, outcome='error')
+                raise
+            # Streams report no usage; the latency recorded is the time to open the stream
+            record_model_call(model, time.perf_counter() - start)
+            return stream
 
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        try:
+            response = self.resilience.call(attempt, deadline=deadline, max_attempts=retries)
+        except openai.error.OpenAIError as e:
+            raise OpenAIError(f"An error occurred: {e}")
 
-def generate_content(prompt):
+        try:
+            for chunk in response:
+                content = chunk['choices'][0]['delta'].get('content')
+                if content:
+                    yield content
+        except openai.error.OpenAIError as e:
+            raise OpenAIError(f"An error occurred: {e}")
+
+    def _admit(self, messages, max_tokens, priority, timeout):
+        # Every attempt, retries included, counts against the rate limits; returns the time left for the request
+        if self.scheduler is None:
+            return timeout
+        queued = self.scheduler.acquire(estimate_request_tokens(messages, max_tokens), priority, timeout)
+        return None if timeout is None else max(timeout - queued, 0.0)
+
+openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), cache=cache_from_env(), single_flight=SingleFlight(), resilience=upstream, scheduler=scheduler, session=session_from_env())
+
+def generate_content(prompt, use_cache=None, priority=INTERACTIVE):
     """
     Generates content based on the given prompt using OpenAI's GPT-4 model.
 
     Args:
     prompt (str): The prompt to generate content from.
+    use_cache (bool, optional): True to use the response cache, False to bypass it. Defaults to None, which
+        follows the client's default policy.
+    priority (int, optional): The rate scheduler priority. Defaults to INTERACTIVE.
 
     Returns:
     str: The generated content.
     """
     return openai_client.chat_completions_create(
+        model='gpt-4',
+        messages=[{'role': 'user', 'content': prompt}],
+        temperature=0.7,
+        max_tokens=500,
+        top_p=1.0,
+        frequency_penalty=0.0,
+        presence_penalty=0.0,
+        use_cache=use_cache,
+        priority=priority
+    )
+
+def generate_content_stream(prompt):
+    """
+    Generates content based on the given prompt using OpenAI's GPT-4 model, streaming it as it is produced.
+
+    Args:
+    prompt (str): The prompt to generate content from.
+
+    Yields:
+    str: The generated content, chunk by chunk.
+    """
+    return openai_client.chat_completions_stream(
         model='gpt-4',
         messages=[{'role': 'user', 'content': prompt}],
         temperature=0.7,
@@ -0,0 +1,859 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from . import db
+from .models import Feedback, Novel, UserInput
+from sqlalchemy.exc import IntegrityError
+from .ai_integration import generate_content, generate_content_stream, openai_client
+from .context import ContextBuilder
+from .database import pool_stats
+from .head_cache import Head, head_cache_from_env
+from .ingest import SYNC, IngestBufferFullError, get_buffer, import_lines, iter_lines
+from . import iterations
+from .iterations import DEFAULT_NOVEL_ID
+from .jobs import JobQueue, JobQueueFullError
+from .metrics import span
+from .passwords import HasherSaturatedError, password_hasher
+from .ratelimit import RateLimitTimeoutError, scheduler
+from .resilience import CircuitOpenError, upstream
+from . import users as user_accounts
+from .validation import validate_signups
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dotenv import load_dotenv
+from .schemas import load_feedback, load_user_input
+from marshmallow import ValidationError
+from .services import generate_chapter_content, generate_character_profile, generate_plot_twist
+from concurrent.futures import ThreadPoolExecutor
+from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth, MultiAuth
+from .tokens import InvalidTokenError, token_manager
+from werkzeug.security import generate_password_hash, check_password_hash
+
+load_dotenv()
+api_bp = Blueprint('api', __name__)
+logger = logging.getLogger(__name__)
+
+# Authentication setup: Basic credentials, or a bearer JWT issued by POST /sessions
+basic_auth = HTTPBasicAuth()
+token_auth = HTTPTokenAuth(scheme='Bearer')
+auth = MultiAuth(basic_auth, token_auth)
+users = {
+    "admin": generate_password_hash("password123")
+}
+admins = {"admin"}
+
+@basic_auth.verify_password
+def verify_password(username, password):
+    """
+    Verify the provided username and password.
+
+    Args:
+        username (str): The username to verify.
+        password (str): The password to verify.
+
+    Returns:
+        str: The username if verification is successful, None otherwise.
+    """
+    if username in users and check_password_hash(users.get(username), password):
+        return username
+
+@basic_auth.get_user_roles
+def get_basic_user_roles(username):
+    """
+    Look up the roles of a Basic-authenticated user.
+
+    Args:
+        username (str): The authenticated username.
+
+    Returns:
+        list: ['admin'] for administrators, otherwise an empty list.
+    """
+    return ['admin'] if username in admins else []
+
+@token_auth.verify_token
+def verify_token(token):
+    """
+    Verify a bearer JWT by its signature, key ID and expiry, without touching the database.
+
+    Args:
+        token (str): The bearer token.
+
+    Returns:
+        dict: The token claims if verification is successful, None otherwise.
+    """
+    try:
+        return token_manager.verify(token)
+    except InvalidTokenError:
+        return None
+
+@token_auth.get_user_roles
+def get_token_user_roles(claims):
+    """
+    Read the roles granted by a verified token.
+
+    Args:
+        claims (dict): The verified token claims.
+
+    Returns:
+        list: The roles in the token's 'roles' claim.
+    """
+    return claims.get('roles', [])
+
+def current_user_id():
+    """
+    Look up the signed-up user making the request.
+
+    Returns:
+        int: The user ID in the bearer token's 'user_id' claim, or None for Basic-authenticated callers and tokens
+        without one.
+    """
+    user = auth.current_user()
+    if isinstance(user, dict) and user.get('user_id') is not None:
+        return int(user['user_id'])
+    return None
+
+def current_principal():
+    """
+    Identify the caller, to record who submitted a job.
+
+    Returns:
+        str: 'user:<id>' for signed-up users, 'token:<username>' for other bearer tokens, or 'basic:<username>'.
+    """
+    user = auth.current_user()
+    if isinstance(user, dict):
+        user_id = current_user_id()
+        return f'user:{user_id}' if user_id is not None else f"token:{user.get('username')}"
+    return f'basic:{user}'
+
+def is_admin():
+    """
+    Check whether the caller has the 'admin' role, by the same rules as `login_required(role='admin')`.
+
+    Returns:
+        bool: True for administrators.
+    """
+    user = auth.current_user()
+    roles = get_token_user_roles(user) if isinstance(user, dict) else get_basic_user_roles(user)
+    return 'admin' in roles
+
+def can_access_novel(novel_id, create_default=False):
+    """
+    Check that a novel exists and the caller may use it, optionally creating the default novel on first use.
+
+    Administrators may use every novel. Other callers may use the novels whose owner is their user ID; novels
+    without an owner, such as the default novel, belong to callers without one (Basic credentials). Novels the
+    caller may not use are reported as missing, so their IDs cannot be probed.
+
+    Args:
+        novel_id (int): The ID of the novel.
+        create_default (bool, optional): Create the default novel if it is requested and missing. Defaults to False.
+
+    Returns:
+        bool: True if the novel exists and the caller may use it.
+    """
+    session = db.session
+    if create_default and novel_id == DEFAULT_NOVEL_ID:
+        iterations.ensure_default_novel(session)
+    novel = session.get(Novel, novel_id)
+    return novel is not None and (is_admin() or novel.owner_id == current_user_id())
+
+@api_bp.errorhandler(CircuitOpenError)
+def upstream_unavailable(error):
+    # Fail fast while the model is unhealthy instead of tying up a worker on doomed retries
+    return jsonify({'error': 'Upstream model unavailable, please retry later'}), 503, {'Retry-After': str(max(1, round(error.retry_after)))}
+
+@api_bp.errorhandler(RateLimitTimeoutError)
+def rate_limited(error):
+    # The model rate limit could not admit the call within its deadline
+    return jsonify({'error': 'Model rate limit reached, please retry later'}), 503, {'Retry-After': '1'}
+
+@api_bp.errorhandler(IngestBufferFullError)
+def ingest_backlogged(error):
+    # The database is not keeping up with buffered writes; shed load rather than grow the buffer without bound
+    return jsonify({'error': 'Too many pending writes, please retry later'}), 503, {'Retry-After': str(error.retry_after)}
+
+@api_bp.errorhandler(JobQueueFullError)
+def jobs_backlogged(error):
+    # Generation workers are not keeping up; shed load rather than queue jobs that would time out anyway
+    return jsonify({'error': 'Too many pending jobs, please retry later'}), 503, {'Retry-After': str(error.retry_after)}
+
+def ingest(model, data):
+    """
+    Queues a validated row on the app's write-behind buffer.
+
+    Callers that need the row to be persisted before the response can pass `?sync=true`.
+
+    Args:
+        model (type): The mapped model class.
+        data (dict): The validated column values.
+
+    Returns:
+        tuple: The row's ID and the response status, 201 if the row was written or 202 if it was queued.
+    """
+    buffer = get_buffer()
+    sync = buffer.mode == SYNC or request.args.get('sync', '').lower() == 'true'
+    with span('ingest'):
+        row_id = buffer.add(model, data, sync=sync)
+    return row_id, 201 if sync else 202
+
+# Background generation workers
+job_queue = JobQueue(
+    max_workers=int(os.getenv('GENERATION_WORKERS', '4')),
+    max_pending=int(os.getenv('GENERATION_MAX_PENDING', '0')) or None,
+    retry_after=int(os.getenv('GENERATION_RETRY_AFTER', '1'))
+)
+
+# Largest batch accepted by the bulk signup endpoint
+BULK_SIGNUP_MAX_USERS = int(os.getenv('BULK_SIGNUP_MAX_USERS', '1000'))
+
+# NDJSON bulk import: rows per INSERT, the longest accepted line, and the results kept in memory before spooling to disk
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv('BULK_IMPORT_CHUNK_SIZE', '1000'))
+BULK_IMPORT_MAX_LINE_BYTES = int(os.getenv('BULK_IMPORT_MAX_LINE_BYTES', '65536'))
+BULK_IMPORT_SPOOL_BYTES = int(os.getenv('BULK_IMPORT_SPOOL_BYTES', str(1024 * 1024)))
+
+# Iteration history pages: default and largest page size
+ITERATIONS_PAGE_SIZE = int(os.getenv('ITERATIONS_PAGE_SIZE', '50'))
+ITERATIONS_MAX_PAGE_SIZE = int(os.getenv('ITERATIONS_MAX_PAGE_SIZE', '200'))
+
+# Batch generation: item types, the fields each one takes, and the concurrency and size limits
+BATCH_GENERATORS = {
+    'chapter': (generate_chapter_content, ('title', 'previous_content', 'user_prompts')),
+    'character_profile': (generate_character_profile, ('character_name', 'traits', 'backstory')),
+    'plot_twist': (generate_plot_twist, ('current_plot', 'user_suggestions')),
+}
+BATCH_GENERATE_CONCURRENCY = int(os.getenv('BATCH_GENERATE_CONCURRENCY', '8'))
+BATCH_GENERATE_MAX_ITEMS = int(os.getenv('BATCH_GENERATE_MAX_ITEMS', '50'))
+BATCH_GENERATE_MAX_VARIANTS = int(os.getenv('BATCH_GENERATE_MAX_VARIANTS', '5'))
+
+# Bounded prompt context for novel iterations
+CONTEXT_PRIME_ITERATIONS = int(os.getenv('CONTEXT_PRIME_ITERATIONS', '20'))
+context_builder = ContextBuilder(
+    recent_iterations=int(os.getenv('CONTEXT_RECENT_ITERATIONS', '3')),
+    token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500')),
+    summary_tokens=int(os.getenv('CONTEXT_SUMMARY_TOKENS', '300')),
+    max_novels=int(os.getenv('CONTEXT_MAX_NOVELS', '1024'))
+)
+
+# Read-through cache of each novel's latest iteration, for polling clients
+head_cache = head_cache_from_env()
+
+def enqueue_job(kind, fn, *args):
+    """
+    Enqueue a generation job and build the 202 Accepted response for it.
+
+    Args:
+        kind (str): A short label describing the job.
+        fn (callable): The callable that performs the generation.
+        *args: Positional arguments for `fn`.
+
+    Returns:
+        Response: A JSON response containing the job ID, with a Location header pointing at the job status endpoint.
+    """
+    app = current_app._get_current_object()
+
+    def run(*args):
+        # Workers need an app context for the database session, which is removed when it ends
+        with app.app_context():
+            return fn(*args)
+
+    job_id = job_queue.submit(kind, run, *args, owner=current_principal())
+    return jsonify({'message': 'Generation job accepted.', 'job_id': job_id}), 202, {'Location': f'/api/v1/jobs/{job_id}'}
+
+def sse_event(data, event=None):
+    """
+    Format a Server-Sent Event.
+
+    Args:
+        data (dict): The JSON-serializable event payload.
+        event (str, optional): The event type. Defaults to None, which is the generic 'message' event.
+
+    Returns:
+        str: The encoded event.
+    """
+    prefix = f'event: {event}\n' if event else ''
+    return f'{prefix}data: {json.dumps(data)}\n\n'
+
+def sse_response(events):
+    """
+    Build a streaming text/event-stream response from an iterable of encoded events.
+
+    Args:
+        events (iterable): The encoded events to send.
+
+    Returns:
+        Response: The streaming response.
+    """
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/api/v1/user-inputs', methods=['POST'])
+@auth.login_required
+def collect_user_inputs():
+    """
+    Collect user inputs from the request and store them in the database.
+
+    This function expects a JSON payload in the request body that conforms to the UserInputSchema.
+    It validates the JSON data, queues it for a bulk insert, and returns a success message with the input ID.
+
+    Returns:
+        Response: A JSON response containing a success message and the input ID (202, or 201 once written in sync
+        mode), or an error message if validation fails.
+    """
+    json_data = request.get_json()
+    try:
+        with span('schema'):
+            data = load_user_input(json_data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    input_id, status = ingest(UserInput, data)
+    return jsonify({'message': 'User inputs successfully recorded.', 'input_id': str(input_id)}), status
+
+@api_bp.route('/api/v1/user-inputs/bulk', methods=['POST'])
+@auth.login_required
+def bulk_import_user_inputs():
+    """
+    Import user inputs from an NDJSON request body, one JSON object per line.
+
+    The body is read and validated line by line, and valid rows are inserted in chunks of BULK_IMPORT_CHUNK_SIZE
+    with one INSERT and commit each. The whole body is consumed before anything is sent back: a client that sends
+    its upload before reading the response would otherwise deadlock once both socket buffers fill. Per-line results
+    are spooled to a temporary file past BULK_IMPORT_SPOOL_BYTES, so memory use stays flat however large the upload is.
+
+    Returns:
+        Response: An NDJSON stream with {"line": n, "id": ...} or {"line": n, "error": ...} per non-blank input line,
+        ending with a {"inserted": ..., "rejected": ...} summary.
+    """
+    lines = iter_lines(request.stream, BULK_IMPORT_MAX_LINE_BYTES)
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_IMPORT_SPOOL_BYTES)
+    try:
+        for result in import_lines(db.session, UserInput, lines, load_user_input, BULK_IMPORT_CHUNK_SIZE):
+            spool.write(json.dumps(result).encode('utf-8') + b'\n')
+        spool.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    response = Response(iter(spool), mimetype='application/x-ndjson')
+    response.call_on_close(spool.close)
+    return response
+
+# Similarly update other endpoints with validation and authentication
+
+@api_bp.route('/api/v1/feedback', methods=['POST'])
+@auth.login_required
+def submit_feedback():
+    """
+    Submit feedback from the user and store it in the database.
+
+    This function expects a JSON payload in the request body that conforms to the FeedbackSchema.
+    It validates the JSON data, queues it for a bulk insert, and returns a success message with the feedback ID.
+
+    Returns:
+        Response: A JSON response containing a success message and the feedback ID (202, or 201 once written in sync
+        mode), or an error message if validation fails.
+    """
+    json_data = request.get_json()
+    try:
+        with span('schema'):
+            data = load_feedback(json_data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    feedback_id, status = ingest(Feedback, data)
+    return jsonify({'message': 'Feedback successfully recorded.', 'feedback_id': str(feedback_id)}), status
+
+@api_bp.route('/api/v1/generate-content', methods=['POST'])
+@auth.login_required
+def generate_content_endpoint():
+    """
+    Generate content based on user input.
+
+    This function expects a JSON payload in the request body with an 'input' field containing the user's input text.
+    It uses the `generate_content` function to generate new content based on the input text and returns the generated content.
+    If the payload sets 'async' to true, the generation is queued instead and a job ID is returned.
+
+    Returns:
+        Response: A JSON response containing the generated content (or the job ID in async mode), or an error message if the input is missing.
+    """
+    json_data = request.get_json()
+    input_text = json_data.get('input')
+    if not input_text:
+        return jsonify({'error': 'Input is required.'}), 400
+    if json_data.get('async'):
+        return enqueue_job('generate-content', lambda text: {'content': generate_content(text)}, input_text)
+    with span('generate_content'):
+        content = generate_content(input_text)
+    return jsonify({'content': content}), 200
+
+@api_bp.route('/api/v1/generate-content/stream', methods=['POST'])
+@auth.login_required
+def generate_content_stream_endpoint():
+    """
+    Generate content based on user input, streaming it as Server-Sent Events.
+
+    This function expects the same JSON payload as `generate_content_endpoint`. Each generated chunk is sent as a
+    'message' event with a 'content' field, followed by a 'done' event, or an 'error' event if generation fails.
+
+    Returns:
+        Response: A text/event-stream response, or an error message if the input is missing.
+    """
+    json_data = request.get_json()
+    input_text = json_data.get('input')
+    if not input_text:
+        return jsonify({'error': 'Input is required.'}), 400
+
+    def events():
+        try:
+            for chunk in generate_content_stream(input_text):
+                yield sse_event({'content': chunk})
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event({}, event='done')
+
+    return sse_response(events())
+
+def run_batch_item(index, item, default_n):
+    """
+    Run one item of a batch generation request.
+
+    Args:
+        index (int): The position of the item in the batch.
+        item (dict): The item, with a 'type' naming a generator, that generator's fields and an optional 'n'.
+        default_n (int): The number of variants to generate if the item does not set 'n'.
+
+    Returns:
+        dict: The item's index and type with either 'result' (or 'results' when n > 1) or 'error'.
+    """
+    item = item if isinstance(item, dict) else {}
+    kind = item.get('type')
+    result = {'index': index, 'type': kind}
+    if kind not in BATCH_GENERATORS:
+        return {**result, 'error': f"Unknown type. Expected one of: {', '.join(BATCH_GENERATORS)}."}
+    n = item.get('n', default_n)
+    if not is_integer(n) or not 1 <= n <= BATCH_GENERATE_MAX_VARIANTS:
+        return {**result, 'error': f'n must be between 1 and {BATCH_GENERATE_MAX_VARIANTS}.'}
+
+    generator, fields = BATCH_GENERATORS[kind]
+    # Fields are formatted into the prompt, so anything but text is rejected; missing ones are the generator's call
+    invalid = [field for field in fields if item.get(field) is not None and not isinstance(item[field], str)]
+    if invalid:
+        return {**result, 'error': f"Fields must be strings: {', '.join(invalid)}."}
+    try:
+        content = generator(*(item.get(field) for field in fields), n=n)
+    except (ValueError, RuntimeError) as e:
+        return {**result, 'error': str(e)}
+    return {**result, 'results': content} if n > 1 else {**result, 'result': content}
+
+@api_bp.route('/api/v1/batch-generate', methods=['POST'])
+@auth.login_required
+def batch_generate():
+    """
+    Run a batch of typed generation requests concurrently.
+
+    This function expects a JSON payload with an 'items' list. Each item has a 'type' ('chapter', 'character_profile'
+    or 'plot_twist') and that generator's fields, and may set 'n' to get several variants from a single model call.
+    A top-level 'n' sets the default for all items. Items run concurrently, at most BATCH_GENERATE_CONCURRENCY at a
+    time, and a failing item does not fail the batch.
+
+    Returns:
+        Response: A JSON response with a 'results' list in item order, each holding the item's 'result' (or
+        'results' when n > 1) or its 'error', or an error message if the items list is missing or too long or the
+        top-level 'n' is invalid.
+    """
+    json_data = request.get_json(silent=True) or {}
+    items = json_data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A non-empty items list is required.'}), 400
+    if len(items) > BATCH_GENERATE_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_GENERATE_MAX_ITEMS} items can be generated per request.'}), 400
+    default_n = json_data.get('n', 1)
+    if not is_integer(default_n) or not 1 <= default_n <= BATCH_GENERATE_MAX_VARIANTS:
+        return jsonify({'error': f'n must be between 1 and {BATCH_GENERATE_MAX_VARIANTS}.'}), 400
+
+    with ThreadPoolExecutor(max_workers=min(BATCH_GENERATE_CONCURRENCY, len(items))) as executor:
+        results = list(executor.map(run_batch_item, range(len(items)), items, [default_n] * len(items)))
+
+    failed = sum(1 for result in results if 'error' in result)
+    return jsonify({'succeeded': len(results) - failed, 'failed': failed, 'results': results}), 200
+
+@api_bp.route('/api/v1/novels', methods=['POST'])
+@auth.login_required
+def create_novel():
+    """
+    Create a new novel.
+
+    This function expects a JSON payload in the request body with a 'title' field. A novel created with a user's
+    bearer token is owned by that user.
+
+    Returns:
+        Response: A JSON response containing a success message and the novel ID, or an error message if the title is missing.
+    """
+    json_data = request.get_json()
+    title = json_data.get('title')
+    if not title:
+        return jsonify({'error': 'Title is required.'}), 400
+
+    session = db.session
+    novel = iterations.create_novel(session, title, owner_id=current_user_id())
+    session.commit()
+    return jsonify({'message': 'Novel created successfully.', 'novel_id': novel.id}), 201
+
+def is_integer(value):
+    """
+    Check whether a JSON value is an integer; JSON booleans arrive as bool, which Python counts as int.
+
+    Args:
+        value (object): The decoded JSON value.
+
+    Returns:
+        bool: True if the value is an int and not a bool.
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@api_bp.route('/api/v1/latest-iteration', methods=['GET'])
+@auth.login_required
+def get_latest_iteration():
+    """
+    Retrieve the latest iteration of a novel.
+
+    This function looks up the latest iteration through the head cache, which falls back to the novel's head pointer,
+    and returns its content. The novel is selected with the 'novel_id' query parameter and defaults to the default novel.
+
+    Returns:
+        Response: A JSON response containing the latest iteration's content and number, or an error message if no iterations are found.
+    """
+    novel_id = request.args.get('novel_id', DEFAULT_NOVEL_ID, type=int)
+    if not can_access_novel(novel_id):
+        return jsonify({'message': 'No iterations found.'}), 404
+    latest_iteration = head_cache.get(db.session, novel_id)
+    if (latest_iteration):
+        return jsonify({'message': 'Latest iteration retrieved successfully.', 'iteration': latest_iteration.content, 'iteration_number': latest_iteration.iteration_number}), 200
+    else:
+        return jsonify({'message': 'No iterations found.'}), 404
+
+def parse_non_negative_int(value):
+    """
+    Parse a query parameter holding a non-negative integer, accepting ASCII digits only.
+
+    Args:
+        value (str): The raw parameter.
+
+    Returns:
+        int: The value, or None if it is not a non-negative integer.
+    """
+    return int(value) if value.isascii() and value.isdigit() else None
+
+@api_bp.route('/api/v1/novels/<int:novel_id>/iterations', methods=['GET'])
+@auth.login_required
+def list_novel_iterations(novel_id):
+    """
+    List a novel's iterations, one page at a time.
+
+    Query parameters:
+        cursor (int, optional): The 'next_cursor' of the previous page.
+        limit (int, optional): The page size, up to ITERATIONS_MAX_PAGE_SIZE. Defaults to ITERATIONS_PAGE_SIZE.
+        fields (str, optional): Comma-separated fields to return, from id, iteration_number, content and created_at.
+            Defaults to all of them; leave out content for list views.
+        order (str, optional): 'asc' for oldest first or 'desc' for newest first. Defaults to 'asc'.
+
+    Iterations are append-only and the head row records the latest iteration number, so the ETag is derived from
+    it and the query parameters. A request whose If-None-Match matches gets a 304 after primary-key lookups of the
+    novel's owner and head, without reading any iterations.
+
+    Returns:
+        Response: A JSON response containing the iterations and the next page's cursor (None on the last page), a 304
+        if the page is unchanged, or an error message if the novel does not exist or a parameter is invalid.
+    """
+    # Parsed strictly rather than with type=int, which silently falls back to the default on bad input
+    cursor = request.args.get('cursor')
+    cursor = None if cursor is None else parse_non_negative_int(cursor)
+    if cursor is None and 'cursor' in request.args:
+        return jsonify({'error': 'Cursor must be a non-negative integer.'}), 400
+    limit = parse_non_negative_int(request.args.get('limit', str(ITERATIONS_PAGE_SIZE)))
+    order = request.args.get('order', 'asc')
+    fields = request.args.get('fields')
+    fields = tuple(iterations.ITERATION_FIELDS) if fields is None else tuple(field.strip() for field in fields.split(','))
+    unknown = [field for field in fields if field not in iterations.ITERATION_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}."}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': "Order must be 'asc' or 'desc'."}), 400
+    if limit is None or not 1 <= limit <= ITERATIONS_MAX_PAGE_SIZE:
+        return jsonify({'error': f'Limit must be between 1 and {ITERATIONS_MAX_PAGE_SIZE}.'}), 400
+
+    session = db.session
+    head_number = iterations.get_head_number(session, novel_id) if can_access_novel(novel_id) else None
+    if head_number is None:
+        return jsonify({'message': 'Novel not found.'}), 404
+
+    key = json.dumps([novel_id, head_number, cursor, limit, sorted(fields), order])
+    etag = hashlib.sha1(key.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
+    page, next_cursor = iterations.list_iterations(
+        session, novel_id, after=cursor, limit=limit, fields=fields, descending=order == 'desc'
+    )
+    response = jsonify({'iterations': page, 'next_cursor': next_cursor})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def build_iteration_prompt(session, novel_id, input_text):
+    """
+    Build the generation prompt for the next iteration from the novel's context and the user input.
+
+    The prompt holds the latest iteration, trimmed to the context token budget with a rolling summary of older
+    iterations in place of its start if it is longer, so it is never larger than the latest iteration alone.
+    If another worker has stored iterations since this process last saw the novel, its context is reloaded
+    from the most recent iterations first.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        input_text (str): The user's input text.
+
+    Returns:
+        tuple: The latest iteration (or None), the prompt, and a dict with the prompt's estimated token count
+            and the tokens saved compared with sending only the latest iteration.
+    """
+    latest_iteration = iterations.get_latest_iteration(session, novel_id)
+    latest_id = latest_iteration.id if latest_iteration else None
+    if context_builder.version(novel_id) != latest_id:
+        contents = iterations.get_recent_contents(session, novel_id, CONTEXT_PRIME_ITERATIONS)
+        context_builder.load(novel_id, contents, version=latest_id)
+    prompt, stats = context_builder.build_prompt(novel_id, input_text)
+    logger.info('Iteration prompt uses %d tokens, saving %d', stats['prompt_tokens'], stats['tokens_saved'])
+    return latest_iteration, prompt, stats
+
+def store_iteration(session, novel_id, latest_iteration, content):
+    """
+    Store generated content as the next iteration of a novel.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        latest_iteration (NovelIteration): The iteration the content was generated from, or None.
+        content (str): The generated content.
+
+    Returns:
+        NovelIteration: The new iteration.
+    """
+    new_iteration = iterations.append_iteration(session, novel_id, content)
+    session.commit()
+    head_cache.put(novel_id, Head(new_iteration.id, new_iteration.iteration_number, content))
+    # Only extend the cached context if it was built from the iteration this one follows
+    if context_builder.version(novel_id) == (latest_iteration.id if latest_iteration else None):
+        context_builder.record_iteration(novel_id, content, version=new_iteration.id)
+    return new_iteration
+
+def create_iteration(novel_id, input_text):
+    """
+    Generate and store a new iteration of a novel from its context and the user input.
+
+    Args:
+        novel_id (int): The ID of the novel.
+        input_text (str): The user's input text.
+
+    Returns:
+        dict: The ID and number of the new iteration, the prompt's estimated token count and the tokens saved.
+    """
+    session = db.session
+    latest_iteration, prompt, stats = build_iteration_prompt(session, novel_id, input_text)
+    with span('generate_content'):
+        new_content = generate_content(prompt)
+    new_iteration = store_iteration(session, novel_id, latest_iteration, new_content)
+    return {'iteration_id': new_iteration.id, 'iteration_number': new_iteration.iteration_number, **stats}
+
+@api_bp.route('/api/v1/iterate-novel', methods=['POST'])
+@auth.login_required
+def iterate_novel():
+    """
+    Generate a new iteration of the novel based on user input and the current state.
+
+    This function expects a JSON payload in the request body with an 'input' field containing the user's input text,
+    and an optional 'novel_id' field selecting the novel (the default novel if omitted).
+    It builds a bounded prompt from the novel's latest iteration (with a rolling summary if that is trimmed) and the user input, and generates new content using the `generate_content` function.
+    The new content is then stored as the novel's next iteration in the database.
+    If the payload sets 'async' to true, the iteration is queued instead and a job ID is returned.
+
+    Args:
+        json_data (dict): The JSON payload from the request containing the user's input text.
+
+    Returns:
+        Response: A JSON response containing a success message, the new iteration ID and number and the prompt's token usage and savings (or the job ID in async mode), or an error message if the input is missing, the novel ID is not an integer, the novel does not exist or content generation fails.
+    """
+    json_data = request.get_json()
+    input_text = json_data.get('input')
+    if not input_text:
+        return jsonify({'error': 'Input is required.'}), 400
+    novel_id = json_data.get('novel_id', DEFAULT_NOVEL_ID)
+    if not is_integer(novel_id):
+        return jsonify({'error': 'Novel ID must be an integer.'}), 400
+    if not can_access_novel(novel_id, create_default=True):
+        return jsonify({'error': 'Novel not found.'}), 404
+    if json_data.get('async'):
+        return enqueue_job('iterate-novel', create_iteration, novel_id, input_text)
+
+    try:
+        result = create_iteration(novel_id, input_text)
+    except (CircuitOpenError, RateLimitTimeoutError):
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({'message': 'New iteration generated successfully.', **result}), 201
+
+@api_bp.route('/api/v1/iterate-novel/stream', methods=['POST'])
+@auth.login_required
+def iterate_novel_stream():
+    """
+    Generate a new iteration of the novel, streaming it as Server-Sent Events.
+
+    This function expects the same JSON payload as `iterate_novel`. Each generated chunk is sent as a 'message' event
+    with a 'content' field. Once the stream completes, the full text is stored as a new iteration and a 'done' event
+    carrying the new iteration ID and number is sent. If generation fails, an 'error' event is sent and nothing is stored.
+
+    Returns:
+        Response: A text/event-stream response, or an error message if the input is missing, the novel ID is not an
+        integer or the novel does not exist.
+    """
+    json_data = request.get_json()
+    input_text = json_data.get('input')
+    if not input_text:
+        return jsonify({'error': 'Input is required.'}), 400
+    novel_id = json_data.get('novel_id', DEFAULT_NOVEL_ID)
+    if not is_integer(novel_id):
+        return jsonify({'error': 'Novel ID must be an integer.'}), 400
+    if not can_access_novel(novel_id, create_default=True):
+        return jsonify({'error': 'Novel not found.'}), 404
+
+    def events():
+        session = db.session
+        try:
+            latest_iteration, prompt, _ = build_iteration_prompt(session, novel_id, input_text)
+            chunks = []
+            for chunk in generate_content_stream(prompt):
+                chunks.append(chunk)
+                yield sse_event({'content': chunk})
+            new_iteration = store_iteration(session, novel_id, latest_iteration, ''.join(chunks).strip())
+            done = {'iteration_id': new_iteration.id, 'iteration_number': new_iteration.iteration_number}
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event({'error': str(e)}, event='error')
+            return
+        yield sse_event(done, event='done')
+
+    return sse_response(events())
+
+@api_bp.route('/api/v1/admin/pool', methods=['GET'])
+@auth.login_required(role='admin')
+def get_pool_stats():
+    """
+    Retrieve the database connection pool statistics.
+
+    Returns:
+        Response: A JSON response containing the pool size, checked-in, checked-out and overflow connections, checkout
+        wait times, and the write-behind buffer's pending rows and flush counters under 'ingest'.
+    """
+    return jsonify({**pool_stats(db.engine), 'ingest': get_buffer().stats()}), 200
+
+@api_bp.route('/api/v1/admin/cache', methods=['GET'])
+@auth.login_required(role='admin')
+def get_cache_stats():
+    """
+    Retrieve the cache statistics.
+
+    Returns:
+        Response: A JSON response containing the head iteration cache's entries, hits, misses, revalidations and hit
+        ratio under 'head', and the model response cache's counters under 'responses'.
+    """
+    return jsonify({
+        'head': head_cache.stats(),
+        'responses': openai_client.cache.stats() if openai_client.cache is not None else None,
+    }), 200
+
+@api_bp.route('/api/v1/admin/upstream', methods=['GET'])
+@auth.login_required(role='admin')
+def get_upstream_stats():
+    """
+    Retrieve the health of the upstream model client.
+
+    Returns:
+        Response: A JSON response containing the retry counters, the circuit breaker state, the rate scheduler's
+        admissions and queue-time latency under 'rate_limit', the HTTP connection reuse counters under 'http', and
+        the executions, coalesced callers and in-flight calls of identical-request coalescing under 'single_flight'.
+    """
+    return jsonify({
+        **upstream.stats(),
+        'rate_limit': scheduler.stats() if scheduler is not None else None,
+        'http': openai_client.session.stats() if openai_client.session is not None else None,
+        'single_flight': openai_client.single_flight.stats() if openai_client.single_flight is not None else None,
+    }), 200
+
+@api_bp.route('/api/v1/admin/users/bulk', methods=['POST'])
+@auth.login_required(role='admin')
+def bulk_signup():
+    """
+    Import a batch of users with a single uniqueness query and a single executemany insert.
+
+    Request body:
+        users (list): Objects with 'username', 'email' and 'password' keys.
+
+    Returns:
+        Response: A JSON response with the number of users created and a per-row result, each either
+        {"index": i, "status": "created"} or {"index": i, "error": message}.
+    """
+    data = request.get_json(silent=True) or {}
+    rows = data.get('users')
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'error': 'A non-empty users list is required.'}), 400
+    if len(rows) > BULK_SIGNUP_MAX_USERS:
+        return jsonify({'error': f'At most {BULK_SIGNUP_MAX_USERS} users can be imported per request.'}), 400
+
+    errors = validate_signups(rows)
+    valid = [
+        (index, {field: row[field].strip() for field in ('username', 'email', 'password')})
+        for index, (row, error) in enumerate(zip(rows, errors)) if error is None
+    ]
+
+    if valid:
+        try:
+            hashes = password_hasher.hash_many([user['password'] for _, user in valid])
+        except HasherSaturatedError as e:
+            return jsonify({'error': 'Server busy, please retry later'}), 503, {'Retry-After': str(e.retry_after)}
+        for (_, user), password_hash in zip(valid, hashes):
+            user['password_hash'] = password_hash
+        try:
+            conflicts = user_accounts.bulk_create_users(db.session, [user for _, user in valid])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'Some users were created concurrently. Retry the batch.'}), 400
+        for (index, _), conflict in zip(valid, conflicts):
+            errors[index] = conflict
+
+    results = [
+        {'index': index, 'error': error} if error else {'index': index, 'status': 'created'}
+        for index, error in enumerate(errors)
+    ]
+    created = sum(1 for error in errors if error is None)
+    return jsonify({'created': created, 'results': results}), 200
+
+@api_bp.route('/api/v1/jobs/<job_id>', methods=['GET'])
+@auth.login_required
+def get_job(job_id):
+    """
+    Retrieve the status of a queued generation job.
+
+    Only the caller who submitted the job, or an administrator, can see it.
+
+    Returns:
+        Response: A JSON response containing the job status, result and error, or an error message if the job is unknown.
+    """
+    job = job_queue.get(job_id)
+    if job is None or not (is_admin() or job['owner'] == current_principal()):
+        return jsonify({'message': 'Job not found.'}), 404
+    del job['owner']
+    return jsonify(job), 200
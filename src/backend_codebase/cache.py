@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty, n=1):
+    """
+    Builds a content-addressed cache key for a chat completion request.
+
+    Args:
+    model (str): The model used for the completion.
+    messages (list): The messages sent to the model.
+    temperature (float): Sampling temperature.
+    max_tokens (int): Maximum number of tokens to generate.
+    top_p (float): Nucleus sampling probability.
+    frequency_penalty (float): Frequency penalty.
+    presence_penalty (float): Presence penalty.
+    n (int, optional): The number of choices requested. Defaults to 1, which leaves the key unchanged.
+
+    Returns:
+    str: The SHA-256 hex digest of the canonical request.
+    """
+    request = [model, messages, temperature, max_tokens, top_p, frequency_penalty, presence_penalty]
+    payload = json.dumps(
+        request + [n] if n != 1 else request,
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Base class for generation response caches.
+
+    Subclasses implement `_get`, `_set` and `_clear`; this class keeps the hit, miss and eviction counters.
+
+    Attributes:
+    max_entries (int): The maximum number of cached responses.
+    ttl (float): Time-to-live of a cached response in seconds, or None to never expire.
+    """
+    backend = None
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Looks up a cached response.
+
+        Args:
+        key (str): The cache key.
+
+        Returns:
+        str: The cached response, or None on a miss.
+        """
+        with self._lock:
+            value = self._get(key, time.time())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a response, evicting the least recently used entries if the cache is full.
+
+        Args:
+        key (str): The cache key.
+        value (str): The response to cache.
+        """
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self.evictions += self._set(key, value, now, expires_at)
+
+    def clear(self):
+        """
+        Removes every cached response.
+        """
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        dict: The backend name, number of entries, hits, misses and evictions.
+        """
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'entries': self._size(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class MemoryCache(ResponseCache):
+    """
+    An in-memory LRU response cache.
+    """
+    backend = 'memory'
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        super().__init__(max_entries, ttl)
+        self._entries = OrderedDict()
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value, now, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def _clear(self):
+        self._entries.clear()
+
+    def _size(self):
+        return len(self._entries)
+
+
+class SQLiteCache(ResponseCache):
+    """
+    A disk-backed LRU response cache stored in a SQLite database, shared by every process using the same file.
+    """
+    backend = 'sqlite'
+
+    def __init__(self, path, max_entries=10000, ttl=86400):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)')
+
+    def _get(self, key, now):
+        row = self._connection.execute('SELECT value, expires_at FROM response_cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            self._connection.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+            return None
+        self._connection.execute('UPDATE response_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return value
+
+    def _set(self, key, value, now, expires_at):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, value, expires_at, now)
+        )
+        excess = self._size() - self.max_entries
+        if excess <= 0:
+            return 0
+        self._connection.execute(
+            'DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)',
+            (excess,)
+        )
+        return excess
+
+    def _clear(self):
+        self._connection.execute('DELETE FROM response_cache')
+
+    def _size(self):
+        return self._connection.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+
+
+def cache_from_env():
+    """
+    Builds the response cache configured by the AI_CACHE_* environment variables.
+
+    AI_CACHE_BACKEND selects 'memory' (the default), 'sqlite' or 'none'. AI_CACHE_MAX_ENTRIES and AI_CACHE_TTL
+    bound its size and entry lifetime, and AI_CACHE_PATH sets the SQLite database file.
+
+    Returns:
+    ResponseCache: The configured cache, or None if caching is disabled.
+    """
+    backend = os.getenv('AI_CACHE_BACKEND', 'memory')
+    ttl = float(os.getenv('AI_CACHE_TTL', '3600'))
+    if backend == 'memory':
+        return MemoryCache(max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '1024')), ttl=ttl)
+    if backend == 'sqlite':
+        return SQLiteCache(
+            os.getenv('AI_CACHE_PATH', 'ai_cache.sqlite3'),
+            max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', '10000')),
+            ttl=ttl
+        )
+    return None
@@ -0,0 +1,185 @@
+import re
+import threading
+from collections import OrderedDict, deque
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """
+    Estimates the number of model tokens in a text, at roughly four characters per token.
+
+    Args:
+    text (str): The text to measure.
+
+    Returns:
+    int: The estimated token count.
+    """
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, tokens):
+    """
+    Trims a text to an estimated token count, keeping its end.
+
+    Args:
+    text (str): The text to trim.
+    tokens (int): The maximum number of tokens to keep.
+
+    Returns:
+    str: The trimmed text.
+    """
+    if estimate_tokens(text) <= tokens:
+        return text
+    return text[-tokens * 4:] if tokens > 0 else ''
+
+
+def first_sentence_summarizer(summary, content):
+    """
+    Folds an iteration into the running summary by appending its first sentence.
+
+    Args:
+    summary (str): The current summary.
+    content (str): The content of the iteration leaving the recent window.
+
+    Returns:
+    str: The updated summary.
+    """
+    sentence = _SENTENCE_END.split(content.strip(), 1)[0]
+    return f"{summary} {sentence}".strip()
+
+
+class NovelContext:
+    """
+    The rolling context of a single novel.
+
+    Attributes:
+    summary (str): A summary of the iterations older than the recent window.
+    recent (deque): The contents of the most recent iterations, oldest first.
+    version (object): An identifier of the latest iteration folded into this context.
+    """
+    def __init__(self, recent_iterations):
+        self.summary = ''
+        self.recent = deque(maxlen=recent_iterations)
+        self.version = None
+
+
+class ContextBuilder:
+    """
+    Builds bounded generation prompts from the latest iteration of each novel plus a rolling summary of older ones.
+
+    When an iteration is recorded it enters the recent window; the iteration it pushes out of the window is
+    folded into the summary by the summarizer. A prompt never costs more than sending the latest iteration alone:
+    a latest iteration within the token budget is sent as is, and a longer one is trimmed to the budget, keeping
+    its end, with the summary standing in for the trimmed start. Contexts are kept for the `max_novels` most recently used novels;
+    an evicted novel is reloaded from the database on its next iteration.
+
+    Attributes:
+    recent_iterations (int): The number of latest iterations kept before the oldest is folded into the summary.
+    token_budget (int): The maximum estimated tokens of context (summary plus latest iteration) in a prompt.
+    summary_tokens (int): The maximum estimated tokens of the stored summary.
+    summarizer (callable): Folds an iteration into the summary, taking the summary and the iteration content.
+    max_novels (int): The maximum number of novel contexts kept.
+    """
+    def __init__(self, recent_iterations=3, token_budget=1500, summary_tokens=300, summarizer=None, max_novels=1024):
+        self.recent_iterations = recent_iterations
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or first_sentence_summarizer
+        self.max_novels = max_novels
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, key):
+        """
+        Returns the version of the latest iteration recorded for a novel.
+
+        Args:
+        key (object): The novel key.
+
+        Returns:
+        object: The version passed with the latest recorded iteration, or None if the novel is not loaded.
+        """
+        with self._lock:
+            context = self._contexts.get(key)
+            return context.version if context else None
+
+    def load(self, key, contents, version=None):
+        """
+        Rebuilds the context of a novel from its iterations, replacing any existing context.
+
+        Args:
+        key (object): The novel key.
+        contents (list): The iteration contents, oldest first.
+        version (object, optional): An identifier of the latest iteration. Defaults to None.
+        """
+        context = NovelContext(self.recent_iterations)
+        for content in contents:
+            self._fold(context, content)
+        context.version = version
+        with self._lock:
+            self._store(key, context)
+
+    def record_iteration(self, key, content, version=None):
+        """
+        Adds a newly stored iteration to the context of a novel.
+
+        Args:
+        key (object): The novel key.
+        content (str): The content of the new iteration.
+        version (object, optional): An identifier of the new iteration. Defaults to None.
+        """
+        with self._lock:
+            context = self._contexts.get(key) or NovelContext(self.recent_iterations)
+            self._fold(context, content)
+            context.version = version
+            self._store(key, context)
+
+    def build_prompt(self, key, input_text):
+        """
+        Builds the prompt for the next iteration of a novel.
+
+        Args:
+        key (object): The novel key.
+        input_text (str): The user's input text.
+
+        Returns:
+        tuple: The prompt and a dict with its estimated 'prompt_tokens' and the 'tokens_saved' compared with the
+            previous prompt, which sent only the latest iteration; never negative.
+        """
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is None:
+                context = NovelContext(self.recent_iterations)
+            else:
+                self._contexts.move_to_end(key)
+            summary, latest = context.summary, context.recent[-1] if context.recent else ''
+
+        previous_prompt = f"Current state: {latest}\nUser input: {input_text}"
+        # Never spend more on context than the previous prompt spent on the latest iteration, so prompts never grow
+        if estimate_tokens(latest) <= self.token_budget:
+            prompt = previous_prompt
+        else:
+            summary = truncate_to_tokens(summary, self.token_budget // 2)
+            current_state = truncate_to_tokens(latest, self.token_budget - estimate_tokens(summary))
+            prompt = f"Current state: {current_state}\nUser input: {input_text}"
+            if summary:
+                prompt = f"Summary so far: {summary}\n{prompt}"
+            if estimate_tokens(prompt) > estimate_tokens(previous_prompt):
+                # The latest iteration is only just over budget, so trimming it saved less than the summary costs
+                prompt = f"Current state: {truncate_to_tokens(latest, self.token_budget)}\nUser input: {input_text}"
+
+        prompt_tokens = estimate_tokens(prompt)
+        return prompt, {'prompt_tokens': prompt_tokens, 'tokens_saved': estimate_tokens(previous_prompt) - prompt_tokens}
+
+    def _store(self, key, context):
+        self._contexts[key] = context
+        self._contexts.move_to_end(key)
+        while len(self._contexts) > self.max_novels:
+            self._contexts.popitem(last=False)
+
+    def _fold(self, context, content):
+        if len(context.recent) == context.recent.maxlen:
+            summary = self.summarizer(context.summary, context.recent[0])
+            context.summary = truncate_to_tokens(summary, self.summary_tokens)
+        context.recent.append(content)
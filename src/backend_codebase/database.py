@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A QueuePool that records how long checkouts wait for a connection, and how long new connections take to open.
+
+    The wait of a checkout excludes the time spent opening a new connection for it, which is counted separately.
+
+    Attributes:
+    checkouts (int): The number of connections checked out.
+    wait_time_total (float): The total seconds spent waiting for connections.
+    wait_time_max (float): The longest wait for a single connection, in seconds.
+    connects (int): The number of new connections opened, including failed attempts.
+    connect_time_total (float): The total seconds spent opening new connections.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.connects = 0
+        self.connect_time_total = 0.0
+        self._stats_lock = threading.Lock()
+        self._checkout = threading.local()
+
+    def _do_get(self):
+        checkout = self._checkout
+        if getattr(checkout, 'active', False):
+            # QueuePool retries by calling _do_get again; the outer call is already timing this checkout
+            return super()._do_get()
+        checkout.active, checkout.connect_time = True, 0.0
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start - checkout.connect_time
+            checkout.active = False
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - start
+            if getattr(self._checkout, 'active', False):
+                self._checkout.connect_time += elapsed
+            with self._stats_lock:
+                self.connects += 1
+                self.connect_time_total += elapsed
+
+
+def pool_options_from_env():
+    """
+    Reads the connection pool settings from the DB_POOL_* environment variables.
+
+    Returns:
+    dict: Keyword arguments for `engine_options`.
+    """
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+
+
+def engine_options(url, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True):
+    """
+    Builds the engine options for a tuned, instrumented connection pool.
+
+    An in-memory SQLite database is a single connection shared by every thread, so no pool options are returned
+    for it and Flask-SQLAlchemy's StaticPool default applies.
+
+    Args:
+    url (str): The database URL.
+    pool_size (int, optional): Connections kept open in the pool. Defaults to 10.
+    max_overflow (int, optional): Extra connections allowed beyond `pool_size` under load. Defaults to 20.
+    pool_timeout (float, optional): Seconds to wait for a connection before giving up. Defaults to 30.
+    pool_recycle (int, optional): Seconds after which a connection is replaced. Defaults to 1800.
+    pool_pre_ping (bool, optional): Whether to test connections before handing them out. Defaults to True.
+
+    Returns:
+    dict: Keyword arguments for `create_engine`, suitable for SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    if url == 'sqlite:///:memory:':
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': pool_timeout,
+        'pool_recycle': pool_recycle,
+        'pool_pre_ping': pool_pre_ping,
+    }
+
+
+def pool_stats(engine):
+    """
+    Returns the statistics of an engine's connection pool.
+
+    Args:
+    engine (Engine): The engine to inspect.
+
+    Returns:
+    dict: The pool class, size, checked-in, checked-out and overflow connections, checkout wait times and
+        connection open times.
+    """
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'wait_time_total': pool.wait_time_total,
+                'wait_time_max': pool.wait_time_max,
+                'connects': pool.connects,
+                'connect_time_total': pool.connect_time_total,
+            })
+    return stats
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from . import iterations
+
+# The cached head iteration of a novel
+Head = namedtuple('Head', ['id', 'iteration_number', 'content'])
+
+
+class HeadCache:
+    """
+    A read-through cache of the latest iteration of each novel.
+
+    The head row's iteration number is a version counter that every process increments when it appends an iteration.
+    A cached head is served without a query until it is `revalidate_after` seconds old. After that, a primary-key
+    lookup of that counter either confirms the entry or reloads it. Other workers' writes are therefore seen within
+    `revalidate_after` seconds, and this process's own writes straight away through `put`. Entries are reloaded
+    after `ttl` seconds regardless, as a safety net.
+
+    Attributes:
+    ttl (float): The longest an entry is served, in seconds.
+    revalidate_after (float): How long an entry is served before its version is checked, in seconds. 0 checks on
+        every read.
+    max_entries (int): The maximum number of cached novels.
+    """
+    def __init__(self, ttl=300, revalidate_after=1.0, max_entries=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.revalidate_after = revalidate_after
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'invalidations': 0}
+
+    def get(self, session, novel_id):
+        """
+        Returns the head iteration of a novel, from the cache if it is still current.
+
+        Args:
+        session (Session): The database session, used on a miss or a revalidation.
+        novel_id (int): The ID of the novel.
+
+        Returns:
+        Head: The latest iteration, or None if the novel has none.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(novel_id)
+            if entry is not None:
+                self._entries.move_to_end(novel_id)
+        if entry is not None:
+            head, loaded_at, checked_at = entry
+            if now - loaded_at < self.ttl:
+                if now - checked_at < self.revalidate_after:
+                    return self._hit(head)
+                if iterations.get_head_number(session, novel_id) == head.iteration_number:
+                    with self._lock:
+                        self._stats['revalidations'] += 1
+                        if self._entries.get(novel_id) is entry:
+                            self._entries[novel_id] = (head, loaded_at, now)
+                    return self._hit(head)
+                with self._lock:
+                    if self._entries.get(novel_id) is entry:
+                        del self._entries[novel_id]
+
+        with self._lock:
+            self._stats['misses'] += 1
+        iteration = iterations.get_latest_iteration(session, novel_id)
+        if iteration is None:
+            return None
+        head = Head(iteration.id, iteration.iteration_number, iteration.content)
+        self.put(novel_id, head)
+        return head
+
+    def put(self, novel_id, head):
+        """
+        Stores the head iteration of a novel, e.g. right after committing a new iteration. An entry is never replaced
+        by an older iteration.
+
+        Args:
+        novel_id (int): The ID of the novel.
+        head (Head or Iteration): The latest iteration.
+        """
+        head = Head(head.id, head.iteration_number, head.content)
+        now = self.clock()
+        with self._lock:
+            current = self._entries.get(novel_id)
+            if current is not None and current[0].iteration_number > head.iteration_number:
+                return
+            self._entries[novel_id] = (head, now, now)
+            self._entries.move_to_end(novel_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, novel_id=None):
+        """
+        Drops the cached head of a novel, or of every novel.
+
+        Args:
+        novel_id (int, optional): The ID of the novel. Defaults to None, which clears the cache.
+        """
+        with self._lock:
+            self._stats['invalidations'] += 1
+            if novel_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(novel_id, None)
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns:
+        dict: The number of entries, hits, misses, revalidations, invalidations and the hit ratio.
+        """
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'entries': len(self._entries),
+                **self._stats,
+                'hit_ratio': round(self._stats['hits'] / lookups, 4) if lookups else None,
+            }
+
+    def _hit(self, head):
+        with self._lock:
+            self._stats['hits'] += 1
+        return head
+
+
+def head_cache_from_env():
+    """
+    Builds the head cache configured by HEAD_CACHE_TTL, HEAD_CACHE_REVALIDATE_SECONDS and HEAD_CACHE_MAX_ENTRIES.
+
+    Returns:
+    HeadCache: The configured cache.
+    """
+    return HeadCache(
+        ttl=float(os.getenv('HEAD_CACHE_TTL', '300')),
+        revalidate_after=float(os.getenv('HEAD_CACHE_REVALIDATE_SECONDS', '1.0')),
+        max_entries=int(os.getenv('HEAD_CACHE_MAX_ENTRIES', '1024'))
+    )
@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionCounter:
+    """
+    Thread-safe counters of requests sent and connections opened by a session.
+
+    Attributes:
+    requests (int): The number of requests sent.
+    connections (int): The number of new connections opened.
+    """
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _counting_pool(base, counter, local):
+    class CountingPool(base):
+        def _new_conn(self):
+            counter.count('connections')
+            return super()._new_conn()
+
+        def _get_conn(self, timeout=None):
+            # requests never passes a pool timeout, so a blocking pool would wait forever for a free connection
+            return super()._get_conn(timeout=getattr(local, 'pool_timeout', None) if timeout is None else timeout)
+    return CountingPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter with a bounded keep-alive pool, explicit connect and read timeouts, and connection counters.
+
+    Attributes:
+    connect_timeout (float): Seconds allowed to establish a connection.
+    read_timeout (float): The longest wait between bytes of a response, in seconds. A shorter timeout passed by
+        the caller wins.
+    pool_timeout (float): The longest wait for a free pooled connection, in seconds. A shorter timeout passed by
+        the caller (the remaining deadline) wins; running out raises requests' ConnectionError, which is retried as
+        a transient failure.
+    counter (ConnectionCounter): Requests sent and connections opened through this adapter.
+    """
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=120.0, pool_timeout=10.0, counter=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self.counter = counter or ConnectionCounter()
+        self._local = threading.local()
+        # Retries are handled by the resilience layer, and pool_block caps sockets at pool_size under load
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self.counter, self._local),
+            'https': _counting_pool(HTTPSConnectionPool, self.counter, self._local),
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        self._local.pool_timeout = self.pool_timeout if read_timeout is None else min(read_timeout, self.pool_timeout)
+        read_timeout = self.read_timeout if read_timeout is None else min(read_timeout, self.read_timeout)
+        self.counter.count('requests')
+        try:
+            return super().send(request, timeout=(self.connect_timeout, read_timeout), **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+
+
+class PooledSession(requests.Session):
+    """
+    A requests session shared by every thread, keeping upstream connections alive between calls.
+
+    The openai library closes its per-thread session every few minutes; for a shared session that would drop every
+    pooled connection, so `close` is a no-op and `shutdown` releases the pool instead.
+
+    Attributes:
+    adapter (PooledAdapter): The adapter mounted for both http and https.
+    """
+    def __init__(self, pool_size=10, connect_timeout=5.0, read_timeout=120.0, pool_timeout=10.0):
+        super().__init__()
+        self.adapter = PooledAdapter(pool_size, connect_timeout, read_timeout, pool_timeout)
+        self.mount('https://', self.adapter)
+        self.mount('http://', self.adapter)
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        """
+        Closes every pooled connection.
+        """
+        super().close()
+
+    def stats(self):
+        """
+        Returns the connection reuse counters.
+
+        Returns:
+        dict: The pool size, requests sent, connections opened and requests served on a reused connection.
+        """
+        counter = self.adapter.counter
+        with counter._lock:
+            requests_sent, connections = counter.requests, counter.connections
+        return {
+            'pool_size': self.adapter._pool_maxsize,
+            'requests': requests_sent,
+            'connections_opened': connections,
+            'connections_reused': max(requests_sent - connections, 0),
+        }
+
+
+def enable_http2():
+    """
+    Switches urllib3 to HTTP/2 for HTTPS connections, if the optional `h2` package is installed.
+
+    This is process-wide and experimental in urllib3, so it is opt-in.
+
+    Returns:
+    bool: True if HTTP/2 was enabled.
+    """
+    try:
+        import h2  # noqa: F401
+        from urllib3.http2 import inject_into_urllib3
+    except ImportError:
+        logger.warning('UPSTREAM_HTTP2 is set but HTTP/2 support is unavailable (pip install h2); using HTTP/1.1.')
+        return False
+    inject_into_urllib3()
+    return True
+
+
+def session_from_env():
+    """
+    Builds the pooled upstream session configured by the UPSTREAM_HTTP_* environment variables.
+
+    Returns:
+    PooledSession: The configured session.
+    """
+    if os.getenv('UPSTREAM_HTTP2', 'false').lower() == 'true':
+        enable_http2()
+    return PooledSession(
+        pool_size=int(os.getenv('UPSTREAM_HTTP_POOL_SIZE', '10')),
+        connect_timeout=float(os.getenv('UPSTREAM_HTTP_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('UPSTREAM_HTTP_READ_TIMEOUT', '120')),
+        pool_timeout=float(os.getenv('UPSTREAM_HTTP_POOL_TIMEOUT', '10'))
+    )
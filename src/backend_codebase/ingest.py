@@ -0,0 +1,351 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from flask import current_app
+from marshmallow import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DisconnectionError, OperationalError, SQLAlchemyError, TimeoutError as PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+BUFFERED = 'buffered'
+SYNC = 'sync'
+
+
+class IngestBufferFullError(Exception):
+    """
+    Raised when too many rows are waiting to be written and the request should be retried later.
+
+    Attributes:
+    retry_after (int): Suggested number of seconds to wait before retrying.
+    """
+    def __init__(self, retry_after):
+        super().__init__('Ingestion buffer is full.')
+        self.retry_after = retry_after
+
+
+def new_row(data):
+    """
+    Returns a copy of `data` with a client-generated 'id' and a 'created_at' timestamp, unless it already has them.
+    """
+    return {'id': uuid.uuid4(), 'created_at': datetime.now(timezone.utc), **data}
+
+
+def _is_transient(error):
+    # The database being unreachable says nothing about the rows, which are kept until it is back
+    return isinstance(error, (OperationalError, DisconnectionError, PoolTimeoutError)) or getattr(
+        error, 'connection_invalidated', False
+    )
+
+
+class WriteBehindBuffer:
+    """
+    Collects validated rows in memory and writes them in bulk inserts.
+
+    Rows are flushed by a background thread once `flush_size` rows are waiting or `flush_interval` seconds have
+    passed, and on shutdown. Each flush writes every pending row of a model with one executemany INSERT and commit.
+    Rows get their UUID and timestamp when they are added, so callers can return the ID straight away. In sync
+    mode, or when a caller asks for it, rows are written before `add` returns.
+
+    If a bulk insert is rejected, its rows are retried one by one so a bad row cannot hold back the others. A row
+    the database keeps rejecting is dropped to `dead_letters` and logged after `max_attempts` flushes. While the
+    database is unreachable, rows are kept without using up their attempts.
+
+    Attributes:
+    mode (str): BUFFERED or SYNC.
+    flush_size (int): Pending rows that trigger a flush.
+    flush_interval (float): The longest a row waits before being flushed, in seconds.
+    max_pending (int): Pending rows beyond which `add` fails fast with IngestBufferFullError.
+    max_attempts (int): Flushes a rejected row is tried in before it is dead-lettered.
+    dead_letters (deque): The most recent dead-lettered (table name, row, error) tuples.
+    """
+    def __init__(self, app, db, mode=BUFFERED, flush_size=500, flush_interval=1.0, max_pending=None, max_attempts=3):
+        self.app = app
+        self.db = db
+        self.mode = mode
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending or flush_size * 20
+        self.max_attempts = max_attempts
+        self.dead_letters = deque(maxlen=100)
+        self._pending = {}
+        self._count = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._stats = {'rows_written': 0, 'flushes': 0, 'failures': 0, 'dead_lettered': 0}
+
+    def add(self, model, row, sync=None):
+        """
+        Queues a row for insertion, or writes it immediately in sync mode.
+
+        Args:
+        model (type): The mapped model class, e.g. UserInput.
+        row (dict): The column values. An 'id' and 'created_at' are filled in if missing.
+        sync (bool, optional): True to write before returning, False to buffer. Defaults to the buffer's mode.
+
+        Returns:
+        uuid.UUID: The ID of the row.
+
+        Raises:
+        IngestBufferFullError: If the buffer is full.
+        """
+        row = new_row(row)
+        if sync if sync is not None else self.mode == SYNC:
+            session = self.db.session
+            session.execute(insert(model), [row])
+            session.commit()
+            return row['id']
+
+        with self._lock:
+            if self._count >= self.max_pending:
+                raise IngestBufferFullError(max(1, round(self.flush_interval)))
+            self._pending.setdefault(model, []).append(row)
+            self._count += 1
+            full = self._count >= self.flush_size
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name='ingest-flusher', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+        return row['id']
+
+    def flush(self):
+        """
+        Writes every pending row, one executemany INSERT and commit per model, falling back to row-by-row inserts
+        for a model whose bulk insert is rejected.
+
+        Returns:
+        int: The number of rows written. Rows that could not be written are kept for the next flush or dead-lettered.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._count = self._pending, {}, 0
+            if not pending:
+                return 0
+            written = 0
+            with self.app.app_context():
+                session = self.db.session
+                for model, rows in pending.items():
+                    try:
+                        session.execute(insert(model), rows)
+                        session.commit()
+                        written += len(rows)
+                        self._forget(rows)
+                        continue
+                    except Exception as error:
+                        session.rollback()
+                        with self._lock:
+                            self._stats['failures'] += 1
+                        if _is_transient(error):
+                            logger.warning('Database unavailable; keeping %d %s rows for the next flush: %s',
+                                           len(rows), model.__tablename__, error)
+                            self._requeue(model, rows)
+                            continue
+                        logger.warning('Bulk insert of %d %s rows failed; retrying them one by one: %s',
+                                       len(rows), model.__tablename__, error)
+                    written += self._write_each(session, model, rows)
+            if written:
+                with self._lock:
+                    self._stats['rows_written'] += written
+                    self._stats['flushes'] += 1
+            return written
+
+    def _write_each(self, session, model, rows):
+        written = 0
+        for row in rows:
+            try:
+                session.execute(insert(model), [row])
+                session.commit()
+                written += 1
+                self._forget([row])
+            except Exception as error:
+                session.rollback()
+                if _is_transient(error):
+                    self._requeue(model, [row])
+                    continue
+                with self._lock:
+                    attempts = self._attempts.get(row['id'], 0) + 1
+                    self._attempts[row['id']] = attempts
+                if attempts < self.max_attempts:
+                    self._requeue(model, [row])
+                    continue
+                logger.error('Dropping %s row %s after %d failed attempts: %s', model.__tablename__, row['id'], attempts, error)
+                with self._lock:
+                    self._attempts.pop(row['id'], None)
+                    self.dead_letters.append((model.__tablename__, row, str(error)))
+                    self._stats['dead_lettered'] += 1
+        return written
+
+    def _requeue(self, model, rows):
+        with self._lock:
+            self._pending[model] = rows + self._pending.get(model, [])
+            self._count += len(rows)
+
+    def _forget(self, rows):
+        if self._attempts:
+            with self._lock:
+                for row in rows:
+                    self._attempts.pop(row['id'], None)
+
+    def shutdown(self):
+        """
+        Stops the background thread and flushes the remaining rows.
+        """
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self):
+        """
+        Returns the buffer statistics.
+
+        Returns:
+        dict: The mode, pending rows, rows written, flushes, failed inserts and dead-lettered rows.
+        """
+        with self._lock:
+            return {'mode': self.mode, 'pending': self._count, **self._stats}
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                stopped = self._stopped
+            if stopped:
+                return
+            self.flush()
+
+
+def iter_lines(stream, max_line_bytes=65536):
+    """
+    Reads newline-delimited records from a binary stream one at a time, so memory use does not grow with its size.
+
+    Args:
+    stream (file-like): The stream, e.g. `request.stream`.
+    max_line_bytes (int, optional): The longest record accepted. Longer ones are skipped and yielded as None.
+        Defaults to 64 KiB.
+
+    Yields:
+    tuple: The 1-based line number and the record's bytes, or None if it was too long. Blank lines are skipped.
+    """
+    number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Discard the rest of the oversized record
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield number, None
+        elif line.strip():
+            yield number, line
+
+
+def import_lines(session, model, lines, load, chunk_size=1000):
+    """
+    Validates NDJSON records and inserts the valid ones in chunks, one executemany INSERT and commit per chunk.
+
+    Results are yielded as each chunk is written, so only one chunk is held in memory at a time. A chunk that fails
+    to insert is rolled back and its lines are reported as errors; later chunks are still written.
+
+    Args:
+    session (Session): The database session.
+    model (type): The mapped model class.
+    lines (iterable): (line number, bytes or None) pairs, as yielded by `iter_lines`.
+    load (callable): Validates a decoded record and returns the column values, raising ValidationError if invalid.
+    chunk_size (int, optional): Rows per INSERT. Defaults to 1000.
+
+    Yields:
+    dict: {'line': n, 'id': ...} for each inserted record or {'line': n, 'error': ...} for each rejected one, in
+        line order within each chunk, followed by a summary {'inserted': ..., 'rejected': ...}.
+    """
+    inserted = rejected = 0
+    chunk, results = [], []
+
+    def write():
+        nonlocal inserted, rejected
+        written = []
+        if chunk:
+            try:
+                # An executemany INSERT rather than psycopg2's COPY: SQLAlchemy already sends it as multi-row VALUES
+                # statements on Postgres, it works on every backend, and a failed chunk is rolled back on its own
+                session.execute(insert(model), [row for _, row in chunk])
+                session.commit()
+                inserted += len(chunk)
+                written = [{'line': number, 'id': str(row['id'])} for number, row in chunk]
+            except SQLAlchemyError:
+                logger.exception('Bulk import of %d rows failed.', len(chunk))
+                session.rollback()
+                rejected += len(chunk)
+                written = [{'line': number, 'error': 'Could not be stored.'} for number, _ in chunk]
+        merged = sorted(results + written, key=lambda result: result['line'])
+        chunk.clear()
+        results.clear()
+        return merged
+
+    for number, line in lines:
+        if line is None:
+            error = 'Line too long.'
+        else:
+            try:
+                chunk.append((number, new_row(load(json.loads(line)))))
+                error = None
+            except ValueError:
+                error = 'Invalid JSON.'
+            except ValidationError as err:
+                error = err.messages
+        if error is not None:
+            rejected += 1
+            results.append({'line': number, 'error': error})
+        if len(chunk) >= chunk_size or len(results) >= chunk_size:
+            yield from write()
+    yield from write()
+    yield {'inserted': inserted, 'rejected': rejected}
+
+
+def init_app(app, db):
+    """
+    Attaches a write-behind buffer configured by the INGEST_* settings to an app, flushed at interpreter exit.
+
+    Args:
+    app (Flask): The application.
+    db (SQLAlchemy): The database extension.
+
+    Returns:
+    WriteBehindBuffer: The buffer, also available as `app.extensions['ingest']`.
+    """
+    config = lambda name, default: app.config.get(name, os.getenv(name, default))
+    buffer = WriteBehindBuffer(
+        app,
+        db,
+        mode=config('INGEST_MODE', BUFFERED),
+        flush_size=int(config('INGEST_FLUSH_SIZE', '500')),
+        flush_interval=float(config('INGEST_FLUSH_INTERVAL', '1.0')),
+        max_pending=int(config('INGEST_MAX_PENDING', '0')) or None,
+        max_attempts=int(config('INGEST_MAX_ATTEMPTS', '3'))
+    )
+    app.extensions['ingest'] = buffer
+    atexit.register(buffer.shutdown)
+    return buffer
+
+
+def get_buffer():
+    """
+    Returns the write-behind buffer of the current app.
+    """
+    return current_app.extensions['ingest']
@@ -0,0 +1,306 @@
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from sqlalchemy import func, select
+from .models import NovelIteration
+
+# How an iteration's content is stored: plain text in `content`, or a zlib-compressed snapshot or delta in `payload`
+TEXT = 'text'
+SNAPSHOT = 'snapshot'
+DELTA = 'delta'
+
+# Deltas are computed over sentences and lines, which keeps them small for prose without diffing every character
+_CHUNK = re.compile(r'[^\n.!?]*(?:[.!?]+\s*|\n|$)')
+
+
+def split_chunks(text):
+    """
+    Splits a text into the sentences and lines deltas are computed over; joining the chunks gives back the text.
+
+    Args:
+    text (str): The text to split.
+
+    Returns:
+    list: The chunks.
+    """
+    return [chunk for chunk in _CHUNK.findall(text) if chunk]
+
+
+def encode_delta(base, text, level=6):
+    """
+    Encodes a text as a compressed delta against a base text.
+
+    The delta is a JSON list of [start, end] ranges of base chunks to copy and strings to insert, compressed with zlib.
+
+    Args:
+    base (str): The text the delta applies to.
+    text (str): The text to encode.
+    level (int, optional): The zlib compression level. Defaults to 6.
+
+    Returns:
+    bytes: The delta.
+    """
+    base_chunks, chunks = split_chunks(base), split_chunks(text)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_chunks, chunks).get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag != 'delete':
+            ops.append(''.join(chunks[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'), level)
+
+
+def apply_delta(base, delta):
+    """
+    Rebuilds a text from its base text and a delta produced by `encode_delta`.
+
+    Args:
+    base (str): The base text.
+    delta (bytes): The delta.
+
+    Returns:
+    str: The text.
+    """
+    return ''.join(_apply_chunks(split_chunks(base), delta))
+
+
+def _apply_chunks(base_chunks, delta):
+    # Inserted strings are whole chunks of the new text, so the result is the new text's chunk list and a chain of
+    # deltas can be applied without splitting every intermediate text again
+    chunks = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            chunks += split_chunks(op)
+        else:
+            chunks += base_chunks[op[0]:op[1]]
+    return chunks
+
+
+def encode_iteration(iteration_number, content, previous=None, snapshot_interval=16, level=6):
+    """
+    Chooses how to store an iteration: a compressed snapshot on every `snapshot_interval`-th iteration or when the
+    previous content is unknown, otherwise a delta against the previous iteration, unless a snapshot is smaller.
+
+    Snapshots bound the number of deltas applied to rebuild any iteration to `snapshot_interval - 1`.
+
+    Args:
+    iteration_number (int): The iteration number, starting at 1.
+    content (str): The content of the iteration.
+    previous (str, optional): The content of the previous iteration. Defaults to None.
+    snapshot_interval (int, optional): Iterations per snapshot. Defaults to 16.
+    level (int, optional): The zlib compression level. Defaults to 6.
+
+    Returns:
+    dict: The 'encoding', 'content' and 'payload' column values.
+    """
+    snapshot = zlib.compress(content.encode('utf-8'), level)
+    if previous is not None and (iteration_number - 1) % snapshot_interval != 0:
+        delta = encode_delta(previous, content, level)
+        if len(delta) < len(snapshot):
+            return {'encoding': DELTA, 'content': None, 'payload': delta}
+    return {'encoding': SNAPSHOT, 'content': None, 'payload': snapshot}
+
+
+def decode_iteration(encoding, content, payload, previous=None):
+    """
+    Rebuilds an iteration's content from its stored columns.
+
+    Args:
+    encoding (str): TEXT, SNAPSHOT or DELTA.
+    content (str): The plain content, for TEXT rows.
+    payload (bytes): The compressed snapshot or delta.
+    previous (str, optional): The previous iteration's content, required for DELTA rows. Defaults to None.
+
+    Returns:
+    str: The content.
+
+    Raises:
+    ValueError: If a delta has no previous content to apply to.
+    """
+    if encoding == TEXT:
+        return content
+    if encoding == SNAPSHOT:
+        return zlib.decompress(payload).decode('utf-8')
+    if previous is None:
+        raise ValueError('A delta needs the previous iteration to be rebuilt.')
+    return apply_delta(previous, payload)
+
+
+class IterationStore:
+    """
+    Stores iteration content as periodic snapshots plus deltas, and rebuilds it on read.
+
+    Reading an iteration fetches the rows from the nearest snapshot at or before it in one range query, so at most
+    `snapshot_interval - 1` deltas are applied. Rebuilt contents are kept in an LRU keyed by row ID and payload
+    checksum, so polling the same iterations and appending after a recent one do not decode again.
+
+    Attributes:
+    snapshot_interval (int): Iterations per snapshot.
+    cache_size (int): The maximum number of rebuilt contents kept.
+    level (int): The zlib compression level.
+    """
+    def __init__(self, snapshot_interval=16, cache_size=256, level=6):
+        self.snapshot_interval = snapshot_interval
+        self.cache_size = cache_size
+        self.level = level
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'deltas_applied': 0}
+
+    def encode(self, iteration_number, content, previous=None):
+        """
+        Returns the column values storing an iteration, as `encode_iteration` with this store's settings.
+        """
+        return encode_iteration(iteration_number, content, previous, self.snapshot_interval, self.level)
+
+    def content(self, session, novel_id, row):
+        """
+        Returns the content of an iteration row loaded with its storage columns.
+
+        Args:
+        session (Session): The database session, used if earlier iterations are needed to apply a delta.
+        novel_id (int): The ID of the novel.
+        row (object): A row with id, iteration_number, encoding, content and payload.
+
+        Returns:
+        str: The content.
+        """
+        if row.encoding == TEXT:
+            return row.content
+        cached = self._cached(_key(row))
+        if cached is not None:
+            return cached
+        if row.encoding == SNAPSHOT:
+            text = decode_iteration(row.encoding, row.content, row.payload)
+            self._remember(_key(row), text)
+            return text
+        return self.read_range(session, novel_id, row.iteration_number, row.iteration_number).get(row.iteration_number)
+
+    def read_range(self, session, novel_id, first, last):
+        """
+        Rebuilds the contents of a range of a novel's iterations with one query.
+
+        Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        first (int): The first iteration number.
+        last (int): The last iteration number.
+
+        Returns:
+        dict: The contents by iteration number, for the iterations in the range that exist.
+        """
+        start = select(func.max(NovelIteration.iteration_number)).where(
+            NovelIteration.novel_id == novel_id,
+            NovelIteration.iteration_number <= first,
+            NovelIteration.encoding != DELTA
+        ).scalar_subquery()
+        rows = session.execute(
+            select(
+                NovelIteration.id, NovelIteration.iteration_number, NovelIteration.encoding,
+                NovelIteration.content, NovelIteration.payload
+            )
+            .where(
+                NovelIteration.novel_id == novel_id,
+                NovelIteration.iteration_number >= func.coalesce(start, first),
+                NovelIteration.iteration_number <= last
+            )
+            .order_by(NovelIteration.iteration_number)
+        ).all()
+
+        # Start from the latest row at or before `first` that needs no earlier rows: a cached one or a snapshot. The
+        # cached text is taken now, since the entry may be evicted before the walk reaches it
+        with self._lock:
+            begin, start_text = 0, None
+            for index, row in enumerate(rows):
+                if row.iteration_number > first:
+                    break
+                if row.encoding != DELTA:
+                    begin, start_text = index, None
+                elif _key(row) in self._cache:
+                    begin, start_text = index, self._cache[_key(row)]
+
+        contents = {}
+        text = chunks = None
+        for index, row in enumerate(rows[begin:]):
+            cached = start_text if index == 0 and start_text is not None else self._cached(_key(row))
+            if cached is not None:
+                text, chunks = cached, None
+            elif row.encoding == DELTA:
+                if text is None:
+                    raise ValueError('A delta needs the previous iteration to be rebuilt.')
+                chunks = _apply_chunks(chunks if chunks is not None else split_chunks(text), row.payload)
+                text = ''.join(chunks)
+                with self._lock:
+                    self._stats['deltas_applied'] += 1
+                self._remember(_key(row), text)
+            else:
+                text, chunks = decode_iteration(row.encoding, row.content, row.payload), None
+                if row.encoding != TEXT:
+                    self._remember(_key(row), text)
+            if row.iteration_number >= first:
+                contents[row.iteration_number] = text
+        return contents
+
+    def clear(self):
+        """
+        Drops every rebuilt content.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        """
+        Returns the store counters.
+
+        Returns:
+        dict: The cached contents, cache hits and misses, and deltas applied.
+        """
+        with self._lock:
+            return {'entries': len(self._cache), **self._stats}
+
+    def _cached(self, key):
+        with self._lock:
+            text = self._cache.get(key)
+            if text is None:
+                self._stats['misses'] += 1
+            else:
+                self._stats['hits'] += 1
+                self._cache.move_to_end(key)
+            return text
+
+    def _remember(self, key, text):
+        with self._lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def _key(row):
+    # The payload's length and checksum are part of the key, so a row ID reused after a rollback, or in another
+    # database, never hits; keying on the payload itself would keep every compressed payload alive in the cache
+    payload = row.payload or b''
+    return row.id, len(payload), zlib.crc32(payload)
+
+
+def store_from_env():
+    """
+    Builds the iteration store configured by ITERATION_SNAPSHOT_INTERVAL, ITERATION_CACHE_SIZE and
+    ITERATION_COMPRESSION_LEVEL.
+
+    Returns:
+    IterationStore: The configured store.
+    """
+    return IterationStore(
+        snapshot_interval=int(os.getenv('ITERATION_SNAPSHOT_INTERVAL', '16')),
+        cache_size=int(os.getenv('ITERATION_CACHE_SIZE', '256')),
+        level=int(os.getenv('ITERATION_COMPRESSION_LEVEL', '6'))
+    )
+
+
+store = store_from_env()
+
@@ -0,0 +1,236 @@
+from collections import namedtuple
+from sqlalchemy import select, text, update
+from sqlalchemy.exc import IntegrityError
+from .iteration_store import store
+from .models import Novel, NovelHead, NovelIteration
+
+DEFAULT_NOVEL_ID = 1
+DEFAULT_NOVEL_TITLE = 'Untitled'
+
+
+# An iteration with its content rebuilt from storage
+Iteration = namedtuple('Iteration', ['id', 'iteration_number', 'content'])
+
+# The columns an iteration's content is rebuilt from
+_STORAGE_COLUMNS = (
+    NovelIteration.id, NovelIteration.iteration_number, NovelIteration.encoding, NovelIteration.content,
+    NovelIteration.payload
+)
+
+
+class NovelNotFoundError(LookupError):
+    pass
+
+
+def create_novel(session, title, owner_id=None, novel_id=None):
+    """
+    Create a novel together with its head pointer.
+
+    Args:
+        session (Session): The database session.
+        title (str): The title of the novel.
+        owner_id (int, optional): The ID of the owning user. Defaults to None.
+        novel_id (int, optional): An explicit ID for the novel. Defaults to None.
+
+    Returns:
+        Novel: The new novel. The caller is responsible for committing.
+    """
+    novel = Novel(id=novel_id, title=title, owner_id=owner_id)
+    session.add(novel)
+    session.flush()
+    session.add(NovelHead(novel_id=novel.id, iteration_number=0))
+    session.flush()
+    return novel
+
+
+def ensure_default_novel(session):
+    """
+    Create the default novel used by requests that do not name one, if it does not exist yet.
+
+    Migrated databases already contain it; this covers databases created with `create_all`.
+
+    Args:
+        session (Session): The database session.
+    """
+    if session.get(NovelHead, DEFAULT_NOVEL_ID) is not None:
+        return
+    try:
+        create_novel(session, DEFAULT_NOVEL_TITLE, novel_id=DEFAULT_NOVEL_ID)
+        sync_novel_id_sequence(session)
+        session.commit()
+    except IntegrityError:
+        # Another request created it first
+        session.rollback()
+
+
+def sync_novel_id_sequence(session):
+    """
+    Move the PostgreSQL novels ID sequence past the highest ID in use.
+
+    Inserting a novel with an explicit ID does not advance the sequence, so without this the next novel created
+    without one would be given the same ID and fail. Other databases derive the next ID from the table itself.
+
+    Args:
+        session (Session): The database session.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('novels', 'id'), (SELECT MAX(id) FROM novels))"
+        ))
+
+
+def get_latest_iteration(session, novel_id):
+    """
+    Look up the latest iteration of a novel through its head pointer.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+
+    Returns:
+        Iteration: The latest iteration, or None if the novel has none.
+    """
+    row = session.execute(
+        select(*_STORAGE_COLUMNS)
+        .join(NovelHead, NovelHead.iteration_id == NovelIteration.id)
+        .where(NovelHead.novel_id == novel_id)
+    ).one_or_none()
+    if row is None:
+        return None
+    return Iteration(row.id, row.iteration_number, store.content(session, novel_id, row))
+
+
+def get_recent_contents(session, novel_id, limit):
+    """
+    Fetch the contents of the most recent iterations of a novel.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        limit (int): The maximum number of iterations to fetch.
+
+    Returns:
+        list: The iteration contents, oldest first.
+    """
+    last = get_head_number(session, novel_id)
+    if not last or limit <= 0:
+        return []
+    contents = store.read_range(session, novel_id, max(1, last - limit + 1), last)
+    return [contents[number] for number in sorted(contents)]
+
+
+def append_iteration(session, novel_id, content):
+    """
+    Append an iteration to a novel and move its head pointer, in the current transaction.
+
+    The head row is incremented before the iteration is inserted, so concurrent appends to the same novel are
+    serialized on that row and always receive distinct, consecutive iteration numbers. The content is stored as a
+    snapshot or a delta against the previous iteration, as chosen by the iteration store.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        content (str): The content of the new iteration.
+
+    Returns:
+        NovelIteration: The new iteration. The caller is responsible for committing.
+
+    Raises:
+        NovelNotFoundError: If the novel does not exist.
+    """
+    iteration_number = session.execute(
+        update(NovelHead)
+        .where(NovelHead.novel_id == novel_id)
+        .values(iteration_number=NovelHead.iteration_number + 1)
+        .returning(NovelHead.iteration_number)
+    ).scalar_one_or_none()
+    if iteration_number is None:
+        raise NovelNotFoundError(f'Novel {novel_id} not found.')
+
+    previous = None
+    if iteration_number > 1 and (iteration_number - 1) % store.snapshot_interval != 0:
+        previous = store.read_range(session, novel_id, iteration_number - 1, iteration_number - 1).get(iteration_number - 1)
+    iteration = NovelIteration(
+        novel_id=novel_id, iteration_number=iteration_number, **store.encode(iteration_number, content, previous)
+    )
+    session.add(iteration)
+    session.flush()
+    session.execute(
+        update(NovelHead)
+        .where(NovelHead.novel_id == novel_id)
+        .values(iteration_id=iteration.id)
+    )
+    return iteration
+
+
+# Fields a history listing can project; content is only rebuilt from storage when asked for
+ITERATION_FIELDS = {
+    'id': NovelIteration.id,
+    'iteration_number': NovelIteration.iteration_number,
+    'content': None,
+    'created_at': NovelIteration.created_at,
+}
+
+
+def get_head_number(session, novel_id):
+    """
+    Look up the iteration number a novel's head pointer is at, with a primary-key lookup on the head row.
+
+    Iterations are append-only, so this number identifies the state of the novel's whole history.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+
+    Returns:
+        int: The latest iteration number, 0 if the novel has no iterations, or None if the novel does not exist.
+    """
+    return session.execute(
+        select(NovelHead.iteration_number).where(NovelHead.novel_id == novel_id)
+    ).scalar_one_or_none()
+
+
+def list_iterations(session, novel_id, after=None, limit=50, fields=tuple(ITERATION_FIELDS), descending=False):
+    """
+    Fetch a page of a novel's iterations by keyset pagination on the iteration number.
+
+    The page starts right after the cursor and is read through the (novel_id, iteration_number) index, so it costs
+    the same at any depth, unlike OFFSET pagination.
+
+    Args:
+        session (Session): The database session.
+        novel_id (int): The ID of the novel.
+        after (int, optional): The iteration number to continue after, in the listing order. Defaults to None, which
+            starts at the first (or, when descending, the latest) iteration.
+        limit (int, optional): The maximum number of iterations to return. Defaults to 50.
+        fields (iterable, optional): The names of the ITERATION_FIELDS to return. Defaults to all of them.
+        descending (bool, optional): Whether to list the newest iterations first. Defaults to False.
+
+    Returns:
+        tuple: The iterations as dicts with the requested fields, and the cursor for the next page, or None if this
+            is the last page.
+    """
+    names = ['iteration_number'] + [
+        name for name in ITERATION_FIELDS if name in fields and name not in ('iteration_number', 'content')
+    ]
+    number = NovelIteration.iteration_number
+    query = select(*(ITERATION_FIELDS[name] for name in names)).where(NovelIteration.novel_id == novel_id)
+    if after is not None:
+        query = query.where(number < after if descending else number > after)
+    query = query.order_by(number.desc() if descending else number).limit(limit + 1)
+
+    rows = session.execute(query).all()
+    page = [
+        {name: value.isoformat() if name == 'created_at' and value is not None else value for name, value in zip(names, row)}
+        for row in rows[:limit]
+    ]
+    next_cursor = page[-1]['iteration_number'] if len(rows) > limit else None
+    if page and 'content' in fields:
+        numbers = [iteration['iteration_number'] for iteration in page]
+        contents = store.read_range(session, novel_id, min(numbers), max(numbers))
+        for iteration in page:
+            iteration['content'] = contents.get(iteration['iteration_number'])
+    if 'iteration_number' not in fields:
+        for iteration in page:
+            del iteration['iteration_number']
+    return page, next_cursor
@@ -0,0 +1,171 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class JobQueueFullError(Exception):
+    """
+    Raised when too many jobs are queued or running and the request should be retried later.
+
+    Attributes:
+    retry_after (int): Suggested number of seconds to wait before retrying.
+    """
+    def __init__(self, retry_after):
+        super().__init__('Too many pending jobs.')
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    An in-process queue that runs submitted jobs on a bounded pool of worker threads.
+
+    Jobs are plain callables. Their status, result and error are kept in memory so they
+    can be polled by id. Only the most recent `max_jobs` records are retained. At most `max_pending` jobs may be
+    queued or running; further submissions fail fast with JobQueueFullError.
+
+    Attributes:
+    max_workers (int): The number of worker threads running jobs concurrently.
+    max_jobs (int): The maximum number of job records kept in memory.
+    max_pending (int): The maximum number of jobs queued or running at once.
+    retry_after (int): Seconds clients are asked to wait when the queue is full.
+    """
+    def __init__(self, max_workers=4, max_jobs=1000, max_pending=None, retry_after=1):
+        """
+        Initializes the job queue and its worker pool.
+
+        Args:
+        max_workers (int, optional): Number of worker threads. Defaults to 4.
+        max_jobs (int, optional): Number of job records to retain. Defaults to 1000.
+        max_pending (int, optional): Number of jobs queued or running at once. Defaults to 25 per worker, and never
+            more than `max_jobs`.
+        retry_after (int, optional): Seconds clients are asked to wait when the queue is full. Defaults to 1.
+        """
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        # Unfinished jobs are never evicted, so capping them keeps the records within max_jobs too
+        self.max_pending = min(max_pending or max_workers * 25, max_jobs)
+        self.retry_after = retry_after
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='generation-job')
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, owner=None, **kwargs):
+        """
+        Enqueues a job for execution.
+
+        Args:
+        kind (str): A short label describing the job, e.g. 'generate-content'.
+        fn (callable): The callable to run. Its return value becomes the job result.
+        *args: Positional arguments for `fn`.
+        owner (str, optional): Who submitted the job, kept in the record so callers can check it. Defaults to None.
+        **kwargs: Keyword arguments for `fn`.
+
+        Returns:
+        str: The id of the new job.
+
+        Raises:
+        JobQueueFullError: If `max_pending` jobs are already queued or running.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(self.retry_after)
+            self._pending += 1
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'owner': owner,
+                'status': QUEUED,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+            }
+            self._evict()
+        try:
+            future = self._executor.submit(self._run, job_id, fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns a snapshot of a job record.
+
+        Args:
+        job_id (str): The id of the job.
+
+        Returns:
+        dict: A copy of the job record, or None if the job is unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        """
+        Blocks until a job has finished and returns its record.
+
+        Args:
+        job_id (str): The id of the job.
+        timeout (float, optional): Maximum number of seconds to wait. Defaults to None.
+
+        Returns:
+        dict: A copy of the job record, or None if the job is unknown.
+        """
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.exception(timeout=timeout)
+        return self.get(job_id)
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker pool.
+
+        Args:
+        wait (bool, optional): Whether to wait for running jobs to finish. Defaults to True.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status=SUCCEEDED, result=result, finished_at=time.time())
+        finally:
+            # Released before the future completes, so a caller that waited on the job can submit straight away
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _evict(self):
+        # Drop the oldest finished jobs once the record limit is exceeded.
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job['status'] in (SUCCEEDED, FAILED)][:excess]:
+            del self._jobs[job_id]
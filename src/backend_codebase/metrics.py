@@ -0,0 +1,281 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Pool stats that only ever grow, exported as counters under these names; the other stats are gauges
+POOL_COUNTERS = {
+    'checkouts': ('db_pool_checkouts_total', 'Connections checked out of the database pool.'),
+    'wait_time_total': ('db_pool_wait_seconds_total', 'Seconds spent waiting for a pooled database connection.'),
+    'connects': ('db_pool_connects_total', 'New database connections opened by the pool.'),
+    'connect_time_total': ('db_pool_connect_seconds_total', 'Seconds spent opening new database connections.'),
+}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# When disabled, spans are a shared no-op context manager and no hooks or listeners are installed
+enabled = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+_NULL_SPAN = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """
+    A monotonically increasing value per label set.
+
+    Attributes:
+    name (str): The metric name.
+    help (str): The metric description.
+    labelnames (tuple): The label names, in order.
+    """
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    """
+    A distribution of observed values per label set, with cumulative buckets.
+
+    Attributes:
+    name (str): The metric name.
+    help (str): The metric description.
+    labelnames (tuple): The label names, in order.
+    buckets (tuple): The bucket upper bounds, ascending.
+    """
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+class Registry:
+    """
+    Holds metrics and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, gauges=(), counters=()):
+        """
+        Renders every registered metric, followed by gauges and counters read at scrape time.
+
+        Args:
+        gauges (iterable, optional): (name, help, labels, value) tuples. Defaults to none.
+        counters (iterable, optional): (name, help, labels, value) tuples of monotonic totals. Defaults to none.
+
+        Returns:
+        str: The exposition text.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for kind, samples in (('gauge', gauges), ('counter', counters)):
+            for name, help, labels, value in samples:
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name}{_format_labels(labels.keys(), labels.values())} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route.', ('method', 'route', 'status')))
+span_duration = registry.register(Histogram(
+    'span_duration_seconds', 'Latency of instrumented operations within requests.', ('span',)))
+model_duration = registry.register(Histogram(
+    'model_request_duration_seconds', 'Upstream model call latency.', ('model', 'outcome')))
+model_tokens = registry.register(Counter(
+    'model_tokens_total', 'Tokens reported by the upstream model.', ('model', 'kind')))
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_duration.observe(time.perf_counter() - start, span=name)
+
+
+def span(name):
+    """
+    Times a block as a named span, e.g. `with span('password_hash'): ...`.
+
+    Args:
+    name (str): The span name.
+
+    Returns:
+    A context manager; a shared no-op one when metrics are disabled.
+    """
+    return _span(name) if enabled else _NULL_SPAN
+
+
+def record_model_call(model, seconds, outcome='ok', usage=None):
+    """
+    Records the latency and token usage of an upstream model call.
+
+    Args:
+    model (str): The model called.
+    seconds (float): The call latency.
+    outcome (str, optional): 'ok' or 'error'. Defaults to 'ok'.
+    usage (dict, optional): The response's usage block with prompt_tokens and completion_tokens. Defaults to None.
+    """
+    if not enabled:
+        return
+    model_duration.observe(seconds, model=model, outcome=outcome)
+    if usage:
+        model_tokens.inc(usage.get('prompt_tokens', 0), model=model, kind='prompt')
+        model_tokens.inc(usage.get('completion_tokens', 0), model=model, kind='completion')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if starts:
+        span_duration.observe(time.perf_counter() - starts.pop(), span='db_query')
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute, so its start time would otherwise stay on the connection
+    starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+    if starts:
+        span_duration.observe(time.perf_counter() - starts.pop(), span='db_query_error')
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        labels = {
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule is not None else 'unmatched',
+            'status': str(response.status_code),
+        }
+        if response.is_streamed:
+            # Streamed responses (e.g. SSE) are still being sent after this hook, so time them until they are closed
+            response.call_on_close(lambda: request_duration.observe(time.perf_counter() - start, **labels))
+        else:
+            request_duration.observe(time.perf_counter() - start, **labels)
+    return response
+
+
+def init_app(app, engine_stats=None, protect=None):
+    """
+    Installs the request hooks, the SQLAlchemy query timers and the /metrics endpoint, if metrics are enabled.
+
+    Request durations run until the response is returned, or for streamed responses until the stream is closed.
+    /metrics exposes the pool and cache internals, so it should be wrapped by `protect`; without it the endpoint
+    must only be reachable from the internal network.
+
+    Args:
+    app (Flask): The application.
+    engine_stats (callable, optional): Returns the connection pool stats dict to export. Defaults to None.
+    protect (callable, optional): A view decorator guarding /metrics, e.g. `auth.login_required(role='admin')`.
+        Defaults to None.
+    """
+    if not enabled:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    def pool_samples():
+        if engine_stats is None:
+            return [], []
+        with app.app_context():
+            stats = engine_stats()
+        labels = {'pool': stats.get('pool', '')}
+        gauges, counters = [], []
+        for name, value in stats.items():
+            if not isinstance(value, (int, float)):
+                continue
+            if name in POOL_COUNTERS:
+                counters.append((*POOL_COUNTERS[name], labels, value))
+            else:
+                gauges.append((f'db_pool_{name}', f'Database connection pool {name.replace("_", " ")}.', labels, value))
+        return gauges, counters
+
+    def metrics_endpoint():
+        gauges, counters = pool_samples()
+        return Response(registry.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', protect(metrics_endpoint) if protect else metrics_endpoint)
@@ -0,0 +1,29 @@
+"""Create feedback table
+
+Revision ID: 5b2f0c7d9a14
+Revises: e43cf494deae
+Create Date: 2026-10-18 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.postgresql as psql
+
+# revision identifiers, used by Alembic.
+revision = '5b2f0c7d9a14'
+down_revision = 'e43cf494deae'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'feedback',
+        sa.Column('id', psql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', psql.UUID(as_uuid=True), nullable=True),
+        sa.Column('feedback', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now())
+    )
+
+def downgrade():
+    op.drop_table('feedback')
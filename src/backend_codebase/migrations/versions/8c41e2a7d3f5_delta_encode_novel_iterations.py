@@ -0,0 +1,111 @@
+"""Store novel iteration content as compressed snapshots and deltas
+
+Revision ID: 8c41e2a7d3f5
+Revises: 5b2f0c7d9a14
+Create Date: 2026-10-18 18:00:00.000000
+"""
+
+import json
+import os
+import re
+import zlib
+from difflib import SequenceMatcher
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8c41e2a7d3f5'
+down_revision = '5b2f0c7d9a14'
+branch_labels = None
+depends_on = None
+
+# A frozen copy of the table and of the encoding as of this revision, so later changes to the models or to
+# backend_codebase.iteration_store cannot change what this migration writes or reads
+novel_iterations = sa.table(
+    'novel_iterations',
+    sa.column('id', sa.Integer),
+    sa.column('novel_id', sa.Integer),
+    sa.column('iteration_number', sa.Integer),
+    sa.column('encoding', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('payload', sa.LargeBinary)
+)
+
+_CHUNK = re.compile(r'[^\n.!?]*(?:[.!?]+\s*|\n|$)')
+
+def _split_chunks(text):
+    return [chunk for chunk in _CHUNK.findall(text) if chunk]
+
+def _encode(iteration_number, content, previous, snapshot_interval, level):
+    snapshot = zlib.compress(content.encode('utf-8'), level)
+    if previous is not None and (iteration_number - 1) % snapshot_interval != 0:
+        base_chunks, chunks = _split_chunks(previous), _split_chunks(content)
+        ops = []
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_chunks, chunks).get_opcodes():
+            if tag == 'equal':
+                ops.append([i1, i2])
+            elif tag != 'delete':
+                ops.append(''.join(chunks[j1:j2]))
+        delta = zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'), level)
+        if len(delta) < len(snapshot):
+            return {'encoding': 'delta', 'content': None, 'payload': delta}
+    return {'encoding': 'snapshot', 'content': None, 'payload': snapshot}
+
+def _decode(encoding, content, payload, previous):
+    if encoding == 'text':
+        return content
+    if encoding == 'snapshot':
+        return zlib.decompress(payload).decode('utf-8')
+    base_chunks, chunks = _split_chunks(previous), []
+    for item in json.loads(zlib.decompress(payload)):
+        chunks += [item] if isinstance(item, str) else base_chunks[item[0]:item[1]]
+    return ''.join(chunks)
+
+def _rewrite(connection, encode, batch_size=500):
+    # One novel's rows at a time, since each delta chain has to be walked in order
+    table = novel_iterations
+    statement = sa.update(table).where(table.c.id == sa.bindparam('row_id')).values(
+        encoding=sa.bindparam('new_encoding'), content=sa.bindparam('new_content'), payload=sa.bindparam('new_payload')
+    )
+    batch = []
+    for novel_id in connection.execute(sa.select(table.c.novel_id).distinct().order_by(table.c.novel_id)).scalars().all():
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.iteration_number, table.c.encoding, table.c.content, table.c.payload)
+            .where(table.c.novel_id == novel_id)
+            .order_by(table.c.iteration_number)
+        ).all()
+        previous = None
+        for row in rows:
+            content = _decode(row.encoding, row.content, row.payload, previous)
+            values = encode(row, content, previous)
+            batch.append({
+                'row_id': row.id, 'new_encoding': values['encoding'],
+                'new_content': values['content'], 'new_payload': values['payload'],
+            })
+            previous = content
+            if len(batch) >= batch_size:
+                connection.execute(statement, batch)
+                batch = []
+    if batch:
+        connection.execute(statement, batch)
+
+def upgrade():
+    # Batch mode runs plain ALTERs on PostgreSQL and rebuilds the table on SQLite, which cannot alter a column
+    with op.batch_alter_table('novel_iterations') as batch:
+        batch.add_column(sa.Column('encoding', sa.String(16), nullable=False, server_default='text'))
+        batch.add_column(sa.Column('payload', sa.LargeBinary, nullable=True))
+        batch.alter_column('content', existing_type=sa.Text, nullable=True)
+
+    # Repack existing rows with the interval and level the application will write with
+    snapshot_interval = int(os.getenv('ITERATION_SNAPSHOT_INTERVAL', '16'))
+    level = int(os.getenv('ITERATION_COMPRESSION_LEVEL', '6'))
+    _rewrite(op.get_bind(), lambda row, content, previous: _encode(
+        row.iteration_number, content, previous, snapshot_interval, level
+    ))
+
+def downgrade():
+    _rewrite(op.get_bind(), lambda row, content, previous: {'encoding': 'text', 'content': content, 'payload': None})
+    with op.batch_alter_table('novel_iterations') as batch:
+        batch.alter_column('content', existing_type=sa.Text, nullable=False)
+        batch.drop_column('payload')
+        batch.drop_column('encoding')
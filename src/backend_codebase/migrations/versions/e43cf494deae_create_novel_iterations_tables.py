@@ -0,0 +1,56 @@
+"""Create novels, novel_iterations and novel_heads tables
+
+Revision ID: e43cf494deae
+Revises: create_users_table
+Create Date: 2026-10-18 12:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e43cf494deae'
+down_revision = 'create_users_table'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'novels',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('owner_id', sa.Integer, sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('title', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now())
+    )
+    op.create_index('ix_novels_owner_id', 'novels', ['owner_id'])
+
+    op.create_table(
+        'novel_iterations',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('novel_id', sa.Integer, sa.ForeignKey('novels.id'), nullable=False),
+        sa.Column('iteration_number', sa.Integer, nullable=False),
+        sa.Column('content', sa.Text, nullable=False),
+        sa.Column('created_at', sa.DateTime, server_default=sa.func.now())
+    )
+    op.create_index('ix_novel_iterations_novel_id_iteration_number', 'novel_iterations', ['novel_id', 'iteration_number'], unique=True)
+
+    op.create_table(
+        'novel_heads',
+        sa.Column('novel_id', sa.Integer, sa.ForeignKey('novels.id'), primary_key=True),
+        sa.Column('iteration_id', sa.Integer, sa.ForeignKey('novel_iterations.id'), nullable=True),
+        sa.Column('iteration_number', sa.Integer, nullable=False, server_default='0')
+    )
+
+    # Seed the default novel (id 1) used by requests that do not name a novel. The ID is explicit, so on
+    # PostgreSQL the sequence is moved past it for the next novel
+    op.execute(sa.text("INSERT INTO novels (id, title) VALUES (1, 'Untitled')"))
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text("SELECT setval(pg_get_serial_sequence('novels', 'id'), (SELECT MAX(id) FROM novels))"))
+    op.execute(sa.text("INSERT INTO novel_heads (novel_id, iteration_number) SELECT id, 0 FROM novels"))
+
+def downgrade():
+    op.drop_table('novel_heads')
+    op.drop_index('ix_novel_iterations_novel_id_iteration_number', table_name='novel_iterations')
+    op.drop_table('novel_iterations')
+    op.drop_index('ix_novels_owner_id', table_name='novels')
+    op.drop_table('novels')
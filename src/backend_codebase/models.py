@@ -1,5 +1,6 @@
+import uuid
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, ForeignKey, Index, Integer, LargeBinary, String, Text, DateTime, JSON, Uuid, func
 
 Base = declarative_base()
 
@@ -11,3 +12,51 @@ class User(Base):
     password_hash = Column(String(128), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class UserInput(Base):
+    __tablename__ = 'user_inputs'
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, nullable=True)
+    plot = Column(Text, nullable=False)
+    setting = Column(Text, nullable=False)
+    theme = Column(Text, nullable=False)
+    conflict = Column(Text, nullable=False)
+    additional_preferences = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Feedback(Base):
+    __tablename__ = 'feedback'
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id = Column(Uuid, nullable=True)
+    feedback = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class Novel(Base):
+    __tablename__ = 'novels'
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    title = Column(String(255), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+class NovelIteration(Base):
+    __tablename__ = 'novel_iterations'
+    id = Column(Integer, primary_key=True)
+    novel_id = Column(Integer, ForeignKey('novels.id'), nullable=False)
+    iteration_number = Column(Integer, nullable=False)
+    # Plain text for 'text' rows; 'snapshot' and 'delta' rows keep compressed content in payload (see iteration_store)
+    content = Column(Text, nullable=True)
+    encoding = Column(String(16), nullable=False, default='text', server_default='text')
+    payload = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    __table_args__ = (
+        Index('ix_novel_iterations_novel_id_iteration_number', 'novel_id', 'iteration_number', unique=True),
+    )
+
+# Points at the latest iteration of each novel; updated in the same transaction as every new iteration
+class NovelHead(Base):
+    __tablename__ = 'novel_heads'
+    novel_id = Column(Integer, ForeignKey('novels.id'), primary_key=True)
+    iteration_id = Column(Integer, ForeignKey('novel_iterations.id'), nullable=True)
+    iteration_number = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,227 @@
+import atexit
+import bcrypt
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+class HasherSaturatedError(Exception):
+    """
+    Raised when every hashing slot is taken and the request should be retried later.
+
+    Attributes:
+    retry_after (int): Suggested number of seconds to wait before retrying.
+    """
+    def __init__(self, retry_after):
+        super().__init__('Password hashing capacity exhausted.')
+        self.retry_after = retry_after
+
+
+def _to_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    """
+    Reads the cost factor of a bcrypt hash.
+
+    Args:
+    hashed (str or bytes): The bcrypt hash, e.g. '$2b$12$...'.
+
+    Returns:
+    int: The cost factor (log2 of the number of rounds).
+    """
+    return int(_to_bytes(hashed).split(b'$')[2])
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords with bcrypt on a bounded process pool.
+
+    Hashes run in worker processes so they spread across cores instead of occupying request threads. At most
+    `max_pending` hashes may be queued or running; further calls fail fast with HasherSaturatedError. Batches take a
+    slot per password but never more than `batch_slots` at once, so logins are never queued behind a whole batch.
+
+    Attributes:
+    rounds (int): The bcrypt cost factor for new hashes.
+    workers (int): The number of worker processes, or 0 to hash on the calling thread.
+    max_pending (int): The maximum number of hashes queued or running at once.
+    retry_after (int): Seconds clients are asked to wait when the pool is saturated.
+    batch_slots (int): The most slots a batch holds at once. Defaults to half of `max_pending`.
+    start_method (str): How worker processes are started. Defaults to 'forkserver' where available, else 'spawn';
+        forking a threaded server can copy locks held by other threads into the workers.
+    """
+    def __init__(self, rounds=12, workers=None, max_pending=None, retry_after=1, batch_slots=None, start_method=None):
+        self.rounds = rounds
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(self.workers, 1) * 4
+        self.retry_after = retry_after
+        self.batch_slots = min(batch_slots or max(self.max_pending // 2, 1), self.max_pending)
+        self.start_method = start_method or (
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def hash(self, password):
+        """
+        Hashes a password with the configured cost factor.
+
+        Args:
+        password (str): The password to hash.
+
+        Returns:
+        str: The bcrypt hash.
+
+        Raises:
+        HasherSaturatedError: If the pool is saturated.
+        """
+        return self._run(_hashpw, _to_bytes(password), self.rounds)
+
+    def hash_many(self, passwords):
+        """
+        Hashes a batch of passwords across all worker processes.
+
+        Each password takes its own pending slot, and at most `batch_slots` are in flight at once, so the batch queues
+        alongside single hashes instead of ahead of them. Once the batch is running, it waits up to `retry_after`
+        seconds for a free slot rather than failing halfway.
+
+        Args:
+        passwords (list): The passwords to hash.
+
+        Returns:
+        list: The bcrypt hashes, in the same order.
+
+        Raises:
+        HasherSaturatedError: If the pool is saturated.
+        """
+        encoded = [_to_bytes(password) for password in passwords]
+        if self.workers == 0:
+            return [self._run(_hashpw, password, self.rounds) for password in encoded]
+
+        hashes, in_flight = [], deque()
+        try:
+            for password in encoded:
+                if len(in_flight) >= self.batch_slots:
+                    hashes.append(self._collect(in_flight))
+                # Only the first slot fails fast; later ones wait, since the batch already holds slots it will free
+                if not (self._slots.acquire(timeout=self.retry_after) if in_flight else self._slots.acquire(False)):
+                    raise HasherSaturatedError(self.retry_after)
+                try:
+                    in_flight.append(self._get_executor().submit(_hashpw, password, self.rounds))
+                except BaseException:
+                    self._slots.release()
+                    raise
+            while in_flight:
+                hashes.append(self._collect(in_flight))
+            return hashes
+        finally:
+            for future in in_flight:
+                future.cancel()
+                self._slots.release()
+
+    def verify(self, password, hashed):
+        """
+        Checks a password against a stored bcrypt hash.
+
+        Args:
+        password (str): The password to check.
+        hashed (str or bytes): The stored hash.
+
+        Returns:
+        bool: True if the password matches.
+
+        Raises:
+        HasherSaturatedError: If the pool is saturated.
+        """
+        return self._run(_checkpw, _to_bytes(password), _to_bytes(hashed))
+
+    def needs_rehash(self, hashed):
+        """
+        Tells whether a stored hash was made with a different cost factor than the configured one.
+
+        Args:
+        hashed (str or bytes): The stored hash.
+
+        Returns:
+        bool: True if the hash should be replaced.
+        """
+        return hash_rounds(hashed) != self.rounds
+
+    def start(self):
+        """
+        Creates the worker pool, if hashing runs in worker processes. Call it at startup, before the server starts
+        its request threads; otherwise the pool is created on first use.
+        """
+        if self.workers != 0:
+            self._get_executor()
+
+    def shutdown(self):
+        """
+        Stops the worker processes.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherSaturatedError(self.retry_after)
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _collect(self, in_flight):
+        future = in_flight.popleft()
+        try:
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def _get_executor(self):
+        # Created on start or first use so importing the module does not start processes
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method)
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+
+def hasher_from_env():
+    """
+    Builds the password hasher configured by the BCRYPT_ROUNDS and PASSWORD_HASH_* environment variables.
+
+    Returns:
+    PasswordHasher: The configured hasher.
+    """
+    workers = os.getenv('PASSWORD_HASH_WORKERS')
+    max_pending = os.getenv('PASSWORD_HASH_MAX_PENDING')
+    batch_slots = os.getenv('PASSWORD_HASH_BATCH_SLOTS')
+    return PasswordHasher(
+        rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+        workers=int(workers) if workers is not None else None,
+        max_pending=int(max_pending) if max_pending is not None else None,
+        retry_after=int(os.getenv('PASSWORD_HASH_RETRY_AFTER', '1')),
+        batch_slots=int(batch_slots) if batch_slots is not None else None,
+        start_method=os.getenv('PASSWORD_HASH_START_METHOD') or None
+    )
+
+
+password_hasher = hasher_from_env()
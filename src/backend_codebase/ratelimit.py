@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from .context import estimate_tokens
+
+INTERACTIVE = 0
+BATCH = 1
+
+
+class RateLimitTimeoutError(Exception):
+    pass
+
+
+def estimate_request_tokens(messages, max_tokens):
+    """
+    Estimates how many tokens a model call counts against the tokens-per-minute limit.
+
+    Upstream counts the prompt plus the completion it reserves, so the estimate is the prompt's estimated size plus
+    the request's max_tokens.
+
+    Args:
+    messages (list or str): The chat messages, or a plain prompt.
+    max_tokens (int): The completion budget of the request.
+
+    Returns:
+    int: The estimated token cost.
+    """
+    if isinstance(messages, str):
+        prompt_tokens = estimate_tokens(messages)
+    else:
+        prompt_tokens = sum(estimate_tokens(message.get('content') or '') for message in messages)
+    return prompt_tokens + max_tokens
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously up to its capacity.
+
+    Attributes:
+    rate (float): Tokens added per second.
+    capacity (float): The most tokens the bucket holds, i.e. the largest burst.
+    level (float): The tokens currently available.
+    """
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = now
+
+    def time_until(self, amount, now):
+        """
+        Returns how long until `amount` tokens are available, or 0 if they are available now.
+        """
+        self._refill(now)
+        return max(amount - self.level, 0.0) / self.rate
+
+    def take(self, amount, now):
+        """
+        Removes `amount` tokens from the bucket.
+        """
+        self._refill(now)
+        self.level -= amount
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RateScheduler:
+    """
+    Admits model calls under requests-per-minute and tokens-per-minute limits, in priority order.
+
+    Callers wait in a priority queue (lower values first, FIFO within a priority). The head of the queue is admitted
+    once both buckets hold enough for it, so lower priorities never overtake higher ones. The buckets refill at
+    `headroom` times the limits, which keeps throughput just under them rather than bursting into 429s.
+
+    Attributes:
+    rpm (int): The requests-per-minute limit.
+    tpm (int): The tokens-per-minute limit.
+    """
+    def __init__(self, rpm, tpm, headroom=0.95, burst_seconds=10, clock=time.monotonic, window=1000):
+        self.rpm = rpm
+        self.tpm = tpm
+        now = clock()
+        burst = burst_seconds / 60
+        self._requests = TokenBucket(rpm * headroom / 60, max(rpm * headroom * burst, 1), now)
+        self._tokens = TokenBucket(tpm * headroom / 60, max(tpm * headroom * burst, 1), now)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._admitted = {INTERACTIVE: 0, BATCH: 0}
+        self._tokens_admitted = 0
+        self._timeouts = 0
+        self._queue_times = deque(maxlen=window)
+        self._queue_time_total = 0.0
+
+    def acquire(self, tokens, priority=INTERACTIVE, timeout=None):
+        """
+        Blocks until a call costing `tokens` may be sent.
+
+        Args:
+        tokens (int): The estimated token cost of the call. Costs above the burst capacity wait for a full bucket.
+        priority (int, optional): INTERACTIVE or BATCH. Defaults to INTERACTIVE.
+        timeout (float, optional): The longest to wait, in seconds. Defaults to None, which waits indefinitely.
+
+        Returns:
+        float: The seconds spent queued.
+
+        Raises:
+        RateLimitTimeoutError: If the call cannot be admitted within `timeout`.
+        """
+        tokens = min(tokens, self._tokens.capacity)
+        start = self._clock()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = self._clock()
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = max(self._requests.time_until(1, now), self._tokens.time_until(tokens, now))
+                        if wait <= 0:
+                            self._requests.take(1, now)
+                            self._tokens.take(tokens, now)
+                            break
+                    if timeout is not None:
+                        left = start + timeout - now
+                        if left <= 0 or (wait is not None and wait > left):
+                            self._timeouts += 1
+                            raise RateLimitTimeoutError(f'Not admitted within {timeout:.1f}s by the model rate limiter.')
+                        wait = left if wait is None else min(wait, left)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+            queued = now - start
+            self._admitted[priority] = self._admitted.get(priority, 0) + 1
+            self._tokens_admitted += tokens
+            self._queue_times.append(queued)
+            self._queue_time_total += queued
+        return queued
+
+    def stats(self):
+        """
+        Returns the scheduler's limits, admissions and queue-time latency.
+
+        Returns:
+        dict: The limits, requests admitted per priority, tokens admitted, timeouts, the current queue length, and
+        the total, p50, p95 and max queue time in seconds over the recent window.
+        """
+        with self._cond:
+            samples = sorted(self._queue_times)
+            stats = {
+                'rpm': self.rpm,
+                'tpm': self.tpm,
+                'admitted_interactive': self._admitted.get(INTERACTIVE, 0),
+                'admitted_batch': self._admitted.get(BATCH, 0),
+                'tokens_admitted': self._tokens_admitted,
+                'timeouts': self._timeouts,
+                'queued': len(self._waiters),
+                'queue_time_total': self._queue_time_total,
+            }
+        stats['queue_time_p50'] = samples[len(samples) // 2] if samples else 0.0
+        stats['queue_time_p95'] = samples[min(len(samples) - 1, int(0.95 * len(samples)))] if samples else 0.0
+        stats['queue_time_max'] = samples[-1] if samples else 0.0
+        return stats
+
+
+def scheduler_from_env():
+    """
+    Builds the model rate scheduler configured by the MODEL_RPM and MODEL_TPM environment variables.
+
+    Returns:
+    RateScheduler: The configured scheduler, or None if either limit is 0.
+    """
+    rpm = int(os.getenv('MODEL_RPM', '500'))
+    tpm = int(os.getenv('MODEL_TPM', '40000'))
+    if rpm <= 0 or tpm <= 0:
+        return None
+    return RateScheduler(
+        rpm,
+        tpm,
+        headroom=float(os.getenv('MODEL_RATE_HEADROOM', '0.95')),
+        burst_seconds=float(os.getenv('MODEL_RATE_BURST_SECONDS', '10'))
+    )
+
+
+scheduler = scheduler_from_env()
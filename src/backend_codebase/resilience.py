@@ -0,0 +1,288 @@
+import openai
+import os
+import random
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+TRANSIENT_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIConnectionError,
+    openai.error.Timeout,
+    openai.error.ServiceUnavailableError,
+    openai.error.TryAgain,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling upstream while the circuit breaker is open.
+
+    Attributes:
+    retry_after (float): Seconds until the breaker lets a probe request through.
+    """
+    def __init__(self, retry_after):
+        super().__init__(f'Upstream is unavailable; retry in {retry_after:.1f}s.')
+        self.retry_after = retry_after
+
+
+def is_transient(error):
+    """
+    Tells whether an upstream error is worth retrying.
+
+    Rate limits, timeouts, connection failures and 5xx responses are transient. Invalid requests, authentication
+    and permission errors are not, since retrying them gives the same answer.
+
+    Args:
+    error (Exception): The error raised by the upstream call.
+
+    Returns:
+    bool: True if the call may succeed when retried.
+    """
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    if type(error) is openai.error.APIError:
+        return error.http_status is None or error.http_status >= 500
+    return False
+
+
+def is_upstream_answer(error):
+    """
+    Tells whether an error is an answer from upstream, i.e. an openai error carrying an HTTP status.
+
+    Errors raised locally, such as a rate limiter timing out or a bug in the caller, say nothing about upstream's
+    health.
+
+    Args:
+    error (Exception): The error raised by the upstream call.
+
+    Returns:
+    bool: True if upstream responded.
+    """
+    return isinstance(error, openai.error.OpenAIError) and error.http_status is not None
+
+
+class CircuitBreaker:
+    """
+    Fails fast while upstream is unhealthy.
+
+    After `failure_threshold` consecutive transient failures the breaker opens and rejects calls for
+    `recovery_timeout` seconds. It then lets a single probe through (half-open); a success closes it again and a
+    failure reopens it.
+
+    Attributes:
+    failure_threshold (int): Consecutive failures that open the breaker.
+    recovery_timeout (float): Seconds the breaker stays open before probing.
+    state (str): CLOSED, OPEN or HALF_OPEN.
+    opened (int): The number of times the breaker has opened.
+    """
+    def __init__(self, failure_threshold=5, recovery_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        Admits a call, or rejects it while the breaker is open.
+
+        Raises:
+        CircuitOpenError: If the breaker is open, or half-open with a probe already in flight.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.recovery_timeout - self._clock()
+                if remaining > 0:
+                    raise CircuitOpenError(remaining)
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(self.recovery_timeout)
+                self._probing = True
+
+    def record_success(self):
+        """
+        Records a call that reached a healthy upstream, closing the breaker.
+        """
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self.state = CLOSED
+
+    def record_failure(self):
+        """
+        Records a transient failure, opening the breaker once the threshold is reached or a probe fails.
+        """
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+
+    def release(self):
+        """
+        Records a call that never reached upstream, leaving the state unchanged but letting another probe through.
+        """
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        """
+        Returns the breaker state.
+
+        Returns:
+        dict: The state, consecutive failures and number of times opened.
+        """
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self._failures, 'opened': self.opened}
+
+
+class Resilience:
+    """
+    Runs upstream calls with classified retries, exponential backoff with full jitter, a deadline and a circuit
+    breaker.
+
+    Attributes:
+    max_attempts (int): The maximum number of attempts per call.
+    base_delay (float): The backoff ceiling for the first retry, in seconds.
+    max_delay (float): The largest backoff ceiling, in seconds.
+    deadline (float): The default time budget per call in seconds, or None for no budget.
+    breaker (CircuitBreaker): The circuit breaker, or None to disable it.
+    classify (callable): Tells whether an error is transient.
+    """
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0, deadline=30.0, breaker=None,
+                 classify=is_transient, sleep=time.sleep, clock=time.monotonic, rng=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker
+        self.classify = classify
+        self._sleep = sleep
+        self._clock = clock
+        self._rng = rng
+        self._counts = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'deadline_exceeded': 0}
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """
+        Picks the delay before a retry, uniformly between zero and an exponentially growing ceiling.
+
+        Args:
+        attempt (int): The number of attempts made so far, starting at 1.
+
+        Returns:
+        float: The delay in seconds.
+        """
+        return self._rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def call(self, fn, deadline=None, max_attempts=None):
+        """
+        Calls `fn` until it succeeds, fails with a permanent error, runs out of attempts or runs out of time.
+
+        Args:
+        fn (callable): The upstream call. It receives the seconds left in the budget (or None) so it can pass
+            them on as a request timeout.
+        deadline (float, optional): The time budget for this call in seconds. Defaults to the configured deadline.
+        max_attempts (int, optional): Overrides the configured number of attempts.
+
+        Returns:
+        The result of `fn`.
+
+        Raises:
+        CircuitOpenError: If the circuit breaker is open.
+        Exception: The last error raised by `fn`.
+        """
+        budget = self.deadline if deadline is None else deadline
+        expires_at = None if budget is None else self._clock() + budget
+        attempts = max_attempts or self.max_attempts
+        self._count('calls')
+
+        for attempt in range(1, attempts + 1):
+            if self.breaker is not None:
+                try:
+                    self.breaker.before_call()
+                except CircuitOpenError:
+                    self._count('rejected')
+                    raise
+            remaining = None if expires_at is None else max(expires_at - self._clock(), 0.0)
+            try:
+                result = fn(remaining)
+            except Exception as e:
+                transient = self.classify(e)
+                if self.breaker is not None:
+                    # Permanent errors from upstream mean it answered, so they do not count against its health; local
+                    # errors say nothing either way and only free the half-open probe
+                    if transient:
+                        self.breaker.record_failure()
+                    elif is_upstream_answer(e):
+                        self.breaker.record_success()
+                    else:
+                        self.breaker.release()
+                if not transient or attempt == attempts:
+                    self._count('failures')
+                    raise
+                delay = self.backoff(attempt)
+                if expires_at is not None and self._clock() + delay >= expires_at:
+                    self._count('deadline_exceeded')
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                self._sleep(delay)
+                continue
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
+
+    def stats(self):
+        """
+        Returns the retry counters and circuit breaker state.
+
+        Returns:
+        dict: Calls, retries, failures, calls rejected by the breaker, calls cut short by their deadline, and the
+        breaker stats under 'circuit'.
+        """
+        with self._lock:
+            stats = dict(self._counts)
+        stats['circuit'] = self.breaker.stats() if self.breaker is not None else None
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+
+def resilience_from_env():
+    """
+    Builds the resilience layer configured by the UPSTREAM_* environment variables.
+
+    Returns:
+    Resilience: The configured layer, with a circuit breaker.
+    """
+    deadline = float(os.getenv('UPSTREAM_DEADLINE', '30'))
+    return Resilience(
+        max_attempts=int(os.getenv('UPSTREAM_MAX_ATTEMPTS', '3')),
+        base_delay=float(os.getenv('UPSTREAM_BACKOFF_BASE', '0.5')),
+        max_delay=float(os.getenv('UPSTREAM_BACKOFF_MAX', '8')),
+        deadline=deadline if deadline > 0 else None,
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', '5')),
+            recovery_timeout=float(os.getenv('UPSTREAM_BREAKER_RECOVERY', '30'))
+        )
+    )
+
+
+upstream = resilience_from_env()
@@ -64,3 +64,62 @@ class UserSchema(Schema):
     password = fields.Str(required=True, validate=validate.Length(min=8))
     created_at = fields.DateTime(required=False, dump_only=True)
     updated_at = fields.DateTime(required=False, dump_only=True)
+
+
+# Schemas hold no per-request state, so one instance of each is shared by every request
+user_input_schema = UserInputSchema()
+feedback_schema = FeedbackSchema()
+
+_USER_INPUT_TEXT_FIELDS = ('plot', 'setting', 'theme', 'conflict')
+_USER_INPUT_FIELDS = frozenset(_USER_INPUT_TEXT_FIELDS + ('user_id', 'additional_preferences'))
+
+
+def load_user_input(data):
+    """
+    Deserialize and validate a user input payload in a single pass.
+
+    The common payload (the four text fields, no user ID, and an optional preferences object) is checked directly,
+    which gives the same result as `user_input_schema.load` at a fraction of the cost. Anything else, including every
+    invalid payload, goes through the schema so errors are reported exactly as before.
+
+    Args:
+    data (dict): The request payload.
+
+    Returns:
+    dict: The loaded user input.
+
+    Raises:
+    ValidationError: If the payload is invalid.
+    """
+    if (
+        type(data) is dict
+        and data.keys() <= _USER_INPUT_FIELDS
+        and data.get('user_id') is None
+        and all(type(data.get(name)) is str and data[name] for name in _USER_INPUT_TEXT_FIELDS)
+    ):
+        preferences = data.get('additional_preferences')
+        if preferences is None or type(preferences) is dict:
+            loaded = {name: data[name] for name in _USER_INPUT_TEXT_FIELDS}
+            loaded['user_id'] = None
+            loaded['additional_preferences'] = dict(preferences) if preferences is not None else None
+            return loaded
+    return user_input_schema.load(data)
+
+
+def load_feedback(data):
+    """
+    Deserialize and validate a feedback payload in a single pass, with the same direct check for the common case
+    as `load_user_input`.
+
+    Args:
+    data (dict): The request payload.
+
+    Returns:
+    dict: The loaded feedback.
+
+    Raises:
+    ValidationError: If the payload is invalid.
+    """
+    if type(data) is dict and data.keys() == {'feedback'} and type(data['feedback']) is str and data['feedback']:
+        return {'feedback': data['feedback']}
+    return feedback_schema.load(data)
@@ -1,18 +1,70 @@
-import openai
 import os
 from dotenv import load_dotenv
-import bcrypt
-import jwt
-from datetime import datetime, timedelta
+from .ai_integration import openai_client
+from .passwords import password_hasher
+from .ratelimit import BATCH
+from .tokens import token_manager
 
 load_dotenv()
 
-openai.api_key = os.getenv('OPENAI_API_KEY')
-JWT_SECRET = os.getenv('JWT_SECRET', 'your_jwt_secret')
-JWT_ALGORITHM = 'HS256'
+# Model tiers: short, simple tasks go to the cheaper, faster model
+MODEL_TIERS = {
+    'large': os.getenv('MODEL_TIER_LARGE', 'gpt-4'),
+    'small': os.getenv('MODEL_TIER_SMALL', 'gpt-3.5-turbo'),
+}
+
+# Per-task prompt templates, completion budgets and model tiers
+GENERATION_TASKS = {
+    'chapter': {
+        'template': "Title: {title}\nPrevious Content: {previous_content}\nUser Prompts: {user_prompts}\nGenerate the next chapter content:",
+        'max_tokens': 1024,
+        'tier': 'large',
+    },
+    'character_profile': {
+        'template': "Character Name: {character_name}\nTraits: {traits}\nBackstory: {backstory}\nGenerate a detailed character profile:",
+        'max_tokens': 600,
+        'tier': 'large',
+    },
+    'plot_twist': {
+        'template': "Current Plot: {current_plot}\nUser Suggestions: {user_suggestions}\nGenerate a plot twist:",
+        'max_tokens': 200,
+        'tier': 'small',
+    },
+}
+
+
+def generate(task, n=1, priority=BATCH, **fields):
+    """
+    Run a generation task through the shared chat client, which brings retries with backoff, the circuit breaker and
+    the rate scheduler. Generations are sampled, so they bypass the response cache and single-flight coalescing.
 
+    Parameters:
+    task (str): The name of a task in GENERATION_TASKS.
+    n (int): The number of variants to generate in the one call. Defaults to 1.
+    priority (int): The rate scheduler priority. Defaults to BATCH.
+    **fields: The values for the task's prompt template.
 
-def generate_chapter_content(title, previous_content, user_prompts):
+    Returns:
+    str or list: The generated text, or a list of `n` variants if `n` is greater than 1.
+    """
+    spec = GENERATION_TASKS[task]
+    # Each call is a fresh sample, so identical requests (e.g. repeated batch items) are neither coalesced nor cached
+    return openai_client.chat_completions_create(
+        model=MODEL_TIERS[spec['tier']],
+        messages=[{'role': 'user', 'content': spec['template'].format(**fields)}],
+        temperature=0.7,
+        max_tokens=spec['max_tokens'],
+        top_p=1.0,
+        frequency_penalty=0.0,
+        presence_penalty=0.0,
+        priority=priority,
+        n=n,
+        use_cache=False,
+        coalesce=False
+    )
+
+
+def generate_chapter_content(title, previous_content, user_prompts, n=1):
     """
     Generate the next chapter content based on the title, previous content, and user prompts.
 
@@ -20,9 +72,10 @@ def generate_chapter_content(title, previous_content, user_prompts):
     title (str): The title of the chapter.
     previous_content (str): The content of the previous chapter.
     user_prompts (str): User-provided prompts for the next chapter.
+    n (int): The number of variants to generate. Defaults to 1.
 
     Returns:
-    str: The generated content for the next chapter.
+    str or list: The generated content for the next chapter, or a list of `n` variants if `n` is greater than 1.
 
     Raises:
     ValueError: If any of the input parameters are empty.
@@ -31,22 +84,13 @@ def generate_chapter_content(title, previous_content, user_prompts):
     if not title or not previous_content or not user_prompts:
         raise ValueError('All input parameters must be provided and non-empty.')
 
-    prompt = f"Title: {title}\nPrevious Content: {previous_content}\nUser Prompts: {user_prompts}\nGenerate the next chapter content:"
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=1024,
-            n=1,
-            stop=None,
-            temperature=0.7,
-        )
-        return response.choices[0].text.strip()
+        return generate('chapter', n=n, title=title, previous_content=previous_content, user_prompts=user_prompts)
     except Exception as e:
         raise RuntimeError(f"Failed to generate content: {str(e)}")
 
 
-def generate_character_profile(character_name, traits, backstory):
+def generate_character_profile(character_name, traits, backstory, n=1):
     """
     Generate a detailed character profile based on the character name, traits, and backstory.
 
@@ -54,9 +98,10 @@ def generate_character_profile(character_name, traits, backstory):
     character_name (str): The name of the character.
     traits (str): The traits of the character.
     backstory (str): The backstory of the character.
+    n (int): The number of variants to generate. Defaults to 1.
 
     Returns:
-    str: The generated character profile.
+    str or list: The generated character profile, or a list of `n` variants if `n` is greater than 1.
 
     Raises:
     ValueError: If any of the input parameters are empty.
@@ -65,31 +110,23 @@ def generate_character_profile(character_name, traits, backstory):
     if not character_name or not traits or not backstory:
         raise ValueError('All input parameters must be provided and non-empty.')
 
-    prompt = f"Character Name: {character_name}\nTraits: {traits}\nBackstory: {backstory}\nGenerate a detailed character profile:"
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=1024,
-            n=1,
-            stop=None,
-            temperature=0.7,
-        )
-        return response.choices[0].text.strip()
+        return generate('character_profile', n=n, character_name=character_name, traits=traits, backstory=backstory)
     except Exception as e:
         raise RuntimeError(f"Failed to generate character profile: {str(e)}")
 
 
-def generate_plot_twist(current_plot, user_suggestions):
+def generate_plot_twist(current_plot, user_suggestions, n=1):
     """
     Generate a plot twist based on the current plot and user suggestions.
 
     Parameters:
     current_plot (str): The current plot of the story.
     user_suggestions (str): User-provided suggestions for the plot twist.
+    n (int): The number of variants to generate. Defaults to 1.
 
     Returns:
-    str: The generated plot twist.
+    str or list: The generated plot twist, or a list of `n` variants if `n` is greater than 1.
 
     Raises:
     ValueError: If any of the input parameters are empty.
@@ -98,24 +135,15 @@ def generate_plot_twist(current_plot, user_suggestions):
     if not current_plot or not user_suggestions:
         raise ValueError('All input parameters must be provided and non-empty.')
 
-    prompt = f"Current Plot: {current_plot}\nUser Suggestions: {user_suggestions}\nGenerate a plot twist:"
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=1024,
-            n=1,
-            stop=None,
-            temperature=0.7,
-        )
-        return response.choices[0].text.strip()
+        return generate('plot_twist', n=n, current_plot=current_plot, user_suggestions=user_suggestions)
     except Exception as e:
         raise RuntimeError(f"Failed to generate plot twist: {str(e)}")
 
 
 def hash_password(password):
     """
-    Hash a password using bcrypt.
+    Hash a password using bcrypt on the shared password hashing pool.
 
     Parameters:
     password (str): The password to hash.
@@ -123,7 +151,7 @@ def hash_password(password):
     Returns:
     str: The hashed password.
     """
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def signup(username, password):
@@ -152,11 +180,7 @@ def generate_token(username):
     Returns:
     str: The generated JWT token.
     """
-    payload = {
-        'username': username,
-        'exp': datetime.utcnow() + timedelta(days=1)  # Token expires in 1 day
-    }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return token_manager.issue({'username': username})
 
 
 def login(username, password):
@@ -176,7 +200,7 @@ def login(username, password):
     # Here you would typically retrieve the hashed password from the database
     stored_hashed_password = hash_password(password)  # This is just a placeholder
 
-    if bcrypt.checkpw(password.encode('utf-8'), stored_hashed_password.encode('utf-8')):
+    if password_hasher.verify(password, stored_hashed_password):
         token = generate_token(username)
         return {'username': username, 'token': token}
     else:
@@ -0,0 +1,76 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is in flight wait for it
+    and receive the same result, or the same exception.
+
+    Attributes:
+    calls (int): The number of executions performed.
+    coalesced (int): The number of callers that shared another caller's execution.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Runs `fn` unless a call with the same key is already in flight, in which case its result is shared.
+
+        Args:
+        key (str): The key identifying identical calls.
+        fn (callable): The function to run.
+
+        Returns:
+        object: The return value of `fn`.
+
+        Raises:
+        Exception: Whatever `fn` raised.
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Returns the coalescing counters.
+
+        Returns:
+        dict: The number of executions, coalesced callers and calls currently in flight.
+        """
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight)}
@@ -0,0 +1,175 @@
+import jwt
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class InvalidTokenError(Exception):
+    pass
+
+
+class TokenManager:
+    """
+    Issues and verifies HS256 JWTs without touching the database.
+
+    Tokens carry the ID of their signing key in the `kid` header, so a key can be rotated in while tokens signed
+    with the previous one stay valid until it is retired. Verified claims are kept in a small LRU keyed by the token,
+    so a repeated token costs a dictionary lookup and an expiry comparison instead of a signature check.
+
+    Attributes:
+    keys (dict): Signing secrets by key ID.
+    active_kid (str): The ID of the key new tokens are signed with.
+    algorithm (str): The JWT signing algorithm.
+    ttl (int): The lifetime of new tokens, in seconds.
+    cache_size (int): The maximum number of verified tokens kept in the claims cache.
+    hits (int): The number of verifications served from the claims cache.
+    misses (int): The number of verifications that checked a signature.
+    """
+    def __init__(self, keys, active_kid, algorithm='HS256', ttl=86400, cache_size=1024, clock=time.time):
+        if active_kid not in keys:
+            raise ValueError(f'Unknown active key ID: {active_kid}')
+        self.keys = {kid: secret.encode('utf-8') if isinstance(secret, str) else secret for kid, secret in keys.items()}
+        self.active_kid = active_kid
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._claims = OrderedDict()
+        self._lock = threading.Lock()
+
+    def issue(self, claims, ttl=None):
+        """
+        Signs a token with the active key.
+
+        Args:
+        claims (dict): The claims to include, e.g. {'user_id': '42'}.
+        ttl (int, optional): The lifetime of the token in seconds. Defaults to the manager's ttl.
+
+        Returns:
+        str: The encoded token.
+        """
+        now = int(self._clock())
+        payload = {**claims, 'iat': now, 'exp': now + (self.ttl if ttl is None else ttl)}
+        return jwt.encode(payload, self.keys[self.active_kid], algorithm=self.algorithm, headers={'kid': self.active_kid})
+
+    def verify(self, token):
+        """
+        Checks a token's signature, key ID and expiry.
+
+        Args:
+        token (str): The encoded token.
+
+        Returns:
+        dict: The verified claims.
+
+        Raises:
+        InvalidTokenError: If the token is malformed, expired, or signed with an unknown key.
+        """
+        now = self._clock()
+        with self._lock:
+            cached = self._claims.get(token)
+            if cached is not None:
+                kid, claims = cached
+                if claims['exp'] > now and kid in self.keys:
+                    self._claims.move_to_end(token)
+                    self.hits += 1
+                    return claims
+                del self._claims[token]
+            self.misses += 1
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as e:
+            raise InvalidTokenError(str(e)) from e
+        secret = self.keys.get(kid)
+        if secret is None:
+            raise InvalidTokenError(f'Unknown key ID: {kid}')
+        try:
+            claims = jwt.decode(
+                token, secret, algorithms=[self.algorithm],
+                options={'require': ['exp'], 'verify_exp': False, 'verify_iat': False}
+            )
+        except jwt.InvalidTokenError as e:
+            raise InvalidTokenError(str(e)) from e
+        # Expiry is checked here against the manager's clock, the same way cached claims are
+        if not isinstance(claims['exp'], (int, float)) or claims['exp'] <= now:
+            raise InvalidTokenError('Signature has expired')
+
+        with self._lock:
+            self._claims[token] = (kid, claims)
+            self._claims.move_to_end(token)
+            while len(self._claims) > self.cache_size:
+                self._claims.popitem(last=False)
+        return claims
+
+    def rotate(self, kid, secret):
+        """
+        Makes a new key the signing key. Tokens signed with earlier keys stay valid until those keys are retired.
+
+        Args:
+        kid (str): The ID of the new key.
+        secret (str or bytes): The new secret.
+        """
+        with self._lock:
+            self.keys[kid] = secret.encode('utf-8') if isinstance(secret, str) else secret
+            self.active_kid = kid
+
+    def retire(self, kid):
+        """
+        Stops accepting tokens signed with a key, including ones already in the claims cache.
+
+        Args:
+        kid (str): The ID of the key to retire.
+
+        Raises:
+        ValueError: If the key is the active signing key.
+        """
+        with self._lock:
+            if kid == self.active_kid:
+                raise ValueError('Cannot retire the active key.')
+            self.keys.pop(kid, None)
+            for token in [token for token, (token_kid, _) in self._claims.items() if token_kid == kid]:
+                del self._claims[token]
+
+    def stats(self):
+        """
+        Returns the claims cache statistics.
+
+        Returns:
+        dict: The hits, misses and current size of the claims cache.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._claims)}
+
+
+def manager_from_env():
+    """
+    Builds the token manager configured by the JWT_* environment variables.
+
+    JWT_SECRET signs new tokens under the key ID JWT_KEY_ID. JWT_PREVIOUS_KEYS lists keys that are still accepted
+    during a rotation, as comma-separated `kid=secret` pairs.
+
+    Returns:
+    TokenManager: The configured manager.
+    """
+    active_kid = os.getenv('JWT_KEY_ID', 'default')
+    keys = {}
+    for pair in filter(None, os.getenv('JWT_PREVIOUS_KEYS', '').split(',')):
+        kid, _, secret = pair.partition('=')
+        keys[kid.strip()] = secret.strip()
+    keys[active_kid] = os.getenv('JWT_SECRET', 'your_jwt_secret')
+    return TokenManager(
+        keys,
+        active_kid,
+        ttl=int(os.getenv('JWT_TTL', '86400')),
+        cache_size=int(os.getenv('JWT_CACHE_SIZE', '1024'))
+    )
+
+
+token_manager = manager_from_env()
@@ -0,0 +1,97 @@
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from .models import User
+
+EMAIL_TAKEN = 'Email already registered'
+USERNAME_TAKEN = 'Username already taken'
+
+
+def find_conflict(session, username, email):
+    """
+    Check in a single query whether an email or username is already in use.
+
+    Args:
+        session (Session): The database session.
+        username (str): The username to check.
+        email (str): The email address to check.
+
+    Returns:
+        str: EMAIL_TAKEN or USERNAME_TAKEN, or None if both are free. The email is reported first.
+    """
+    rows = session.execute(
+        select(User.email, User.username).where(or_(User.email == email, User.username == username)).limit(2)
+    ).all()
+    if any(row.email == email for row in rows):
+        return EMAIL_TAKEN
+    if rows:
+        return USERNAME_TAKEN
+    return None
+
+
+def create_user(session, username, email, password_hash):
+    """
+    Insert a user, relying on the unique indexes to catch a concurrent signup with the same email or username.
+
+    Args:
+        session (Session): The database session.
+        username (str): The username.
+        email (str): The email address.
+        password_hash (str): The bcrypt hash of the password.
+
+    Returns:
+        tuple: The new user and None, or None and EMAIL_TAKEN/USERNAME_TAKEN if the insert lost a race.
+        The caller is responsible for committing.
+    """
+    user = User(username=username, email=email, password_hash=password_hash)
+    session.add(user)
+    try:
+        session.flush()
+    except IntegrityError:
+        session.rollback()
+        conflict = find_conflict(session, username, email)
+        if conflict is None:
+            raise
+        return None, conflict
+    return user, None
+
+
+def bulk_create_users(session, users):
+    """
+    Insert a batch of users with one uniqueness query and one executemany insert.
+
+    Rows whose email or username already exists, or repeats an earlier row in the batch, are skipped.
+
+    Args:
+        session (Session): The database session.
+        users (list): Dicts with 'username', 'email' and 'password_hash' keys.
+
+    Returns:
+        list: For each row, None if it is inserted, or EMAIL_TAKEN/USERNAME_TAKEN. The caller is responsible for
+        committing, and an IntegrityError means a concurrent insert claimed one of the rows.
+    """
+    if not users:
+        return []
+    existing = session.execute(
+        select(User.email, User.username).where(or_(
+            User.email.in_({user['email'] for user in users}),
+            User.username.in_({user['username'] for user in users})
+        ))
+    ).all()
+    emails = {row.email for row in existing}
+    usernames = {row.username for row in existing}
+
+    errors, rows = [], []
+    for user in users:
+        if user['email'] in emails:
+            errors.append(EMAIL_TAKEN)
+        elif user['username'] in usernames:
+            errors.append(USERNAME_TAKEN)
+        else:
+            errors.append(None)
+            emails.add(user['email'])
+            usernames.add(user['username'])
+            rows.append({key: user[key] for key in ('username', 'email', 'password_hash')})
+
+    if rows:
+        session.execute(insert(User), rows)
+    return errors
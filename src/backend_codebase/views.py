@@ -4,14 +4,20 @@ from datetime import datetime, timedelta
 import uuid
 from .models import User
 from .schemas import UserSchema
-from sqlalchemy.exc import IntegrityError
 from . import db
-import bcrypt
-import jwt
+from .metrics import span
+from .passwords import HasherSaturatedError, password_hasher
+from .tokens import token_manager
+from .users import create_user, find_conflict
 from .validation import validate_username, validate_email_address, validate_password
 
 views_bp = Blueprint('views', __name__)
 
+@views_bp.errorhandler(HasherSaturatedError)
+def hasher_saturated(error):
+    # Shed load instead of queueing more password hashes behind a saturated pool
+    return jsonify({'error': 'Server busy, please retry later'}), 503, {'Retry-After': str(error.retry_after)}
+
 # Signup Endpoint
 @views_bp.route('/users', methods=['POST'])
 def signup():
@@ -31,20 +37,19 @@ def signup():
     if not validate_password(password):
         return jsonify({'error': 'Invalid password'}), 400
 
-    # Check if the email is already registered
-    if User.query.filter_by(email=email).first():
-        return jsonify({'error': 'Email already registered'}), 400
-
-    # Check if the username is already taken
-    if User.query.filter_by(username=username).first():
-        return jsonify({'error': 'Username already taken'}), 400
+    # Check the email and username in one query before spending a hash on a duplicate
+    conflict = find_conflict(db.session, username, email)
+    if conflict:
+        return jsonify({'error': conflict}), 400
 
     # Hash the password
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    with span('password_hash'):
+        password_hash = password_hasher.hash(password)
 
-    # Create a new user
-    new_user = User(username=username, email=email, password_hash=password_hash)
-    db.session.add(new_user)
+    # Create a new user; the unique indexes catch a concurrent signup that passed the check above
+    new_user, conflict = create_user(db.session, username, email, password_hash)
+    if conflict:
+        return jsonify({'error': conflict}), 400
     db.session.commit()
 
     return jsonify({'message': 'User created successfully'}), 201
@@ -70,10 +75,20 @@ def login():
         return jsonify({'error': 'Invalid credentials'}), 401
 
     # Check the password
-    if not bcrypt.checkpw(password.encode('utf-8'), user.password_hash):
+    with span('password_verify'):
+        verified = password_hasher.verify(password, user.password_hash)
+    if not verified:
         return jsonify({'error': 'Invalid credentials'}), 401
 
-    # Generate JWT token (replace 'your_secret_key' with your actual secret key)
-    token = jwt.encode({'user_id': str(user.id)}, 'your_secret_key', algorithm='HS256')
+    # Upgrade hashes made with a different cost factor while the plaintext is at hand
+    if password_hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        except HasherSaturatedError:
+            pass
+
+    # Issue a bearer token accepted by the /api/v1 routes
+    token = token_manager.issue({'user_id': str(user.id)})
 
     return jsonify({'token': token}), 200
@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from backend_codebase.models import Base
+
+
+@pytest.fixture
+def Session(tmp_path):
+    # A file database rather than :memory:, so threads get their own connections to the same data
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.sqlite3'}", connect_args={'timeout': 30})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def count_statements():
+    def count(engine):
+        statements = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        return statements
+    return count
@@ -1,6 +1,13 @@
+import openai
 import pytest
 from unittest.mock import patch
-from backend_codebase.ai_integration import generate_content
+from backend_codebase.ai_integration import OpenAI, OpenAIError, generate_content, generate_content_stream
+from backend_codebase.cache import MemoryCache
+from backend_codebase.ratelimit import BATCH, RateScheduler, estimate_request_tokens
+from backend_codebase.resilience import Resilience
+from backend_codebase.singleflight import SingleFlight
+import threading
+import time
 
 
 def test_generate_content():
@@ -21,3 +28,93 @@ def test_generate_content():
 
         content = generate_content(prompt)
         assert content == 'Generated content based on the prompt.'
+
+
+def test_generate_content_stream():
+    prompt = 'Once upon a time'
+    chunks = [
+        {'choices': [{'delta': {'role': 'assistant'}}]},
+        {'choices': [{'delta': {'content': 'Generated '}}]},
+        {'choices': [{'delta': {'content': 'content.'}}]},
+        {'choices': [{'delta': {}}]},
+    ]
+
+    with patch('backend_codebase.ai_integration.openai.ChatCompletion.create') as mock_create:
+        mock_create.return_value = iter(chunks)
+
+        content = list(generate_content_stream(prompt))
+        assert content == ['Generated ', 'content.']
+        assert mock_create.call_args.kwargs['stream'] is True
+
+
+def test_deterministic_requests_are_cached():
+    client = OpenAI(api_key='test', cache=MemoryCache())
+    messages = [{'role': 'user', 'content': 'Once upon a time'}]
+
+    with patch('backend_codebase.ai_integration.openai.ChatCompletion.create') as mock_create:
+        mock_create.return_value = {'choices': [{'message': {'content': 'Cached content.'}}]}
+
+        for _ in range(2):
+            assert client.chat_completions_create('gpt-4', messages, 0, 500, 1.0, 0.0, 0.0) == 'Cached content.'
+        assert mock_create.call_count == 1
+
+        client.chat_completions_create('gpt-4', messages, 0, 500, 1.0, 0.0, 0.0, use_cache=False)
+        client.chat_completions_create('gpt-4', messages, 0.7, 500, 1.0, 0.0, 0.0)
+        assert mock_create.call_count == 3
+
+    assert client.cache.stats()['hits'] == 1
+
+
+def test_concurrent_identical_requests_share_one_call():
+    client = OpenAI(api_key='test', single_flight=SingleFlight())
+    messages = [{'role': 'user', 'content': 'Once upon a time'}]
+    results = []
+
+    def slow_create(**kwargs):
+        time.sleep(0.2)
+        return {'choices': [{'message': {'content': 'Shared content.'}}]}
+
+    with patch('backend_codebase.ai_integration.openai.ChatCompletion.create', side_effect=slow_create) as mock_create:
+        threads = [
+            threading.Thread(target=lambda: results.append(client.chat_completions_create('gpt-4', messages, 0.7, 500, 1.0, 0.0, 0.0)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert mock_create.call_count == 1
+
+    assert results == ['Shared content.'] * 4
+    assert client.single_flight.stats()['coalesced'] == 3
+
+
+def test_transient_errors_are_retried():
+    client = OpenAI(api_key='test', resilience=Resilience(max_attempts=3, sleep=lambda seconds: None))
+    messages = [{'role': 'user', 'content': 'Once upon a time'}]
+
+    with patch('backend_codebase.ai_integration.openai.ChatCompletion.create') as mock_create:
+        mock_create.side_effect = [
+            openai.error.RateLimitError('slow down'),
+            {'choices': [{'message': {'content': 'Recovered content.'}}]},
+        ]
+        assert client.chat_completions_create('gpt-4', messages, 0.7, 500, 1.0, 0.0, 0.0) == 'Recovered content.'
+        assert mock_create.call_count == 2
+
+        mock_create.side_effect = openai.error.AuthenticationError('no key')
+        with pytest.raises(OpenAIError):
+            client.chat_completions_create('gpt-4', messages, 0.7, 500, 1.0, 0.0, 0.0)
+        assert mock_create.call_count == 3
+
+
+def test_calls_wait_for_the_rate_scheduler():
+    scheduler = RateScheduler(rpm=600, tpm=1_000_000)
+    client = OpenAI(api_key='test', scheduler=scheduler)
+    messages = [{'role': 'user', 'content': 'Once upon a time'}]
+
+    with patch('backend_codebase.ai_integration.openai.ChatCompletion.create') as mock_create:
+        mock_create.return_value = {'choices': [{'message': {'content': 'Paced content.'}}]}
+        client.chat_completions_create('gpt-4', messages, 0.7, 500, 1.0, 0.0, 0.0, priority=BATCH)
+
+    assert scheduler.stats()['admitted_batch'] == 1
+    assert scheduler.stats()['tokens_admitted'] == estimate_request_tokens(messages, 500)
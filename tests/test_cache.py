@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import patch
+from backend_codebase.cache import MemoryCache, SQLiteCache, make_cache_key
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    def factory(max_entries=10, ttl=60):
+        if request.param == 'memory':
+            return MemoryCache(max_entries=max_entries, ttl=ttl)
+        return SQLiteCache(str(tmp_path / 'cache.sqlite3'), max_entries=max_entries, ttl=ttl)
+    return factory
+
+
+def test_make_cache_key():
+    messages = [{'role': 'user', 'content': 'Once upon a time'}]
+    key = make_cache_key('gpt-4', messages, 0, 500, 1.0, 0.0, 0.0)
+    assert key == make_cache_key('gpt-4', [dict(messages[0])], 0, 500, 1.0, 0.0, 0.0)
+    assert key != make_cache_key('gpt-4', messages, 0, 501, 1.0, 0.0, 0.0)
+    assert key == make_cache_key('gpt-4', messages, 0, 500, 1.0, 0.0, 0.0, n=1)
+    assert key != make_cache_key('gpt-4', messages, 0, 500, 1.0, 0.0, 0.0, n=3)
+
+
+def test_hit_and_miss_counters(make_cache):
+    cache = make_cache()
+    assert cache.get('a') is None
+    cache.set('a', 'content')
+    assert cache.get('a') == 'content'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(make_cache):
+    cache = make_cache(max_entries=2, ttl=None)
+    with patch('backend_codebase.cache.time.time', side_effect=[1, 2, 3, 4, 5]):
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+        assert cache.get('b') is None
+    assert cache.get('a') == 'A'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entry_is_a_miss(make_cache):
+    cache = make_cache(ttl=10)
+    with patch('backend_codebase.cache.time.time', return_value=100):
+        cache.set('a', 'A')
+    with patch('backend_codebase.cache.time.time', return_value=111):
+        assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,89 @@
+import pytest
+from backend_codebase.context import ContextBuilder, estimate_tokens
+
+
+def test_prompt_without_history():
+    builder = ContextBuilder()
+    prompt, stats = builder.build_prompt('novel', 'The hero wakes up')
+    assert prompt == 'Current state: \nUser input: The hero wakes up'
+    assert stats['tokens_saved'] == 0
+
+
+def test_old_iterations_are_folded_into_summary():
+    builder = ContextBuilder(recent_iterations=2, token_budget=20)
+    for number in range(1, 5):
+        builder.record_iteration('novel', f'Chapter {number} begins. ' + 'It goes on for a while. ' * 10, version=number)
+
+    prompt, _ = builder.build_prompt('novel', 'Continue')
+    assert prompt.startswith('Summary so far: Chapter 1 begins. Chapter 2 begins.\nCurrent state: ')
+    assert prompt.endswith('It goes on for a while. \nUser input: Continue')
+    assert builder.version('novel') == 4
+
+
+def test_latest_iteration_within_budget_is_sent_as_is():
+    builder = ContextBuilder(recent_iterations=2)
+    for number in range(1, 5):
+        builder.record_iteration('novel', f'Chapter {number} begins. It goes on for a while.')
+
+    prompt, stats = builder.build_prompt('novel', 'Continue')
+    assert prompt == 'Current state: Chapter 4 begins. It goes on for a while.\nUser input: Continue'
+    assert stats['tokens_saved'] == 0
+
+
+@pytest.mark.parametrize('cumulative', [True, False])
+def test_prompt_never_grows_past_the_latest_iteration(cumulative):
+    builder = ContextBuilder()
+    state = ''
+    for number in range(60):
+        chapter = f'Chapter {number}. The hero walks on. ' + 'She rests, then walks further. ' * (number % 7 * 20)
+        state = state + chapter if cumulative else chapter
+        builder.record_iteration('novel', state)
+        prompt, stats = builder.build_prompt('novel', 'Continue the story')
+        assert stats['tokens_saved'] >= 0
+        assert stats['prompt_tokens'] <= estimate_tokens(f'Current state: {state}\nUser input: Continue the story')
+
+
+def test_prompt_size_stays_within_budget():
+    builder = ContextBuilder(recent_iterations=3, token_budget=200, summary_tokens=50)
+    for number in range(100):
+        builder.record_iteration('novel', f'Iteration {number}. ' + 'word ' * 100)
+
+    prompt, stats = builder.build_prompt('novel', 'Continue')
+    assert estimate_tokens(prompt) <= 200 + estimate_tokens('Summary so far: \nCurrent state: \nUser input: Continue')
+    assert stats['prompt_tokens'] == estimate_tokens(prompt)
+    latest = 'Iteration 99. ' + 'word ' * 100
+    assert stats['tokens_saved'] == estimate_tokens(f'Current state: {latest}\nUser input: Continue') - stats['prompt_tokens']
+
+
+def test_tokens_saved_against_sending_the_latest_iteration():
+    builder = ContextBuilder(recent_iterations=2, token_budget=200, summary_tokens=50)
+    # Each iteration holds the whole novel so far, so the latest one alone is far over budget
+    novel = ''
+    for number in range(20):
+        novel += f'Chapter {number}. ' + 'word ' * 100
+        builder.record_iteration('novel', novel)
+
+    prompt, stats = builder.build_prompt('novel', 'Continue')
+    assert stats['tokens_saved'] == estimate_tokens(f'Current state: {novel}\nUser input: Continue') - estimate_tokens(prompt)
+    assert stats['tokens_saved'] > 2000
+
+
+def test_least_recently_used_contexts_are_evicted():
+    builder = ContextBuilder(max_novels=2)
+    builder.record_iteration('one', 'First.', version=1)
+    builder.record_iteration('two', 'First.', version=1)
+    builder.build_prompt('one', 'Continue')
+    builder.record_iteration('three', 'First.', version=1)
+
+    assert builder.version('two') is None
+    assert builder.version('one') == 1 and builder.version('three') == 1
+
+
+def test_load_replaces_context():
+    builder = ContextBuilder(recent_iterations=2)
+    builder.record_iteration('novel', 'Stale content.', version=1)
+    builder.load('novel', ['First.', 'Second.', 'Third.'], version=7)
+
+    prompt, _ = builder.build_prompt('novel', 'Continue')
+    assert prompt == 'Current state: Third.\nUser input: Continue'
+    assert builder.version('novel') == 7
@@ -0,0 +1,49 @@
+import sqlite3
+import threading
+import time
+from sqlalchemy import create_engine, text
+from backend_codebase.database import TimedQueuePool, engine_options, pool_stats
+
+
+def test_file_database_uses_timed_queue_pool(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.sqlite3'}"
+    engine = create_engine(url, **engine_options(url, pool_size=2, max_overflow=1))
+    assert isinstance(engine.pool, TimedQueuePool)
+
+    first = engine.connect()
+    second = engine.connect()
+    third = engine.connect()
+    stats = pool_stats(engine)
+    assert (stats['size'], stats['checked_out'], stats['overflow']) == (2, 3, 1)
+
+    for connection in (first, second, third):
+        connection.close()
+    stats = pool_stats(engine)
+    assert stats['checked_out'] == 0
+    assert stats['checkouts'] == 3
+    assert stats['wait_time_total'] >= stats['wait_time_max'] >= 0
+    assert stats['connects'] == 3 and stats['connect_time_total'] >= 0
+    engine.dispose()
+
+
+def test_checkout_wait_excludes_connect_time():
+    def slow_connect():
+        time.sleep(0.2)
+        return sqlite3.connect(':memory:', check_same_thread=False)
+
+    pool = TimedQueuePool(slow_connect, pool_size=1, max_overflow=0, timeout=5)
+    first = pool.connect()
+    assert pool.checkouts == 1 and pool.connects == 1
+    assert pool.connect_time_total >= 0.2 and pool.wait_time_total < 0.1
+
+    # A second checkout queues until the only connection is returned
+    threading.Timer(0.2, first.close).start()
+    second = pool.connect()
+    assert pool.checkouts == 2 and pool.connects == 1
+    assert pool.wait_time_max >= 0.15
+    second.close()
+    pool.dispose()
+
+
+def test_in_memory_database_has_no_pool_options():
+    assert engine_options('sqlite:///:memory:') == {}
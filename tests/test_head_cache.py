@@ -0,0 +1,83 @@
+from backend_codebase.head_cache import Head, HeadCache
+from backend_codebase.iterations import append_iteration, create_novel
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reads_are_served_from_cache_until_revalidation(Session, count_statements):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    append_iteration(session, novel.id, 'Chapter 1')
+    session.commit()
+    clock = FakeClock()
+    cache = HeadCache(ttl=60, revalidate_after=1.0, clock=clock)
+    novel_id = novel.id
+
+    statements = count_statements(session.get_bind())
+    assert cache.get(session, novel_id).content == 'Chapter 1'
+    for _ in range(9):
+        assert cache.get(session, novel_id).iteration_number == 1
+    assert len(statements) == 1
+
+    # Past the revalidation interval one cheap version lookup confirms the entry
+    clock.now = 2.0
+    assert cache.get(session, novel_id).content == 'Chapter 1'
+    assert len(statements) == 2 and 'novel_iterations' not in statements[1]
+    assert cache.stats() == {'entries': 1, 'hits': 10, 'misses': 1, 'revalidations': 1, 'invalidations': 0, 'hit_ratio': 0.9091}
+    session.close()
+
+
+def test_other_writers_are_seen_after_revalidation(Session):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    append_iteration(session, novel.id, 'Chapter 1')
+    session.commit()
+    clock = FakeClock()
+    cache = HeadCache(ttl=60, revalidate_after=1.0, clock=clock)
+    cache.get(session, novel.id)
+
+    # Another worker appends without touching this process's cache
+    append_iteration(session, novel.id, 'Chapter 2')
+    session.commit()
+    assert cache.get(session, novel.id).content == 'Chapter 1'
+    clock.now = 2.0
+    assert cache.get(session, novel.id).content == 'Chapter 2'
+    session.close()
+
+
+def test_put_replaces_entry_but_not_with_older_iterations(Session):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    first = append_iteration(session, novel.id, 'Chapter 1')
+    second = append_iteration(session, novel.id, 'Chapter 2')
+    session.commit()
+    cache = HeadCache(clock=FakeClock())
+
+    cache.put(novel.id, Head(second.id, 2, 'Chapter 2'))
+    cache.put(novel.id, Head(first.id, 1, 'Chapter 1'))
+    assert cache.get(session, novel.id).content == 'Chapter 2'
+    assert cache.stats()['misses'] == 0
+    session.close()
+
+
+def test_ttl_forces_reload(Session):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    append_iteration(session, novel.id, 'Chapter 1')
+    session.commit()
+    clock = FakeClock()
+    cache = HeadCache(ttl=10, revalidate_after=100, clock=clock)
+    cache.get(session, novel.id)
+
+    clock.now = 11.0
+    cache.get(session, novel.id)
+    assert cache.stats()['misses'] == 2
+    cache.invalidate()
+    assert cache.stats()['entries'] == 0
+    session.close()
@@ -0,0 +1,117 @@
+import json
+import openai
+import pytest
+import requests
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from backend_codebase.ai_integration import OpenAI
+from backend_codebase.http_pool import PooledSession
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': 'Stub content.'}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused_across_threads(stub_server):
+    session = PooledSession(pool_size=2)
+    url = f'http://127.0.0.1:{stub_server.server_port}/'
+
+    def worker():
+        for _ in range(10):
+            assert session.get(url).status_code == 200
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = session.stats()
+    assert stats['requests'] == 40
+    assert stub_server.connections == stats['connections_opened'] <= 2
+    assert stats['connections_reused'] >= 38
+    session.shutdown()
+
+
+def test_close_keeps_the_pool(stub_server):
+    session = PooledSession(pool_size=1)
+    url = f'http://127.0.0.1:{stub_server.server_port}/'
+    session.get(url)
+    session.close()
+    session.get(url)
+    assert stub_server.connections == 1
+    session.shutdown()
+
+
+def test_timeouts_are_split_and_capped():
+    session = PooledSession(connect_timeout=2.0, read_timeout=30.0)
+    with patch('requests.adapters.HTTPAdapter.send') as mock_send:
+        session.adapter.send('request', timeout=600)
+        assert mock_send.call_args.kwargs['timeout'] == (2.0, 30.0)
+        session.adapter.send('request', timeout=(10, 5.0))
+        assert mock_send.call_args.kwargs['timeout'] == (2.0, 5.0)
+
+
+def test_waiting_for_a_pooled_connection_is_bounded(stub_server):
+    session = PooledSession(pool_size=1, pool_timeout=5.0)
+    url = f'http://127.0.0.1:{stub_server.server_port}/'
+    # An unread streamed response holds the only connection
+    held = session.get(url, stream=True)
+
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.get(url, timeout=0.2)
+    assert time.monotonic() - start < 2
+
+    held.close()
+    assert session.get(url, timeout=0.2).status_code == 200
+    session.shutdown()
+
+
+def test_openai_calls_share_one_connection(stub_server):
+    session = PooledSession(pool_size=4)
+    original_session = openai.requestssession
+    try:
+        client = OpenAI(api_key='test', session=session)
+        messages = [{'role': 'user', 'content': 'Once upon a time'}]
+        with patch.object(openai, 'api_base', f'http://127.0.0.1:{stub_server.server_port}/v1'):
+            results = [client.chat_completions_create('gpt-4', messages, 0.7, 50, 1.0, 0.0, 0.0) for _ in range(5)]
+    finally:
+        openai.requestssession = original_session
+        session.shutdown()
+
+    assert results == ['Stub content.'] * 5
+    assert stub_server.connections == 1
+    assert session.stats()['connections_reused'] == 4
@@ -0,0 +1,135 @@
+import io
+import json
+import time
+import pytest
+from sqlalchemy import event, func, select
+from backend_codebase import create_app, db
+from backend_codebase.ingest import SYNC, IngestBufferFullError, WriteBehindBuffer, import_lines, iter_lines
+from backend_codebase.models import Feedback, UserInput
+from backend_codebase.schemas import load_user_input
+
+USER_INPUT = {'plot': 'A hero saves the world', 'setting': 'Futuristic city', 'theme': 'Courage', 'conflict': 'Hero vs Villain'}
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig:
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'ingest.sqlite3'}"
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def count_rows(app, model):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_flush_writes_each_model_in_one_insert(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=100, flush_interval=60)
+    ids = [buffer.add(UserInput, USER_INPUT) for _ in range(10)] + [buffer.add(Feedback, {'feedback': 'Great story!'})]
+    assert count_rows(app, UserInput) == 0
+
+    with app.app_context():
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    assert buffer.flush() == 11
+    assert [statement.split()[0] for statement in statements] == ['INSERT', 'INSERT']
+    assert count_rows(app, UserInput) == 10 and count_rows(app, Feedback) == 1
+    with app.app_context():
+        assert db.session.get(UserInput, ids[0]).plot == 'A hero saves the world'
+    assert buffer.stats() == {'mode': 'buffered', 'pending': 0, 'rows_written': 11, 'flushes': 1, 'failures': 0, 'dead_lettered': 0}
+    buffer.shutdown()
+
+
+def test_size_trigger_flushes_in_background(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=5, flush_interval=60)
+    for _ in range(5):
+        buffer.add(Feedback, {'feedback': 'Great story!'})
+    deadline = time.monotonic() + 5
+    while buffer.stats()['rows_written'] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert buffer.stats()['rows_written'] == 5
+    buffer.shutdown()
+
+
+def test_shutdown_flushes_pending_rows(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=100, flush_interval=60)
+    buffer.add(Feedback, {'feedback': 'Great story!'})
+    buffer.shutdown()
+    assert count_rows(app, Feedback) == 1
+
+
+def test_sync_mode_writes_before_returning(app):
+    buffer = WriteBehindBuffer(app, db, mode=SYNC)
+    with app.app_context():
+        row_id = buffer.add(Feedback, {'feedback': 'Great story!'})
+        assert db.session.get(Feedback, row_id) is not None
+    assert buffer.stats()['pending'] == 0
+
+
+def test_full_buffer_rejects_rows(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=100, flush_interval=60, max_pending=2)
+    buffer.add(Feedback, {'feedback': 'one'})
+    buffer.add(Feedback, {'feedback': 'two'})
+    with pytest.raises(IngestBufferFullError):
+        buffer.add(Feedback, {'feedback': 'three'})
+    buffer.shutdown()
+    assert count_rows(app, Feedback) == 2
+
+
+def test_failed_flush_keeps_rows(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=100, flush_interval=60)
+    buffer.add(Feedback, {'feedback': 'Great story!'})
+    with app.app_context():
+        db.drop_all()
+    assert buffer.flush() == 0
+    assert buffer.stats()['pending'] == 1 and buffer.stats()['failures'] == 1
+
+    with app.app_context():
+        db.create_all()
+    assert buffer.flush() == 1
+    assert count_rows(app, Feedback) == 1
+    buffer.shutdown()
+
+
+def test_rejected_row_does_not_block_the_others(app):
+    buffer = WriteBehindBuffer(app, db, flush_size=100, flush_interval=60, max_attempts=2)
+    bad_id = buffer.add(Feedback, {'feedback': None})
+    buffer.add(Feedback, {'feedback': 'Great story!'})
+
+    assert buffer.flush() == 1
+    assert count_rows(app, Feedback) == 1
+    assert buffer.stats()['pending'] == 1
+
+    buffer.add(Feedback, {'feedback': 'Another one'})
+    assert buffer.flush() == 1
+    assert buffer.stats()['pending'] == 0 and buffer.stats()['dead_lettered'] == 1
+    assert buffer.dead_letters[0][:2] == ('feedback', {**buffer.dead_letters[0][1], 'id': bad_id})
+    assert count_rows(app, Feedback) == 2
+    buffer.shutdown()
+
+
+def test_iter_lines_skips_blank_and_oversized_lines():
+    stream = io.BytesIO(b'{"a": 1}\n\n' + b'x' * 20 + b'\n{"b": 2}')
+    assert list(iter_lines(stream, max_line_bytes=10)) == [(1, b'{"a": 1}\n'), (3, None), (4, b'{"b": 2}')]
+
+
+def test_import_lines_inserts_in_chunks(app):
+    records = [json.dumps(USER_INPUT).encode()] * 5 + [b'not json', json.dumps({'plot': ''}).encode()]
+    with app.app_context():
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        results = list(import_lines(db.session, UserInput, enumerate(records, 1), load_user_input, chunk_size=2))
+
+    assert [statement.split()[0] for statement in statements] == ['INSERT'] * 3
+    assert [result.get('line') for result in results] == [1, 2, 3, 4, 5, 6, 7, None]
+    assert results[5] == {'line': 6, 'error': 'Invalid JSON.'}
+    assert 'plot' in results[6]['error']
+    assert results[-1] == {'inserted': 5, 'rejected': 2}
+    assert count_rows(app, UserInput) == 5
@@ -0,0 +1,78 @@
+from unittest.mock import patch
+from backend_codebase.iteration_store import (
+    DELTA, SNAPSHOT, IterationStore, apply_delta, encode_delta, encode_iteration, split_chunks
+)
+from backend_codebase.models import Novel, NovelIteration
+
+CHAPTERS = [
+    f'Chapter {n}.\n' + ' '.join(f'On day {n * 100 + day} the hero walks {day * 7 % 13} miles and rests {day % 5} times.' for day in range(20)) + '\n'
+    for n in range(1, 41)
+]
+
+
+def novel_versions(count):
+    # Each iteration appends a chapter to the previous one, as iterations of a novel do
+    return [''.join(CHAPTERS[:n]) for n in range(1, count + 1)]
+
+
+def test_split_chunks_round_trips():
+    for text in ['', 'No punctuation', 'One. Two!  Three?\n\nFour', 'Trailing dots...\n', 'a.b.c']:
+        assert ''.join(split_chunks(text)) == text
+
+
+def test_delta_round_trips_and_is_small():
+    base, text = novel_versions(20)[-2:]
+    text = text.replace('Chapter 3.', 'Chapter Three.')
+    delta = encode_delta(base, text)
+    assert apply_delta(base, delta) == text
+    assert len(delta) < len(CHAPTERS[-1])
+
+
+def test_encode_iteration_takes_snapshots_on_the_interval():
+    versions = novel_versions(6)
+    assert encode_iteration(1, versions[0], snapshot_interval=4)['encoding'] == SNAPSHOT
+    assert encode_iteration(2, versions[1], versions[0], snapshot_interval=4)['encoding'] == DELTA
+    assert encode_iteration(5, versions[4], versions[3], snapshot_interval=4)['encoding'] == SNAPSHOT
+    assert encode_iteration(6, versions[5], snapshot_interval=4)['encoding'] == SNAPSHOT
+
+
+def store_novel(session, store, versions):
+    novel = Novel(title='The Journey')
+    session.add(novel)
+    session.flush()
+    previous = None
+    for number, content in enumerate(versions, 1):
+        session.add(NovelIteration(novel_id=novel.id, iteration_number=number, **store.encode(number, content, previous)))
+        previous = content
+    session.commit()
+    return novel.id
+
+
+def test_read_range_applies_a_bounded_number_of_deltas(Session):
+    session = Session()
+    store = IterationStore(snapshot_interval=8)
+    versions = novel_versions(20)
+    novel_id = store_novel(session, store, versions)
+
+    assert store.read_range(session, novel_id, 15, 15) == {15: versions[14]}
+    # Iteration 9 is the nearest snapshot, so six deltas rebuild iteration 15
+    assert store.stats()['deltas_applied'] == 6
+
+    assert store.read_range(session, novel_id, 1, 20) == dict(enumerate(versions, 1))
+    assert store.read_range(session, novel_id, 15, 16)[16] == versions[15]
+    assert store.stats()['hits'] > 0
+    session.close()
+
+
+def test_read_range_survives_eviction_of_its_start_row(Session):
+    session = Session()
+    store = IterationStore(snapshot_interval=8)
+    versions = novel_versions(12)
+    novel_id = store_novel(session, store, versions)
+    store.read_range(session, novel_id, 11, 11)
+
+    # Another request evicts everything between choosing the cached start row and reading it
+    original_cached = store._cached
+    with patch.object(store, '_cached', side_effect=lambda key: store.clear() or original_cached(key)):
+        assert store.read_range(session, novel_id, 12, 12) == {12: versions[11]}
+    session.close()
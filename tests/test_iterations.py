@@ -0,0 +1,96 @@
+import pytest
+import threading
+from unittest.mock import patch
+from backend_codebase.models import NovelHead, NovelIteration
+from backend_codebase.iterations import (
+    DEFAULT_NOVEL_ID, NovelNotFoundError, append_iteration, create_novel, ensure_default_novel,
+    get_head_number, get_latest_iteration, get_recent_contents, list_iterations, sync_novel_id_sequence
+)
+
+
+def test_append_iteration_moves_head(Session):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    session.commit()
+    assert get_latest_iteration(session, novel.id) is None
+
+    for number in range(1, 4):
+        append_iteration(session, novel.id, f'Chapter {number}')
+        session.commit()
+
+    latest = get_latest_iteration(session, novel.id)
+    assert (latest.iteration_number, latest.content) == (3, 'Chapter 3')
+    assert get_recent_contents(session, novel.id, 2) == ['Chapter 2', 'Chapter 3']
+    session.close()
+
+
+def test_list_iterations_pages_by_cursor(Session):
+    session = Session()
+    novel = create_novel(session, 'The Journey')
+    for number in range(1, 6):
+        append_iteration(session, novel.id, f'Chapter {number}')
+    session.commit()
+    assert get_head_number(session, novel.id) == 5
+    assert get_head_number(session, 42) is None
+
+    page, cursor = list_iterations(session, novel.id, limit=2, fields=('content',))
+    assert (page, cursor) == ([{'content': 'Chapter 1'}, {'content': 'Chapter 2'}], 2)
+    page, cursor = list_iterations(session, novel.id, after=cursor, limit=2, fields=('iteration_number',))
+    assert (page, cursor) == ([{'iteration_number': 3}, {'iteration_number': 4}], 4)
+    page, cursor = list_iterations(session, novel.id, after=cursor, limit=2, fields=('iteration_number',))
+    assert (page, cursor) == ([{'iteration_number': 5}], None)
+
+    page, cursor = list_iterations(session, novel.id, after=4, limit=10, fields=('iteration_number', 'created_at'), descending=True)
+    assert [iteration['iteration_number'] for iteration in page] == [3, 2, 1]
+    assert set(page[0]) == {'iteration_number', 'created_at'} and cursor is None
+    session.close()
+
+
+def test_append_to_unknown_novel(Session):
+    session = Session()
+    with pytest.raises(NovelNotFoundError):
+        append_iteration(session, 42, 'Lost chapter')
+    session.close()
+
+
+def test_ensure_default_novel_is_idempotent(Session):
+    session = Session()
+    ensure_default_novel(session)
+    ensure_default_novel(session)
+    assert session.get(NovelHead, DEFAULT_NOVEL_ID).iteration_number == 0
+    assert create_novel(session, 'Second').id == DEFAULT_NOVEL_ID + 1
+    session.close()
+
+
+def test_novel_id_sequence_is_synced_on_postgresql(Session):
+    session = Session()
+    with patch.object(session.get_bind().dialect, 'name', 'postgresql'), patch.object(session, 'execute') as execute:
+        sync_novel_id_sequence(session)
+    assert 'setval' in str(execute.call_args.args[0])
+    session.close()
+
+
+def test_concurrent_appends_get_distinct_numbers(Session):
+    session = Session()
+    novel_id = create_novel(session, 'The Race').id
+    session.commit()
+    session.close()
+
+    def worker():
+        session = Session()
+        for _ in range(5):
+            append_iteration(session, novel_id, 'content')
+            session.commit()
+        session.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    session = Session()
+    numbers = sorted(number for (number,) in session.query(NovelIteration.iteration_number).filter_by(novel_id=novel_id))
+    assert numbers == list(range(1, 21))
+    assert get_latest_iteration(session, novel_id).iteration_number == 20
+    session.close()
@@ -0,0 +1,63 @@
+import pytest
+import threading
+from backend_codebase.jobs import JobQueue, JobQueueFullError, SUCCEEDED, FAILED, QUEUED
+
+
+@pytest.fixture
+def job_queue():
+    queue = JobQueue(max_workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def test_job_succeeds(job_queue):
+    job_id = job_queue.submit('add', lambda a, b: a + b, 1, 2)
+    job = job_queue.wait(job_id, timeout=5)
+    assert job['status'] == SUCCEEDED
+    assert job['result'] == 3
+    assert job['error'] is None
+
+
+def test_job_failure_is_recorded(job_queue):
+    def fail():
+        raise RuntimeError('model unavailable')
+
+    job_id = job_queue.submit('fail', fail)
+    job = job_queue.wait(job_id, timeout=5)
+    assert job['status'] == FAILED
+    assert job['error'] == 'model unavailable'
+
+
+def test_jobs_run_concurrently(job_queue):
+    barrier = threading.Barrier(2, timeout=5)
+    job_ids = [job_queue.submit('wait', barrier.wait) for _ in range(2)]
+    assert all(job_queue.wait(job_id, timeout=5)['status'] == SUCCEEDED for job_id in job_ids)
+
+
+def test_finished_jobs_are_evicted():
+    queue = JobQueue(max_workers=1, max_jobs=2)
+    first = queue.submit('noop', lambda: None)
+    queue.wait(first, timeout=5)
+    queue.wait(queue.submit('noop', lambda: None), timeout=5)
+    queue.submit('noop', lambda: None)
+    queue.shutdown()
+    assert queue.get(first) is None
+
+
+def test_full_queue_rejects_jobs():
+    queue = JobQueue(max_workers=1, max_pending=2, retry_after=3)
+    release = threading.Event()
+    job_ids = [queue.submit('wait', release.wait, 5) for _ in range(2)]
+    with pytest.raises(JobQueueFullError) as excinfo:
+        queue.submit('wait', release.wait, 5)
+    assert excinfo.value.retry_after == 3
+
+    release.set()
+    for job_id in job_ids:
+        queue.wait(job_id, timeout=5)
+    assert queue.wait(queue.submit('noop', lambda: None), timeout=5)['status'] == SUCCEEDED
+    queue.shutdown()
+
+
+def test_unknown_job(job_queue):
+    assert job_queue.get('missing') is None
@@ -1,7 +1,7 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from backend_codebase.models import Base, UserInput, NovelIteration
+from backend_codebase.models import Base, UserInput, Novel, NovelIteration
 import os
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///:memory:')
@@ -34,8 +34,12 @@ def test_user_input_model(session):
 
 
 def test_novel_iteration_model(session):
+    novel = Novel(title='The Journey')
+    session.add(novel)
+    session.flush()
     novel_iteration = NovelIteration(
-        iteration_number='1',
+        novel_id=novel.id,
+        iteration_number=1,
         content='The hero begins his journey'
     )
     session.add(novel_iteration)
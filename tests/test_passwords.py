@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+from backend_codebase.passwords import HasherSaturatedError, PasswordHasher, hash_rounds
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=2)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify_in_worker_process(hasher):
+    hashed = hasher.hash('Password123')
+    assert hash_rounds(hashed) == 4
+    assert hasher.verify('Password123', hashed)
+    assert not hasher.verify('wrong', hashed.encode('utf-8'))
+
+
+def test_workers_are_not_forked(hasher):
+    hasher.start()
+    assert hasher._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+def test_inline_hashing():
+    hasher = PasswordHasher(rounds=4, workers=0)
+    assert hasher.verify('Password123', hasher.hash('Password123'))
+
+
+def test_hash_many_keeps_order(hasher):
+    hashes = hasher.hash_many(['Password1', 'Password2', 'Password3'])
+    assert [hasher.verify(f'Password{n}', hashed) for n, hashed in enumerate(hashes, 1)] == [True, True, True]
+    assert not hasher.verify('Password1', hashes[1])
+
+
+def test_needs_rehash_when_cost_differs(hasher):
+    assert not hasher.needs_rehash(hasher.hash('Password123'))
+    assert PasswordHasher(rounds=5, workers=0).needs_rehash(hasher.hash('Password123'))
+
+
+def test_saturated_pool_fails_fast():
+    hasher = PasswordHasher(rounds=4, workers=0, max_pending=1, retry_after=3)
+    hasher._slots.acquire()
+    with pytest.raises(HasherSaturatedError) as excinfo:
+        hasher.hash('Password123')
+    assert excinfo.value.retry_after == 3
+
+
+def test_hash_many_holds_at_most_batch_slots():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=4, batch_slots=2)
+    in_use = []
+    executor = hasher._get_executor()
+    original_submit = executor.submit
+
+    def submit(*args):
+        in_use.append(hasher.max_pending - hasher._slots._value)
+        return original_submit(*args)
+
+    try:
+        with patch.object(executor, 'submit', side_effect=submit):
+            hashes = hasher.hash_many([f'Password{n}' for n in range(6)])
+        assert len(hashes) == 6 and max(in_use) == 2
+        assert hasher._slots._value == 4
+
+        # Slots held by logins make the batch fail fast before it starts
+        for _ in range(4):
+            hasher._slots.acquire()
+        with pytest.raises(HasherSaturatedError):
+            hasher.hash_many(['Password1'])
+    finally:
+        hasher.shutdown()
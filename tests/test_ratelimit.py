@@ -0,0 +1,61 @@
+import pytest
+import threading
+import time
+from backend_codebase.ratelimit import BATCH, INTERACTIVE, RateLimitTimeoutError, RateScheduler, estimate_request_tokens
+
+
+def test_estimate_request_tokens():
+    assert estimate_request_tokens('x' * 40, 500) == 510
+    assert estimate_request_tokens([{'role': 'user', 'content': 'x' * 40}, {'role': 'system', 'content': 'y' * 8}], 100) == 112
+
+
+def test_request_rate_is_held_under_the_limit():
+    # 600 RPM with 95% headroom and a one-request burst admits one call every ~105 ms
+    scheduler = RateScheduler(rpm=600, tpm=1_000_000, burst_seconds=0.1)
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.acquire(10)
+    assert time.monotonic() - start >= 4 * 60 / (600 * 0.95) - 0.01
+    assert scheduler.stats()['admitted_interactive'] == 5
+
+
+def test_token_rate_is_held_under_the_limit():
+    scheduler = RateScheduler(rpm=1_000_000, tpm=60_000, headroom=1.0, burst_seconds=1)
+    scheduler.acquire(1000)
+    start = time.monotonic()
+    scheduler.acquire(100)
+    assert time.monotonic() - start >= 0.09
+    assert scheduler.stats()['tokens_admitted'] == 1100
+
+
+def test_interactive_calls_go_ahead_of_batch():
+    scheduler = RateScheduler(rpm=600, tpm=1_000_000, burst_seconds=0.1)
+    scheduler.acquire(10)
+    order = []
+
+    def call(label, priority):
+        scheduler.acquire(10, priority)
+        order.append(label)
+
+    batch = [threading.Thread(target=call, args=(f'batch{n}', BATCH)) for n in range(2)]
+    for thread in batch:
+        thread.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=call, args=('interactive', INTERACTIVE))
+    interactive.start()
+    for thread in batch + [interactive]:
+        thread.join()
+
+    assert order[0] == 'interactive'
+    stats = scheduler.stats()
+    assert (stats['admitted_interactive'], stats['admitted_batch']) == (2, 2)
+    assert stats['queue_time_max'] > 0
+
+
+def test_acquire_times_out():
+    scheduler = RateScheduler(rpm=6, tpm=1_000_000, burst_seconds=10)
+    scheduler.acquire(10)
+    with pytest.raises(RateLimitTimeoutError):
+        scheduler.acquire(10, timeout=0.05)
+    assert scheduler.stats()['timeouts'] == 1
+    assert scheduler.stats()['queued'] == 0
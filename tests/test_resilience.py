@@ -0,0 +1,126 @@
+import openai
+import pytest
+from backend_codebase.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, Resilience, is_transient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeUpstream:
+    """Fails with the queued errors, then succeeds."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_resilience(clock, **kwargs):
+    return Resilience(sleep=clock.sleep, clock=clock, rng=lambda: 1.0, **kwargs)
+
+
+def test_transient_errors_are_retried_with_backoff(clock):
+    resilience = make_resilience(clock, max_attempts=3, base_delay=0.5, deadline=None)
+    upstream = FakeUpstream(openai.error.RateLimitError('slow down'), openai.error.Timeout('timed out'))
+    assert resilience.call(upstream) == 'ok'
+    assert upstream.calls == 3
+    assert clock.now == 0.5 + 1.0
+    assert resilience.stats()['retries'] == 2
+
+
+def test_permanent_errors_are_not_retried(clock):
+    resilience = make_resilience(clock, max_attempts=3)
+    upstream = FakeUpstream(openai.error.InvalidRequestError('bad request', 'messages'))
+    with pytest.raises(openai.error.InvalidRequestError):
+        resilience.call(upstream)
+    assert upstream.calls == 1
+
+
+def test_deadline_stops_retries_and_bounds_timeouts(clock):
+    resilience = make_resilience(clock, max_attempts=10, base_delay=1.0, deadline=2.5)
+    upstream = FakeUpstream(*[openai.error.APIConnectionError('reset')] * 10)
+    with pytest.raises(openai.error.APIConnectionError):
+        resilience.call(upstream)
+    assert upstream.calls == 2
+    assert upstream.timeouts == [2.5, 1.5]
+    assert resilience.stats()['deadline_exceeded'] == 1
+
+
+def test_backoff_is_capped():
+    resilience = Resilience(base_delay=0.5, max_delay=4.0, rng=lambda: 1.0)
+    assert [resilience.backoff(attempt) for attempt in range(1, 7)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+
+def test_classification():
+    assert is_transient(openai.error.ServiceUnavailableError('down'))
+    assert is_transient(openai.error.APIError('bad gateway', http_status=502))
+    assert not is_transient(openai.error.APIError('unprocessable', http_status=422))
+    assert not is_transient(openai.error.AuthenticationError('no key'))
+    assert not is_transient(ValueError('bug'))
+
+
+def test_circuit_breaker_opens_and_recovers(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=clock)
+    resilience = make_resilience(clock, max_attempts=1, breaker=breaker)
+    failing = FakeUpstream(*[openai.error.ServiceUnavailableError('down')] * 2)
+    for _ in range(2):
+        with pytest.raises(openai.error.ServiceUnavailableError):
+            resilience.call(failing)
+    assert breaker.state == OPEN
+
+    healthy = FakeUpstream()
+    with pytest.raises(CircuitOpenError):
+        resilience.call(healthy)
+    assert healthy.calls == 0
+
+    clock.now += 10
+    assert resilience.call(healthy) == 'ok'
+    assert breaker.state == CLOSED
+    assert resilience.stats()['rejected'] == 1
+    assert resilience.stats()['circuit']['opened'] == 1
+
+
+def test_failed_probe_reopens_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_local_errors_leave_the_breaker_alone(clock):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=5, clock=clock)
+    resilience = make_resilience(clock, max_attempts=1, breaker=breaker)
+    breaker.record_failure()
+    clock.now += 5
+
+    # A local error during the probe neither closes nor reopens the breaker, and frees the probe
+    with pytest.raises(ValueError):
+        resilience.call(FakeUpstream(ValueError('bug')))
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(openai.error.InvalidRequestError):
+        resilience.call(FakeUpstream(openai.error.InvalidRequestError('bad request', 'messages', http_status=400)))
+    assert breaker.state == CLOSED
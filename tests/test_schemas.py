@@ -0,0 +1,52 @@
+import pytest
+import uuid
+from marshmallow import ValidationError
+from backend_codebase.schemas import feedback_schema, load_feedback, load_user_input, user_input_schema
+
+VALID = {'plot': 'A hero saves the world', 'setting': 'Futuristic city', 'theme': 'Courage', 'conflict': 'Man vs. Machine'}
+
+
+def load_result(load, data):
+    try:
+        return 'ok', load(data)
+    except ValidationError as err:
+        return 'error', err.messages
+
+
+@pytest.mark.parametrize('data', [
+    VALID,
+    {**VALID, 'additional_preferences': {'tone': 'dark', 'chapters': [1, 2, 3]}},
+    {**VALID, 'additional_preferences': None},
+    {**VALID, 'user_id': None},
+    {**VALID, 'user_id': str(uuid.uuid4())},
+    {**VALID, 'user_id': 'not-a-uuid'},
+    {**VALID, 'plot': ''},
+    {**VALID, 'plot': 42},
+    {**VALID, 'additional_preferences': ['not', 'a', 'dict']},
+    {**VALID, 'unexpected': True},
+    {**VALID, 'created_at': '2024-01-01T00:00:00'},
+    {'plot': 'Only a plot'},
+    None,
+    ['not', 'an', 'object'],
+])
+def test_load_user_input_matches_schema(data):
+    assert load_result(load_user_input, data) == load_result(user_input_schema.load, data)
+
+
+@pytest.mark.parametrize('data', [
+    {'feedback': 'Great story!'},
+    {'feedback': ''},
+    {'feedback': 7},
+    {'feedback': 'Great story!', 'rating': 5},
+    {},
+    None,
+])
+def test_load_feedback_matches_schema(data):
+    assert load_result(load_feedback, data) == load_result(feedback_schema.load, data)
+
+
+def test_loaded_preferences_are_a_copy():
+    preferences = {'tone': 'dark'}
+    loaded = load_user_input({**VALID, 'additional_preferences': preferences})
+    assert loaded['additional_preferences'] == preferences
+    assert loaded['additional_preferences'] is not preferences
@@ -1,5 +1,8 @@
 import pytest
-from src.backend_codebase.services import signup, hash_password
+import threading
+import time
+from unittest.mock import patch
+from src.backend_codebase.services import GENERATION_TASKS, MODEL_TIERS, generate_character_profile, generate_plot_twist, signup, hash_password
 
 
 def test_hash_password():
@@ -16,3 +19,43 @@ def test_signup():
     assert result['username'] == username
     assert result['hashed_password'] != password
     assert isinstance(result['hashed_password'], str)
+
+
+def test_generate_character_profile_variants():
+    choices = [{'message': {'content': f' Profile {i} '}} for i in range(3)]
+    with patch('openai.ChatCompletion.create', return_value={'choices': choices}) as mock_create:
+        profiles = generate_character_profile('Ada', 'Curious', 'Grew up in a lighthouse', n=3)
+    assert profiles == ['Profile 0', 'Profile 1', 'Profile 2']
+    assert mock_create.call_args.kwargs['n'] == 3
+    assert mock_create.call_args.kwargs['max_tokens'] == GENERATION_TASKS['character_profile']['max_tokens']
+    assert 'Character Name: Ada' in mock_create.call_args.kwargs['messages'][0]['content']
+
+
+def test_plot_twists_use_the_small_model_tier():
+    with patch('openai.ChatCompletion.create', return_value={'choices': [{'message': {'content': 'The butler did it.'}}]}) as mock_create:
+        assert generate_plot_twist('A murder at the manor', 'Someone unexpected') == 'The butler did it.'
+    assert mock_create.call_args.kwargs['model'] == MODEL_TIERS['small']
+    assert mock_create.call_args.kwargs['max_tokens'] == 200
+
+
+def test_identical_generations_are_sampled_separately():
+    calls = []
+
+    def slow_create(**kwargs):
+        calls.append(kwargs)
+        content = f'Twist {len(calls)}'
+        time.sleep(0.1)
+        return {'choices': [{'message': {'content': content}}]}
+
+    results = []
+    with patch('openai.ChatCompletion.create', side_effect=slow_create):
+        threads = [
+            threading.Thread(target=lambda: results.append(generate_plot_twist('A heist', 'Betrayal')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(calls) == 5
+    assert len(set(results)) == 5
@@ -0,0 +1,59 @@
+import pytest
+import threading
+import time
+from backend_codebase.singleflight import SingleFlight
+
+
+def run_concurrently(count, fn):
+    results, errors = [], []
+    barrier = threading.Barrier(count)
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight()
+    executions = []
+
+    def slow_call():
+        executions.append(1)
+        time.sleep(0.2)
+        return 'result'
+
+    results, errors = run_concurrently(5, lambda: single_flight.do('key', slow_call))
+    assert results == ['result'] * 5
+    assert not errors
+    assert len(executions) == 1
+    assert single_flight.stats() == {'calls': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_errors_are_shared():
+    single_flight = SingleFlight()
+
+    def failing_call():
+        time.sleep(0.2)
+        raise RuntimeError('upstream failed')
+
+    results, errors = run_concurrently(3, lambda: single_flight.do('key', failing_call))
+    assert not results
+    assert [str(e) for e in errors] == ['upstream failed'] * 3
+    assert single_flight.stats()['calls'] == 1
+
+
+def test_sequential_calls_are_not_coalesced():
+    single_flight = SingleFlight()
+    assert single_flight.do('key', lambda: 1) == 1
+    assert single_flight.do('key', lambda: 2) == 2
+    assert single_flight.stats() == {'calls': 2, 'coalesced': 0, 'in_flight': 0}
@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import patch
+from backend_codebase.tokens import InvalidTokenError, TokenManager, manager_from_env
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def manager(clock):
+    return TokenManager({'k1': 'first-secret-that-is-long-enough!'}, 'k1', ttl=60, cache_size=2, clock=clock)
+
+
+def test_issue_and_verify(manager):
+    token = manager.issue({'user_id': '42'})
+    assert manager.verify(token)['user_id'] == '42'
+    assert manager.verify(token)['user_id'] == '42'
+    assert manager.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+
+def test_expired_token_is_rejected_even_when_cached(manager, clock):
+    token = manager.issue({'user_id': '42'})
+    manager.verify(token)
+    clock.now += 61
+    with pytest.raises(InvalidTokenError):
+        manager.verify(token)
+    assert manager.stats()['size'] == 0
+
+
+def test_tampered_and_unknown_key_tokens_are_rejected(manager):
+    other = TokenManager({'k1': 'another-secret-that-is-long-enough'}, 'k1')
+    with pytest.raises(InvalidTokenError):
+        manager.verify(other.issue({'user_id': '42'}))
+    with pytest.raises(InvalidTokenError):
+        manager.verify(TokenManager({'k9': 'first-secret-that-is-long-enough!'}, 'k9').issue({'user_id': '42'}))
+    with pytest.raises(InvalidTokenError):
+        manager.verify('not-a-token')
+
+
+def test_rotation_keeps_old_tokens_until_retired(manager):
+    old_token = manager.issue({'user_id': '1'})
+    manager.verify(old_token)
+    manager.rotate('k2', 'second-secret-that-is-long-enough')
+    new_token = manager.issue({'user_id': '2'})
+
+    assert manager.verify(old_token)['user_id'] == '1'
+    assert manager.verify(new_token)['user_id'] == '2'
+
+    manager.retire('k1')
+    with pytest.raises(InvalidTokenError):
+        manager.verify(old_token)
+    assert manager.verify(new_token)['user_id'] == '2'
+    with pytest.raises(ValueError):
+        manager.retire('k2')
+
+
+def test_claims_cache_is_bounded(manager):
+    tokens = [manager.issue({'user_id': str(n)}) for n in range(3)]
+    for token in tokens:
+        manager.verify(token)
+    assert manager.stats()['size'] == 2
+
+
+def test_manager_from_env_accepts_previous_keys():
+    with patch.dict('os.environ', {'JWT_SECRET': 'new-secret', 'JWT_KEY_ID': 'k2', 'JWT_PREVIOUS_KEYS': 'k1=old-secret'}):
+        manager = manager_from_env()
+    assert manager.active_kid == 'k2'
+    assert manager.verify(TokenManager({'k1': 'old-secret'}, 'k1').issue({'user_id': '1'}))['user_id'] == '1'
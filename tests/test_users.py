@@ -0,0 +1,47 @@
+from sqlalchemy import select
+from backend_codebase.models import User
+from backend_codebase.users import EMAIL_TAKEN, USERNAME_TAKEN, bulk_create_users, create_user, find_conflict
+
+
+def test_find_conflict_uses_one_query(Session, count_statements):
+    session = Session()
+    create_user(session, 'alice', 'alice@example.com', 'hash')
+    session.commit()
+
+    statements = count_statements(session.get_bind())
+    assert find_conflict(session, 'alice', 'other@example.com') == USERNAME_TAKEN
+    assert find_conflict(session, 'bob', 'alice@example.com') == EMAIL_TAKEN
+    assert find_conflict(session, 'bob', 'bob@example.com') is None
+    assert len(statements) == 3
+    session.close()
+
+
+def test_create_user_reports_lost_race(Session):
+    session = Session()
+    create_user(session, 'alice', 'alice@example.com', 'hash')
+    session.commit()
+
+    # A second signup that passed the pre-check before the first one committed
+    user, conflict = create_user(session, 'alice2', 'alice@example.com', 'hash')
+    assert (user, conflict) == (None, EMAIL_TAKEN)
+    session.close()
+
+
+def test_bulk_create_users_skips_duplicates(Session, count_statements):
+    session = Session()
+    create_user(session, 'alice', 'alice@example.com', 'hash')
+    session.commit()
+
+    statements = count_statements(session.get_bind())
+    errors = bulk_create_users(session, [
+        {'username': 'bob', 'email': 'bob@example.com', 'password_hash': 'hash'},
+        {'username': 'alice', 'email': 'new@example.com', 'password_hash': 'hash'},
+        {'username': 'carol', 'email': 'bob@example.com', 'password_hash': 'hash'},
+        {'username': 'dave', 'email': 'dave@example.com', 'password_hash': 'hash'},
+    ])
+    session.commit()
+
+    assert [statement.split()[0] for statement in statements if statement.split()[0] in ('SELECT', 'INSERT')] == ['SELECT', 'INSERT']
+    assert errors == [None, USERNAME_TAKEN, EMAIL_TAKEN, None]
+    assert set(session.execute(select(User.username)).scalars()) == {'alice', 'bob', 'dave'}
+    session.close()
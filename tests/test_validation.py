@@ -1,5 +1,5 @@
 import pytest
-from backend_codebase.validation import validate_username, validate_email_address, validate_password
+from backend_codebase.validation import _normalize_email, normalize_email, validate_username, validate_email_address, validate_password, validate_signups
 
 # Test cases for validate_username
 def test_validate_username_valid():
@@ -33,3 +33,34 @@ def test_validate_password_invalid():
     assert validate_password('nouppercase1') is False  # No uppercase letter
     assert validate_password('NOLOWERCASE1') is False  # No lowercase letter
     assert validate_password('NoDigits') is False  # No digit
+
+def test_validate_username_rejects_trailing_newline():
+    assert validate_username('valid_user\n') is False
+
+def test_normalize_email_is_cached():
+    _normalize_email.cache_clear()
+    assert normalize_email('Test@Example.com') == 'Test@example.com'
+    assert normalize_email('plainaddress') is None
+    assert normalize_email('Test@Example.com') == 'Test@example.com'
+    info = _normalize_email.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+def test_overlong_emails_are_rejected_before_the_cache():
+    _normalize_email.cache_clear()
+    assert normalize_email('a' * 64 + '@' + 'b' * 200 + '.com') is None
+    assert normalize_email('x' * 1_000_000) is None
+    assert _normalize_email.cache_info().currsize == 0
+
+# Test cases for the batch API
+def test_validate_signups():
+    records = [
+        {'username': 'valid_user', 'email': 'test@example.com', 'password': 'Password123'},
+        {'username': 'us', 'email': 'test@example.com', 'password': 'Password123'},
+        {'username': 'valid_user', 'email': 'plainaddress', 'password': 'Password123'},
+        {'username': 'valid_user', 'email': 'test@example.com', 'password': 'short1'},
+        {'username': 12345, 'email': 'test@example.com', 'password': 'Password123'},
+        'not a record',
+    ]
+    assert validate_signups(records) == [
+        None, 'Invalid username', 'Invalid email address', 'Invalid password', 'Invalid username', 'Invalid username'
+    ]
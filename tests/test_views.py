@@ -2,6 +2,9 @@ import pytest
 from backend_codebase import create_app, db
 from backend_codebase.models import User
 from backend_codebase.views import views_bp
+from backend_codebase.passwords import HasherSaturatedError, PasswordHasher, hash_rounds
+from backend_codebase.tokens import token_manager
+from unittest.mock import patch
 import bcrypt
 
 @pytest.fixture
@@ -38,6 +41,7 @@ def test_login_user_success(client, init_database):
     assert response.status_code == 200
     data = response.get_json()
     assert 'token' in data
+    assert token_manager.verify(data['token'])['user_id']
 
 
 def test_signup_user_validation(client):
@@ -67,3 +71,47 @@ def test_login_user_validation(client):
     response = client.post('/sessions', json={'email': 'test@example.com', 'password': 'wrongpass'})
     assert response.status_code == 401
     assert response.get_json()['error'] == 'Invalid credentials'
+
+
+def test_login_rehashes_when_cost_changes(app, client):
+    with app.app_context():
+        user = User(
+            username='olduser',
+            email='old@example.com',
+            password_hash=bcrypt.hashpw('password'.encode('utf-8'), bcrypt.gensalt(4))
+        )
+        db.session.add(user)
+        db.session.commit()
+
+    with patch('backend_codebase.views.password_hasher', PasswordHasher(rounds=5, workers=0)):
+        response = client.post('/sessions', json={'email': 'old@example.com', 'password': 'password'})
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert hash_rounds(User.query.filter_by(email='old@example.com').one().password_hash) == 5
+
+
+def test_signup_returns_503_when_hasher_is_saturated(client):
+    with patch('backend_codebase.views.password_hasher.hash', side_effect=HasherSaturatedError(2)):
+        response = client.post('/users', json={'username': 'busyuser', 'email': 'busy@example.com', 'password': 'Validpass1'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '2'
+
+
+def test_signup_rejects_duplicates(client, init_database):
+    response = client.post('/users', json={'username': 'otheruser', 'email': 'test@example.com', 'password': 'Validpass1'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Email already registered'
+
+    response = client.post('/users', json={'username': 'testuser', 'email': 'other@example.com', 'password': 'Validpass1'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Username already taken'
+
+
+def test_signup_race_returns_400(client, init_database):
+    # Simulate a concurrent signup that committed between the uniqueness check and the insert
+    with patch('backend_codebase.views.find_conflict', return_value=None), \
+            patch('backend_codebase.views.password_hasher', PasswordHasher(rounds=4, workers=0)):
+        response = client.post('/users', json={'username': 'testuser', 'email': 'test@example.com', 'password': 'Validpass1'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Email already registered'